@@ -7,15 +7,27 @@ import argparse
 import csv
 import datetime as dt
 import fnmatch
+import hashlib
+import heapq
 import json
 import math
 import os
+import pickle
+import random
 import re
+import shutil
+import struct
 import subprocess
 import sys
+import threading
+import time
+import zlib
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Sequence
 
 DEFAULT_SENSITIVE_RULES: list[tuple[str, str, float]] = [
     ("**/auth/**", "auth", 1.0),
@@ -36,6 +48,20 @@ DEFAULT_SENSITIVE_RULES: list[tuple[str, str, float]] = [
     ("**/sso/**", "auth", 1.0),
 ]
 
+# (regex, tag, weight) matched against file contents at HEAD with --scan-content.
+DEFAULT_CONTENT_RULES: list[tuple[str, str, float]] = [
+    (r"^\s*(?:import|from)\s+(?:hashlib|hmac|ssl|cryptography|Crypto|nacl)\b", "crypto", 1.0),
+    (r"\"(?:crypto/[a-z0-9/]+|golang\.org/x/crypto/[a-z0-9/]+)\"", "crypto", 1.0),
+    (r"(?:require\(\s*|from\s+)['\"](?:crypto|bcrypt|node-forge)['\"]", "crypto", 1.0),
+    (r"^\s*#\s*include\s*<(?:openssl|sodium|mbedtls)/", "crypto", 1.0),
+    (r"^\s*use\s+(?:ring|rustls|openssl|aes|sha2|hmac)::", "crypto", 1.0),
+    (r"^\s*import\s+(?:java\.security|javax\.crypto)\.", "crypto", 1.0),
+    (r"^\s*(?:import|from)\s+jwt\b", "auth", 1.0),
+    (r"['\"](?:jsonwebtoken|jose|github\.com/golang-jwt/jwt[a-z0-9/]*)['\"]", "auth", 1.0),
+    (r"-----BEGIN (?:RSA |EC |DSA |OPENSSH |ENCRYPTED )?PRIVATE KEY-----", "secrets", 1.0),
+    (r"\bAKIA[0-9A-Z]{16}\b", "secrets", 1.0),
+]
+
 DEFAULT_AUTHOR_EXCLUDE_REGEXES = [
     "dependabot",
 ]
@@ -62,7 +88,7 @@ DEFAULT_COCHANGE_EXCLUDES = [
 ]
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Build ownership graphs and security ownership summaries from git history."
     )
@@ -102,6 +128,28 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="CSV file with pattern,tag,weight for sensitive paths",
     )
+    parser.add_argument(
+        "--scan-content",
+        action="store_true",
+        help="Also tag files whose contents at HEAD match content rules (crypto, JWT, keys)",
+    )
+    parser.add_argument(
+        "--content-config",
+        default=None,
+        help="CSV file with tag,weight,regex content rules (regex may contain commas)",
+    )
+    parser.add_argument(
+        "--content-workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Processes matching content rules (default: min(8, CPUs))",
+    )
+    parser.add_argument(
+        "--content-max-bytes",
+        type=int,
+        default=1 << 20,
+        help="Skip blobs larger than this when scanning content",
+    )
     parser.add_argument(
         "--owner-threshold",
         type=float,
@@ -131,6 +179,94 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Write commit list to commits.jsonl",
     )
+    parser.add_argument(
+        "--emit-commit-store",
+        action="store_true",
+        help="Write a compact, memory-mappable commit store to commit_store/",
+    )
+    parser.add_argument(
+        "--progress",
+        choices=("text", "jsonl"),
+        default=None,
+        help="Report walk progress on stderr as text lines or JSON lines",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=2.0,
+        help="Minimum seconds between progress reports",
+    )
+    parser.add_argument(
+        "--sample",
+        type=float,
+        default=None,
+        help="Preview from a seeded, month-stratified fraction of commits (e.g. 0.05), scaled up",
+    )
+    parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=0,
+        help="Seed for --sample; the same seed and history give the same commits",
+    )
+    parser.add_argument(
+        "--approximate",
+        action="store_true",
+        help=(
+            "Estimate author counts (HyperLogLog) and per-person splits (Count-Min) instead of "
+            "keeping per-person-per-file state; skips edges, co-change and communities"
+        ),
+    )
+    parser.add_argument(
+        "--sketch-memory",
+        type=float,
+        default=64.0,
+        help="MiB of sketch registers and counters for --approximate (default: 64)",
+    )
+    parser.add_argument(
+        "--windows",
+        default=None,
+        help="Comma-separated START..END windows (END exclusive) to snapshot in the same walk",
+    )
+    parser.add_argument(
+        "--window-period",
+        choices=("month", "quarter", "year"),
+        default=None,
+        help="Snapshot every calendar month/quarter/year (UTC) in the same walk",
+    )
+    parser.add_argument(
+        "--dir-depths",
+        default="1,2,3",
+        help="Comma-separated directory depths to roll up into dirs.csv (0 = repo root, '' = off)",
+    )
+    parser.add_argument(
+        "--dir-top-owners",
+        type=int,
+        default=3,
+        help="Top owners saved per directory in dirs.csv",
+    )
+    parser.add_argument(
+        "--churn",
+        action="store_true",
+        help="Read --numstat and record lines added/deleted per edge, person, file and community",
+    )
+    parser.add_argument(
+        "--sensitive-weight",
+        choices=("touches", "churn"),
+        default="touches",
+        help="Weight sensitive touches per touch or by lines changed (churn implies --churn)",
+    )
+    parser.add_argument(
+        "--blame",
+        choices=("sensitive", "all"),
+        default=None,
+        help="Attribute current lines at HEAD with git blame for sensitive or all files",
+    )
+    parser.add_argument(
+        "--blame-workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Concurrent git blame processes (default: min(8, CPUs))",
+    )
     parser.add_argument(
         "--author-exclude-regex",
         action="append",
@@ -165,6 +301,23 @@ def parse_args() -> argparse.Namespace:
         default=0.05,
         help="Minimum Jaccard similarity to keep file-file edge",
     )
+    parser.add_argument(
+        "--cochange-top-k",
+        type=int,
+        default=0,
+        help="Keep only each file's top K co-change neighbors by Jaccard (0 = keep all)",
+    )
+    parser.add_argument(
+        "--cochange-top-k-policy",
+        choices=("union", "mutual"),
+        default="union",
+        help="Keep a top-k pair if it is in either file's top K (union) or both (mutual)",
+    )
+    parser.add_argument(
+        "--cochange-bitmaps",
+        action="store_true",
+        help="Persist each file's co-change commit set as compressed bitmaps for exact queries",
+    )
     parser.add_argument(
         "--cochange-exclude",
         action="append",
@@ -187,6 +340,17 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Emit ownership.graphml (requires networkx)",
     )
+    parser.add_argument(
+        "--edge-shards",
+        type=int,
+        default=0,
+        help="Partition edges/cochange_edges into N shards by crc32(file id) (0 = single CSV)",
+    )
+    parser.add_argument(
+        "--neo4j-admin",
+        action="store_true",
+        help="Emit neo4j-admin/ node and relationship files for offline bulk import",
+    )
     parser.add_argument(
         "--max-community-files",
         type=int,
@@ -200,7 +364,17 @@ def parse_args() -> argparse.Namespace:
         help="Top maintainers saved per community",
     )
     parser.set_defaults(communities=True)
-    return parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def build_args(**overrides: object) -> argparse.Namespace:
+    """Return builder arguments with CLI defaults, e.g. build_args(repo="..", emit_commits=True)."""
+    args = parse_args([])
+    for key, value in overrides.items():
+        if not hasattr(args, key):
+            raise ValueError(f"Unknown build option: {key}")
+        setattr(args, key, value)
+    return args
 
 
 def load_sensitive_rules(path: str | None) -> list[tuple[str, str, float]]:
@@ -222,6 +396,26 @@ def load_sensitive_rules(path: str | None) -> list[tuple[str, str, float]]:
     return rules
 
 
+def load_content_rules(path: str | None) -> list[tuple[str, str, float]]:
+    if not path:
+        return list(DEFAULT_CONTENT_RULES)
+    rules: list[tuple[str, str, float]] = []
+    with open(path, "r", encoding="utf-8") as handle:
+        for raw in handle:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(",", 2)
+            if len(parts) < 3 or not parts[2].strip():
+                raise ValueError(f"Content rule must be tag,weight,regex: {line}")
+            tag = parts[0].strip() or "sensitive"
+            weight = float(parts[1]) if parts[1].strip() else 1.0
+            regex = parts[2].strip()
+            re.compile(regex)
+            rules.append((regex, tag, weight))
+    return rules
+
+
 def parse_date(value: str) -> dt.datetime:
     parsed = dt.datetime.fromisoformat(value)
     if parsed.tzinfo is None:
@@ -282,6 +476,124 @@ def author_excluded(name: str, email: str, patterns: Iterable[re.Pattern[str]])
     return any(pattern.search(haystack) for pattern in patterns)
 
 
+# Degree-of-authorship model (Fritz et al.) with the author cutoffs used by Avelino et al.
+DOA_INTERCEPT = 3.293
+DOA_FIRST_AUTHORSHIP = 1.098
+DOA_DELIVERIES = 0.164
+DOA_ACCEPTANCES = 0.321
+DOA_NORMALIZED_MIN = 0.75
+TRUCK_FACTOR_ORPHAN_SHARE = 0.5
+
+
+def file_authors(aggregate: dict[str, object]) -> dict[str, list[str]]:
+    """Authors of each file by degree of authorship, computed once per aggregate.
+
+    DOA = 3.293 + 1.098 * FA + 0.164 * DL - 0.321 * ln(1 + AC), where FA is 1 for whoever
+    made the file's first commit in the walk, DL counts the person's commits to the file and
+    AC everyone else's. Authors have DOA >= 3.293 and more than 0.75 of the file's top DOA.
+    """
+    if aggregate["doa_authors"] is not None:
+        return aggregate["doa_authors"]
+    edges = aggregate["edges"]
+    authors: dict[str, list[str]] = {}
+    for path, touches_by_person in aggregate["file_people_touches"].items():
+        first_seen = aggregate["files"][path]["first_seen"]
+        total = sum(touches_by_person.values())
+        scores = {}
+        for person, deliveries in touches_by_person.items():
+            first_authorship = 1 if edges[(person, path)]["first_seen"] == first_seen else 0
+            scores[person] = (
+                DOA_INTERCEPT
+                + DOA_FIRST_AUTHORSHIP * first_authorship
+                + DOA_DELIVERIES * deliveries
+                - DOA_ACCEPTANCES * math.log1p(total - deliveries)
+            )
+        top = max(scores.values(), default=0.0)
+        authors[path] = sorted(
+            person
+            for person, score in scores.items()
+            if score >= DOA_INTERCEPT and score > DOA_NORMALIZED_MIN * top
+        )
+    aggregate["doa_authors"] = authors
+    return authors
+
+
+def truck_factor(authors_by_file: Iterable[Sequence[str]]) -> tuple[int, list[str]]:
+    """Greedy truck factor: drop top authors until more than half of the files are orphaned.
+
+    Authors are ranked once by authored files; removing one only decrements the remaining
+    author count of its own files, so each (author, file) pair is visited once.
+    """
+    remaining: list[int] = []
+    files_by_author: dict[str, list[int]] = defaultdict(list)
+    for index, authors in enumerate(authors_by_file):
+        remaining.append(len(authors))
+        for author in authors:
+            files_by_author[author].append(index)
+    orphaned = remaining.count(0)
+    limit = len(remaining) * TRUCK_FACTOR_ORPHAN_SHARE
+    removed: list[str] = []
+    ranked = sorted(files_by_author.items(), key=lambda item: (-len(item[1]), item[0]))
+    for author, indices in ranked:
+        if orphaned > limit:
+            break
+        removed.append(author)
+        for index in indices:
+            remaining[index] -= 1
+            if remaining[index] == 0:
+                orphaned += 1
+    return len(removed), removed
+
+
+def score_cochange_pairs(
+    cochange_counts: dict[tuple[str, str], int],
+    cochange_file_commits: dict[str, int],
+    min_count: int,
+    min_jaccard: float,
+) -> Iterable[tuple[str, str, int, float]]:
+    """Yield (file_a, file_b, count, jaccard) for pairs that pass the thresholds."""
+    for (file_a, file_b), count in cochange_counts.items():
+        if count < min_count:
+            continue
+        commits_a = cochange_file_commits.get(file_a, 0)
+        commits_b = cochange_file_commits.get(file_b, 0)
+        denom = commits_a + commits_b - count
+        if denom <= 0:
+            continue
+        jaccard = count / denom
+        if jaccard < min_jaccard:
+            continue
+        yield file_a, file_b, count, jaccard
+
+
+def top_k_cochange_pairs(
+    pairs: Iterable[tuple[str, str, int, float]], top_k: int, policy: str
+) -> list[tuple[str, str, int, float]]:
+    """Keep each file's top_k neighbors by (jaccard, count) using bounded per-file min-heaps.
+
+    Only heap entries are retained, so at most 2 * top_k pairs per file are held at once.
+    """
+    heaps: dict[str, list[tuple[float, int, str]]] = defaultdict(list)
+    for file_a, file_b, count, jaccard in pairs:
+        for node, other in ((file_a, file_b), (file_b, file_a)):
+            heap = heaps[node]
+            if len(heap) < top_k:
+                heapq.heappush(heap, (jaccard, count, other))
+            elif (jaccard, count, other) > heap[0]:
+                heapq.heapreplace(heap, (jaccard, count, other))
+    votes: dict[tuple[str, str], list[object]] = {}
+    for node, heap in heaps.items():
+        for jaccard, count, other in heap:
+            key = (node, other) if node < other else (other, node)
+            votes.setdefault(key, [count, jaccard, 0])[2] += 1
+    required = 2 if policy == "mutual" else 1
+    return [
+        (file_a, file_b, count, jaccard)
+        for (file_a, file_b), (count, jaccard, hits) in sorted(votes.items())
+        if hits >= required
+    ]
+
+
 def compute_community_owners(
     community_files: Iterable[str],
     people: dict[str, dict[str, object]],
@@ -289,10 +601,12 @@ def compute_community_owners(
     file_people_recency: dict[str, dict[str, float]],
     file_people_sensitive: dict[str, dict[str, float]],
     top_n: int,
+    file_people_churn: dict[str, dict[str, int]] | None = None,
 ) -> dict[str, object]:
     touches_by_person: dict[str, int] = defaultdict(int)
     recency_by_person: dict[str, float] = defaultdict(float)
     sensitive_by_person: dict[str, float] = defaultdict(float)
+    churn_by_person: dict[str, int] = defaultdict(int)
 
     for path in community_files:
         for person, touches in file_people_touches.get(path, {}).items():
@@ -301,10 +615,14 @@ def compute_community_owners(
             recency_by_person[person] += recency
         for person, weight in file_people_sensitive.get(path, {}).items():
             sensitive_by_person[person] += weight
+        if file_people_churn is not None:
+            for person, lines in file_people_churn.get(path, {}).items():
+                churn_by_person[person] += lines
 
     total_touches = sum(touches_by_person.values())
     total_recency = sum(recency_by_person.values())
     total_sensitive = sum(sensitive_by_person.values())
+    total_churn = sum(churn_by_person.values())
 
     ranked = sorted(touches_by_person.items(), key=lambda item: item[1], reverse=True)
     owners = []
@@ -324,46 +642,651 @@ def compute_community_owners(
                 "primary_tz_offset": people.get(person_id, {}).get("primary_tz_offset", ""),
             }
         )
-
+        if file_people_churn is not None:
+            lines = churn_by_person.get(person_id, 0)
+            owners[-1]["lines_changed"] = lines
+            owners[-1]["churn_share"] = round(lines / total_churn, 4) if total_churn else 0.0
+
+    totals: dict[str, object] = {
+        "touches": total_touches,
+        "recency_weight": round(total_recency, 6),
+        "sensitive_weight": round(total_sensitive, 2),
+    }
+    if file_people_churn is not None:
+        totals["lines_changed"] = total_churn
     return {
         "bus_factor": len(touches_by_person),
         "owner_count": len(touches_by_person),
-        "totals": {
-            "touches": total_touches,
-            "recency_weight": round(total_recency, 6),
-            "sensitive_weight": round(total_sensitive, 2),
-        },
+        "totals": totals,
         "top_maintainers": owners,
     }
 
 
+def new_dir_node() -> dict[str, object]:
+    return {
+        "children": {},
+        "files": 0,
+        "sensitive_weight": 0.0,
+        "people": defaultdict(int),
+        "authors": [],
+    }
+
+
+def compute_dir_rollups(
+    file_people_touches: dict[str, dict[str, int]],
+    file_people_sensitive: dict[str, dict[str, float]],
+    doa_authors: dict[str, list[str]],
+    depths: set[int],
+    top_n: int,
+) -> list[list[str]]:
+    """Roll per-file touches up a directory prefix tree; one row per directory at depths."""
+    max_depth = max(depths, default=-1)
+    if max_depth < 0:
+        return []
+    root = new_dir_node()
+    for path, touches_by_person in file_people_touches.items():
+        sensitive_weight = sum(file_people_sensitive.get(path, {}).values())
+        node = root
+        for part in [None, *path.split("/")[:-1][:max_depth]]:
+            if part is not None:
+                node = node["children"].setdefault(part, new_dir_node())
+            node["files"] += 1
+            node["sensitive_weight"] += sensitive_weight
+            node["authors"].append(doa_authors.get(path, []))
+            for person, touches in touches_by_person.items():
+                node["people"][person] += touches
+
+    rows = []
+    stack: list[tuple[str, int, dict[str, object]]] = [(".", 0, root)]
+    while stack:
+        name, depth, node = stack.pop()
+        if depth in depths:
+            touches = sum(node["people"].values())
+            ranked = sorted(node["people"].items(), key=lambda item: (-item[1], item[0]))
+            top_owner_share = ranked[0][1] / touches if touches else 0.0
+            rows.append(
+                [
+                    name,
+                    str(depth),
+                    str(node["files"]),
+                    str(touches),
+                    str(len(node["people"])),
+                    f"{node['sensitive_weight']:.2f}",
+                    ";".join(f"{person}:{count}" for person, count in ranked[:top_n]),
+                    f"{top_owner_share:.4f}",
+                    str(truck_factor(node["authors"])[0]),
+                ]
+            )
+        prefix = "" if depth == 0 else f"{name}/"
+        for child in sorted(node["children"], reverse=True):
+            stack.append((f"{prefix}{child}", depth + 1, node["children"][child]))
+    return rows
+
+
+def compute_tag_rollups(
+    people: dict[str, dict[str, object]],
+    files: dict[str, dict[str, object]],
+    edges: dict[tuple[str, str], dict[str, object]],
+    tag_totals: dict[str, float],
+    tag_person_totals: dict[str, dict[str, float]],
+    min_touches: int,
+) -> dict[str, dict[str, object]]:
+    tag_person_touches: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for (email, path), edge in sorted(edges.items()):
+        if int(edge["touches"]) < min_touches:
+            continue
+        for tag in files[path]["sensitive_tags"]:
+            tag_person_touches[tag][email] += int(edge["touches"])
+
+    rollups: dict[str, dict[str, object]] = {}
+    for tag, total in tag_totals.items():
+        touches_by_person = tag_person_touches.get(tag, {})
+        weights_by_person = tag_person_totals.get(tag, {})
+        person_ids = list(touches_by_person)
+        person_ids.extend(person for person in weights_by_person if person not in touches_by_person)
+        tag_people = [
+            {
+                "person_id": person_id,
+                "name": people.get(person_id, {}).get("name", person_id),
+                "email": person_id,
+                "touches": touches_by_person.get(person_id, 0),
+                "sensitive_weight": weights_by_person.get(person_id, 0.0),
+            }
+            for person_id in person_ids
+        ]
+        tag_people.sort(key=lambda item: item["touches"], reverse=True)
+
+        tag_files = [
+            {
+                "file_id": path,
+                "path": path,
+                "touches": file_entry["touches"],
+                "bus_factor": len(file_entry["authors"]),
+            }
+            for path, file_entry in sorted(files.items())
+            if tag in file_entry["sensitive_tags"]
+        ]
+        tag_files.sort(key=lambda item: item["touches"], reverse=True)
+
+        rollups[tag] = {
+            "total_weight": total,
+            "file_count": len(tag_files),
+            "people": tag_people,
+            "files": tag_files,
+        }
+    return rollups
+
+
+def compute_hidden_owners(
+    tag_rollups: dict[str, dict[str, object]], owner_threshold: float
+) -> list[dict[str, object]]:
+    """Also serves query_ownership.py hidden-owners, which reruns it over tags.json."""
+    hidden_owners = []
+    for tag, rollup in tag_rollups.items():
+        total = float(rollup["total_weight"])
+        if total <= 0:
+            continue
+        candidates = [entry for entry in rollup["people"] if entry["sensitive_weight"] > 0]
+        if not candidates:
+            continue
+        top = max(candidates, key=lambda item: item["sensitive_weight"])
+        share = top["sensitive_weight"] / total
+        if share >= owner_threshold:
+            hidden_owners.append(
+                {
+                    "person": top["person_id"],
+                    "name": top["name"],
+                    "controls": f"{share * 100:.0f}% of {tag} code",
+                    "category": tag,
+                    "share": round(share, 4),
+                }
+            )
+    return hidden_owners
+
+
+def write_community_commits(
+    path: Path,
+    communities: list[Iterable[str]],
+    file_commit_rows: dict[str, array],
+    commit_offsets: array,
+    commits_bytes: int,
+) -> None:
+    index: dict[str, list[int]] = {}
+    for idx, community in enumerate(communities, start=1):
+        rows: set[int] = set()
+        for file_path in community:
+            rows.update(file_commit_rows.get(file_path, ()))
+        index[str(idx)] = sorted(commit_offsets[row] for row in rows)
+    with path.open("w", encoding="utf-8") as handle:
+        json.dump(
+            {"commits_file": "commits.jsonl", "commits_bytes": commits_bytes, "communities": index},
+            handle,
+        )
+
+
+COMMIT_INDEX_STRIDE = 256
+
+
+def sort_commits_file(
+    commits_path: Path,
+    commit_times: array,
+    commit_offsets: array,
+    commits_bytes: int,
+    date_field: str,
+) -> array:
+    """Rewrite commits.jsonl in date order and write a sparse time -> byte offset index.
+
+    Returns the new byte offset of every row, indexed by original row ordinal.
+    """
+    order = sorted(range(len(commit_times)), key=lambda row: (commit_times[row], row))
+    unsorted_path = commits_path.with_name(commits_path.name + ".unsorted")
+    os.replace(commits_path, unsorted_path)
+    sorted_offsets = array("Q", bytes(8 * len(commit_offsets)))
+    entries = []
+    position = 0
+    with unsorted_path.open("rb") as source, commits_path.open("wb") as target:
+        for rank, row in enumerate(order):
+            start = commit_offsets[row]
+            end = commit_offsets[row + 1] if row + 1 < len(commit_offsets) else commits_bytes
+            source.seek(start)
+            target.write(source.read(end - start))
+            sorted_offsets[row] = position
+            if rank % COMMIT_INDEX_STRIDE == 0:
+                entries.append([commit_times[row], position])
+            position += end - start
+    unsorted_path.unlink()
+
+    index = {
+        "commits_file": commits_path.name,
+        "commits_bytes": commits_bytes,
+        "date_field": date_field,
+        "stride": COMMIT_INDEX_STRIDE,
+        "entries": entries,
+    }
+    with commits_path.with_name("commits.index.json").open("w", encoding="utf-8") as handle:
+        json.dump(index, handle)
+    return sorted_offsets
+
+
+COMMIT_STORE_ARRAYS: dict[str, str] = {
+    "author_time": "q",
+    "author_tz": "h",
+    "author_id": "i",
+    "committer_time": "q",
+    "committer_tz": "h",
+    "committer_id": "i",
+    "is_merge": "B",
+    "file_ptr": "q",
+    "file_ids": "i",
+}
+
+
+def new_commit_store() -> dict[str, object]:
+    store: dict[str, object] = {name: array(code) for name, code in COMMIT_STORE_ARRAYS.items()}
+    store["file_ptr"].append(0)
+    store["identities"] = {}
+    store["paths"] = {}
+    return store
+
+
+def append_commit_store(
+    store: dict[str, object], commit: dict[str, object], touched_files: list[str]
+) -> None:
+    identities: dict[tuple[str, str], int] = store["identities"]
+    paths: dict[str, int] = store["paths"]
+    for role in ("author", "committer"):
+        when = parse_date(str(commit.get(f"{role}_date", "")))
+        identity = (str(commit.get(f"{role}_name", "")), str(commit.get(f"{role}_email", "")))
+        store[f"{role}_time"].append(int(when.timestamp()))
+        store[f"{role}_tz"].append(offset_minutes(when) or 0)
+        store[f"{role}_id"].append(identities.setdefault(identity, len(identities)))
+    store["is_merge"].append(1 if commit.get("is_merge") else 0)
+    file_ids = store["file_ids"]
+    for path in touched_files:
+        file_ids.append(paths.setdefault(path, len(paths)))
+    store["file_ptr"].append(len(file_ids))
+
+
+def write_commit_store(store_dir: Path, store: dict[str, object], date_field: str) -> None:
+    """Write typed arrays (CSR file lists) plus interned identities and paths.
+
+    Commits are ordered by the build's date field so readers can bisect time ranges.
+    """
+    times: array = store[f"{date_field}_time"]
+    order = sorted(range(len(times)), key=lambda row: (times[row], row))
+    file_ptr: array = store["file_ptr"]
+    file_ids: array = store["file_ids"]
+    sorted_ptr = array(COMMIT_STORE_ARRAYS["file_ptr"], [0])
+    sorted_ids = array(COMMIT_STORE_ARRAYS["file_ids"])
+    for row in order:
+        sorted_ids.extend(file_ids[file_ptr[row] : file_ptr[row + 1]])
+        sorted_ptr.append(len(sorted_ids))
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    arrays = {}
+    for name, code in COMMIT_STORE_ARRAYS.items():
+        if name == "file_ptr":
+            values = sorted_ptr
+        elif name == "file_ids":
+            values = sorted_ids
+        else:
+            values = array(code, (store[name][row] for row in order))
+        with (store_dir / f"{name}.bin").open("wb") as handle:
+            values.tofile(handle)
+        arrays[name] = {
+            "file": f"{name}.bin",
+            "typecode": code,
+            "itemsize": values.itemsize,
+            "length": len(values),
+        }
+    with (store_dir / "identities.json").open("w", encoding="utf-8") as handle:
+        json.dump([list(identity) for identity in store["identities"]], handle)
+    with (store_dir / "paths.json").open("w", encoding="utf-8") as handle:
+        json.dump(list(store["paths"]), handle)
+    manifest = {
+        "version": 1,
+        "byteorder": sys.byteorder,
+        "commits": len(order),
+        "sorted_by": date_field,
+        "arrays": arrays,
+    }
+    with (store_dir / "manifest.json").open("w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+
+
+# Roaring-style containers: ids are split on their high 16 bits; each container holds
+# the low 16 bits as a sorted uint16 array, or as a 65536-bit bitmap once that is smaller.
+BITMAP_CONTAINER = struct.Struct("<HBH")
+BITMAP_ARRAY_MAX = 4096
+COCHANGE_BITMAP_ARRAYS = {"offsets": "q", "cardinality": "i"}
+
+
+def encode_bitmap(ids: Iterable[int]) -> bytes:
+    """Encode ascending ids as (key, kind, count - 1) headers, each followed by its payload."""
+    containers: dict[int, list[int]] = defaultdict(list)
+    for value in ids:
+        containers[value >> 16].append(value & 0xFFFF)
+    chunks = []
+    for key, lows in sorted(containers.items()):
+        if len(lows) <= BITMAP_ARRAY_MAX:
+            chunks.append(BITMAP_CONTAINER.pack(key, 0, len(lows) - 1))
+            chunks.append(struct.pack(f"<{len(lows)}H", *lows))
+        else:
+            bits = bytearray(8192)
+            for low in lows:
+                bits[low >> 3] |= 1 << (low & 7)
+            chunks.append(BITMAP_CONTAINER.pack(key, 1, len(lows) - 1))
+            chunks.append(bytes(bits))
+    return b"".join(chunks)
+
+
+def write_cochange_bitmaps(bitmap_dir: Path, bitmaps: dict[str, object]) -> None:
+    """Write paths.json, offsets/cardinality arrays and the concatenated container blobs."""
+    bitmap_dir.mkdir(parents=True, exist_ok=True)
+    offsets = array(COCHANGE_BITMAP_ARRAYS["offsets"], [0])
+    cardinality = array(COCHANGE_BITMAP_ARRAYS["cardinality"])
+    with (bitmap_dir / "containers.bin").open("wb") as handle:
+        for blob, count in zip(bitmaps["blobs"], bitmaps["cardinality"]):
+            handle.write(blob)
+            offsets.append(offsets[-1] + len(blob))
+            cardinality.append(count)
+    arrays = {}
+    for name, values in (("offsets", offsets), ("cardinality", cardinality)):
+        with (bitmap_dir / f"{name}.bin").open("wb") as handle:
+            values.tofile(handle)
+        arrays[name] = {
+            "file": f"{name}.bin",
+            "typecode": values.typecode,
+            "itemsize": values.itemsize,
+            "length": len(values),
+        }
+    with (bitmap_dir / "paths.json").open("w", encoding="utf-8") as handle:
+        json.dump(bitmaps["paths"], handle)
+    manifest = {
+        "version": 1,
+        "byteorder": sys.byteorder,
+        "commits": bitmaps["commits"],
+        "containers": "containers.bin",
+        "arrays": arrays,
+    }
+    with (bitmap_dir / "manifest.json").open("w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+
+
+CONTENT_CACHE_VERSION = 1
+CONTENT_SCAN_BATCH = 512
+# Read size used to drain blobs over --content-max-bytes from the cat-file pipe.
+BLOB_SKIP_CHUNK = 1 << 20
+
+
+def read_blobs(
+    repo: str, shas: list[str], max_bytes: int
+) -> Iterable[tuple[str, bytes | None]]:
+    """Stream blobs through one `git cat-file --batch`; oversized or missing blobs yield None."""
+    proc = subprocess.Popen(
+        ["git", "-C", repo, "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert proc.stdin is not None and proc.stdout is not None
+
+    def feed() -> None:
+        # Requests are written from a thread so a full stdout pipe cannot deadlock stdin.
+        try:
+            for sha in shas:
+                proc.stdin.write(f"{sha}\n".encode("ascii"))
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    for sha in shas:
+        header = proc.stdout.readline().split()
+        if len(header) < 3:
+            yield sha, None
+            continue
+        size = int(header[2])
+        if header[1] == b"blob" and size <= max_bytes:
+            data = proc.stdout.read(size)
+        else:
+            # Drain oversized or non-blob content in chunks rather than buffering all of it.
+            data = None
+            remaining = size
+            while remaining > 0:
+                chunk = proc.stdout.read(min(remaining, BLOB_SKIP_CHUNK))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+        proc.stdout.read(1)
+        yield sha, data
+    writer.join()
+    stderr = proc.stderr.read() if proc.stderr else b""
+    if proc.wait() != 0:
+        raise RuntimeError(stderr.decode("utf-8", "replace").strip() or "git cat-file failed")
+
+
+def scan_blob(
+    rules: list[tuple[str, str, float]], item: tuple[str, bytes | None]
+) -> dict[str, float]:
+    """Tags whose regexes match a blob; binary blobs (NUL in the first 8 KiB) never match."""
+    data = item[1]
+    tags: dict[str, float] = {}
+    if not data or b"\0" in data[:8192]:
+        return tags
+    for regex, tag, weight in rules:
+        if tag not in tags and re.search(regex.encode("utf-8"), data, re.MULTILINE):
+            tags[tag] = weight
+    return tags
+
+
+def classify_contents(
+    repo: str,
+    tree: dict[str, str],
+    rules: list[tuple[str, str, float]],
+    cache_path: Path,
+    workers: int,
+    max_bytes: int,
+) -> tuple[dict[str, dict[str, float]], int, int]:
+    """Content tags for every file at HEAD; returns (tags by path, blobs scanned, cache hits).
+
+    Results are cached by blob SHA for the same rules and size limit, so reruns only read
+    blobs that changed. Blobs are matched in batches across a process pool.
+    """
+    rules_key = (tuple(rules), max_bytes)
+    cache: dict[str, dict[str, float]] = {}
+    try:
+        with cache_path.open("rb") as handle:
+            version, cached_key, cache = pickle.load(handle)
+        if version != CONTENT_CACHE_VERSION or cached_key != rules_key:
+            cache = {}
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+        cache = {}
+
+    live = set(tree.values())
+    pending = sorted(sha for sha in live if sha not in cache)
+    cache_hits = len(live) - len(pending)
+    results = {sha: tags for sha, tags in cache.items() if sha in live}
+    blobs = read_blobs(repo, pending, max_bytes)
+    if workers > 1 and len(pending) > CONTENT_SCAN_BATCH:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                batch = list(islice(blobs, CONTENT_SCAN_BATCH * workers))
+                if not batch:
+                    break
+                scanned = pool.map(scan_blob, [rules] * len(batch), batch, chunksize=32)
+                for (sha, _), tags in zip(batch, scanned):
+                    results[sha] = tags
+    else:
+        for item in blobs:
+            results[item[0]] = scan_blob(rules, item)
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("wb") as handle:
+            payload = (CONTENT_CACHE_VERSION, rules_key, results)
+            pickle.dump(payload, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    content_tags = {path: results[sha] for path, sha in tree.items() if results.get(sha)}
+    return content_tags, len(pending), cache_hits
+
+
+BLAME_CACHE_VERSION = 2
+BLAME_HEADER_RE = re.compile(r"^([0-9a-f]{40,64}) \d+ \d+")
+
+
+def list_tree_blobs(repo: str) -> dict[str, str]:
+    """Map each regular file at HEAD to its blob SHA."""
+    result = subprocess.run(
+        ["git", "-C", repo, "ls-tree", "-r", "-z", "HEAD"], capture_output=True, check=False
+    )
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(message or "git ls-tree failed")
+    blobs: dict[str, str] = {}
+    for entry in result.stdout.split(b"\0"):
+        if not entry:
+            continue
+        meta, _, path = entry.partition(b"\t")
+        mode, kind, sha = meta.split(b" ")
+        if kind != b"blob" or mode == b"120000":
+            continue
+        blobs[path.decode("utf-8", "replace")] = sha.decode("ascii")
+    return blobs
+
+
+def blame_file(repo: str, path: str) -> list[tuple[str, str, str, str, int]]:
+    """Return (author_name, author_email, committer_name, committer_email, lines) per commit."""
+    result = subprocess.run(
+        ["git", "-C", repo, "blame", "--porcelain", "HEAD", "--", path],
+        capture_output=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(message or f"git blame failed for {path}")
+
+    commits: dict[str, dict[str, str]] = {}
+    line_counts: dict[str, int] = defaultdict(int)
+    current = None
+    for raw in result.stdout.split(b"\n"):
+        if raw.startswith(b"\t"):
+            line_counts[current] += 1
+            continue
+        line = raw.decode("utf-8", "replace")
+        header = BLAME_HEADER_RE.match(line)
+        if header:
+            current = header.group(1)
+            commits.setdefault(current, {})
+            continue
+        key, _, value = line.partition(" ")
+        if current is not None and key in ("author", "author-mail", "committer", "committer-mail"):
+            commits[current][key] = value.strip("<>") if key.endswith("-mail") else value
+    return [
+        (
+            commits[sha].get("author", ""),
+            commits[sha].get("author-mail", ""),
+            commits[sha].get("committer", ""),
+            commits[sha].get("committer-mail", ""),
+            lines,
+        )
+        for sha, lines in line_counts.items()
+    ]
+
+
+def blame_files(
+    repo: str, tree: dict[str, str], paths: list[str], cache_path: Path, workers: int
+) -> tuple[dict[str, list[tuple[str, str, str, str, int]]], int]:
+    """Blame paths at HEAD, reusing cached results; returns (results, cache_hits).
+
+    Entries are keyed by (path, blob SHA): identical blobs at different paths, such as empty
+    __init__.py files, have their own histories and authors. The cache keeps every entry whose
+    pair is still in the HEAD tree, so switching between --blame sensitive and --blame all
+    does not throw earlier results away.
+    """
+    cache: dict[tuple[str, str], list[tuple[str, str, str, str, int]]] = {}
+    try:
+        with cache_path.open("rb") as handle:
+            version, cache = pickle.load(handle)
+        if version != BLAME_CACHE_VERSION:
+            cache = {}
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+        cache = {}
+
+    results = {path: cache[path, tree[path]] for path in paths if (path, tree[path]) in cache}
+    pending = [path for path in paths if path not in results]
+    cache_hits = len(results)
+    # Each blame is its own git process; threads only dispatch them and parse the output.
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for path, blamed in zip(pending, pool.map(lambda path: blame_file(repo, path), pending)):
+            results[path] = blamed
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("wb") as handle:
+            current = {key: blamed for key, blamed in cache.items() if tree.get(key[0]) == key[1]}
+            current.update(((path, tree[path]), blamed) for path, blamed in results.items())
+            pickle.dump((BLAME_CACHE_VERSION, current), handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return results, cache_hits
+
+
 def run_git_log(
-    repo: str, since: str | None, until: str | None, include_merges: bool
+    repo: str,
+    since: str | None,
+    until: str | None,
+    include_merges: bool,
+    numstat: bool = False,
+    revisions: Sequence[str] | None = None,
 ) -> Iterable[list[str]]:
+    """Yield raw log records; with revisions, log exactly those commits in the given order."""
     cmd = [
         "git",
         "-C",
         repo,
         "log",
-        "--name-only",
+        "--numstat" if numstat else "--name-only",
         "--no-renames",
         "--date=iso-strict",
         "--format=---%n%H%n%P%n%an%n%ae%n%ad%n%cn%n%ce%n%cd",
     ]
-    if not include_merges:
-        cmd.append("--no-merges")
-    if since:
-        cmd.extend(["--since", since])
-    if until:
-        cmd.extend(["--until", until])
+    if revisions is not None:
+        cmd.extend(["--no-walk=unsorted", "--stdin"])
+    else:
+        if not include_merges:
+            cmd.append("--no-merges")
+        if since:
+            cmd.extend(["--since", since])
+        if until:
+            cmd.extend(["--until", until])
 
     proc = subprocess.Popen(
         cmd,
+        stdin=subprocess.PIPE if revisions is not None else None,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
     )
     assert proc.stdout is not None
+    if revisions is not None:
+
+        def feed() -> None:
+            assert proc.stdin is not None
+            try:
+                for revision in revisions:
+                    proc.stdin.write(f"{revision}\n")
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+        threading.Thread(target=feed, daemon=True).start()
 
     batch: list[str] = []
     for line in proc.stdout:
@@ -381,7 +1304,191 @@ def run_git_log(
         raise RuntimeError(stderr.strip() or "git log failed")
 
 
-def iter_commits(lines: Iterable[list[str]]) -> Iterable[tuple[dict[str, object], list[str]]]:
+def sample_commits(
+    repo: str,
+    since: str | None,
+    until: str | None,
+    include_merges: bool,
+    date_field: str,
+    fraction: float,
+    seed: int,
+) -> tuple[list[str], int, int]:
+    """Seeded sample of a fraction of the commits, allocated proportionally to UTC months.
+
+    Returns (sampled SHAs in log order, commits in the full walk, months sampled from).
+    """
+    cmd = ["git", "-C", repo, "log", f"--format=%H %{date_field[0]}t"]
+    if not include_merges:
+        cmd.append("--no-merges")
+    if since:
+        cmd.extend(["--since", since])
+    if until:
+        cmd.extend(["--until", until])
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "git log failed")
+    order = []
+    strata: dict[str, list[str]] = defaultdict(list)
+    for line in result.stdout.splitlines():
+        sha, _, stamp = line.partition(" ")
+        when = dt.datetime.fromtimestamp(int(stamp), dt.timezone.utc)
+        strata[f"{when.year}-{when.month:02d}"].append(sha)
+        order.append(sha)
+    rng = random.Random(seed)
+    chosen: set[str] = set()
+    seen = 0
+    for label in sorted(strata):
+        shas = strata[label]
+        # Cumulative rounding keeps every month's share proportional and the total at
+        # fraction * commits, even when months are smaller than 1 / fraction.
+        take = round(fraction * (seen + len(shas))) - round(fraction * seen)
+        seen += len(shas)
+        chosen.update(rng.sample(shas, take))
+    return [sha for sha in order if sha in chosen], len(order), len(strata)
+
+
+def count_commits(
+    repo: str, since: str | None, until: str | None, include_merges: bool
+) -> int | None:
+    """Commits the log walk will visit, from `git rev-list --count` with the same filters."""
+    cmd = ["git", "-C", repo, "rev-list", "--count"]
+    if not include_merges:
+        cmd.append("--no-merges")
+    if since:
+        cmd.extend(["--since", since])
+    if until:
+        cmd.extend(["--until", until])
+    cmd.append("HEAD")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    try:
+        return int(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def current_rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # No current RSS outside Linux; fall back to the peak (bytes on macOS, KiB elsewhere).
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+def new_progress(mode: str, total: int | None, interval: float) -> dict[str, object]:
+    started = time.monotonic()
+    return {"mode": mode, "total": total, "interval": interval, "started": started, "last": started}
+
+
+def report_progress(
+    progress: dict[str, object],
+    commits: int,
+    touches: int,
+    cochange_pairs: int,
+    final: bool = False,
+) -> None:
+    """Print one progress record to stderr, at most once per interval unless final."""
+    now = time.monotonic()
+    if not final and now - progress["last"] < progress["interval"]:
+        return
+    progress["last"] = now
+    elapsed = max(now - progress["started"], 1e-9)
+    total = progress["total"]
+    commits_per_sec = commits / elapsed
+    eta = None
+    if total and commits_per_sec > 0 and not final:
+        eta = max(total - commits, 0) / commits_per_sec
+    rss = current_rss_bytes()
+    if progress["mode"] == "jsonl":
+        record = {
+            "event": "done" if final else "progress",
+            "commits": commits,
+            "total": total,
+            "elapsed_seconds": round(elapsed, 3),
+            "commits_per_sec": round(commits_per_sec, 1),
+            "touches": touches,
+            "touches_per_sec": round(touches / elapsed, 1),
+            "cochange_pairs": cochange_pairs,
+            "rss_bytes": rss,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+        print(json.dumps(record), file=sys.stderr, flush=True)
+        return
+    done = f"{commits}/{total}" if total else str(commits)
+    if total:
+        done += f" ({min(commits / total, 1.0):.1%})"
+    parts = [
+        f"{done} commits",
+        f"{commits_per_sec:.0f} commits/s",
+        f"{touches / elapsed:.0f} touches/s",
+        f"{cochange_pairs} cochange pairs",
+    ]
+    if rss is not None:
+        parts.append(f"rss {rss / (1 << 20):.0f} MiB")
+    if final:
+        parts.append(f"done in {format_duration(elapsed)}")
+    elif eta is not None:
+        parts.append(f"eta {format_duration(eta)}")
+    print("progress: " + ", ".join(parts), file=sys.stderr, flush=True)
+
+
+NUMSTAT_RE = re.compile(r"^(\d+|-)\t(\d+|-)\t(.*)$")
+
+GIT_QUOTE_ESCAPES = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13}
+
+
+def unquote_path(path: str) -> str:
+    """Undo git's C-style quoting of paths with special or non-ASCII bytes (core.quotePath).
+
+    ls-tree -z paths are never quoted, so log paths must be unquoted to share their keys.
+    community_maintainers.py imports this for its own git log fallback.
+    """
+    if len(path) < 2 or path[0] != '"' or path[-1] != '"':
+        return path
+    body = path[1:-1]
+    raw = bytearray()
+    idx = 0
+    while idx < len(body):
+        char = body[idx]
+        if char != "\\" or idx + 1 == len(body):
+            raw.extend(char.encode("utf-8"))
+            idx += 1
+        elif body[idx + 1] in "01234567":
+            raw.append(int(body[idx + 1 : idx + 4], 8))
+            idx += 4
+        else:
+            escaped = body[idx + 1]
+            raw.append(GIT_QUOTE_ESCAPES.get(escaped, ord(escaped)))
+            idx += 2
+    return raw.decode("utf-8", "replace")
+
+
+def iter_commits(
+    lines: Iterable[list[str]],
+) -> Iterable[tuple[dict[str, object], list[str], list[tuple[int, int]] | None]]:
+    """Yield (commit, files, line_changes); line_changes is None unless the log used --numstat.
+
+    Binary files report no line counts under --numstat and are recorded as (0, 0).
+    """
     for chunk in lines:
         if not chunk or chunk[0] != "---":
             continue
@@ -400,8 +1507,21 @@ def iter_commits(lines: Iterable[list[str]]) -> Iterable[tuple[dict[str, object]
             "committer_email": header[6],
             "committer_date": header[7],
         }
-        files = [line for line in chunk[9:] if line.strip()]
-        yield commit, files
+        files = []
+        line_changes = None
+        for line in chunk[9:]:
+            if not line.strip():
+                continue
+            numstat = NUMSTAT_RE.match(line)
+            if numstat:
+                added, deleted, line = numstat.groups()
+                if line_changes is None:
+                    line_changes = []
+                line_changes.append(
+                    (int(added) if added != "-" else 0, int(deleted) if deleted != "-" else 0)
+                )
+            files.append(unquote_path(line))
+        yield commit, files, line_changes
 
 
 def ensure_out_dir(path: str) -> Path:
@@ -410,6 +1530,9 @@ def ensure_out_dir(path: str) -> Path:
     return out_dir
 
 
+CHURN_COLUMNS = ["lines_added", "lines_deleted"]
+
+
 def write_csv(path: Path, header: list[str], rows: Iterable[list[str]]) -> None:
     with path.open("w", encoding="utf-8", newline="") as handle:
         writer = csv.writer(handle)
@@ -418,177 +1541,280 @@ def write_csv(path: Path, header: list[str], rows: Iterable[list[str]]) -> None:
             writer.writerow(row)
 
 
-def build_ownership_map(args: argparse.Namespace) -> Path:
-    now = dt.datetime.now(dt.timezone.utc)
-    rules = load_sensitive_rules(args.sensitive_config)
-    out_dir = ensure_out_dir(args.out)
-
-    people: dict[str, dict[str, object]] = {}
-    files: dict[str, dict[str, object]] = {}
-    edges: dict[tuple[str, str], dict[str, object]] = {}
-    file_people_touches: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
-    file_people_recency: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
-    file_people_sensitive: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
-    tag_totals: dict[str, float] = defaultdict(float)
-    tag_person_totals: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
-    person_timezone_counts: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
-    cochange_counts: dict[tuple[str, str], int] = defaultdict(int)
-    cochange_file_commits: dict[str, int] = defaultdict(int)
-    cochange_commits_used = 0
-    cochange_commits_skipped = 0
-    cochange_commits_filtered = 0
-    cochange_files_excluded = 0
+# Sharded tables: (shard key column, columns the rows are sorted by within every shard).
+SHARDED_TABLES = {
+    "edges": ("file_id", ["person_id", "file_id"]),
+    "cochange_edges": ("file_a", []),
+}
+SHARD_MANIFEST = "shards.json"
+# Artifacts only an exact build writes; an --approximate build removes them from --out.
+EXACT_ONLY_ARTIFACTS = (
+    "edges.csv",
+    "edges",
+    "cochange_edges.csv",
+    "cochange_edges",
+    "blame.csv",
+    "communities.json",
+    "community_files.csv",
+    "community_commits.json",
+    "cochange.graph.json",
+    "ownership.graph.json",
+    "cochange.graphml",
+    "ownership.graphml",
+    "cochange_bitmaps",
+    "neo4j-admin",
+    "windows",
+)
+
+
+def shard_index(key: str, shards: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % shards
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_sharded_csv(
+    out_dir: Path, name: str, header: list[str], rows: Iterable[list[str]], shards: int
+) -> dict[str, object]:
+    """Write <name>/part-NNNNN.csv shards and return the table's manifest entry."""
+    key_column, sorted_by = SHARDED_TABLES[name]
+    key_index = header.index(key_column)
+    buckets: list[list[list[str]]] = [[] for _ in range(shards)]
+    for row in rows:
+        buckets[shard_index(row[key_index], shards)].append(row)
+    table_dir = ensure_out_dir(str(out_dir / name))
+    for stale in table_dir.glob("part-*.csv"):
+        stale.unlink()
+    parts = []
+    for index, bucket in enumerate(buckets):
+        part = f"{name}/part-{index:05d}.csv"
+        write_csv(out_dir / part, header, bucket)
+        parts.append({"path": part, "rows": len(bucket), "sha256": file_sha256(out_dir / part)})
+    return {"key": key_column, "sorted_by": sorted_by, "shards": shards, "parts": parts}
+
+
+NEO4J_PROPERTY_TYPES = {
+    "first_seen": "datetime",
+    "last_seen": "datetime",
+    "commit_count": "int",
+    "touches": "int",
+    "sensitive_touches": "float",
+    "primary_tz_minutes": "int",
+    "bus_factor": "int",
+    "sensitivity_score": "float",
+    "sensitivity_tags": "string[]",
+    "truck_factor": "int",
+    "doa_authors": "string[]",
+    "recency_weight": "float",
+    "sensitive_weight": "float",
+    "lines_added": "int",
+    "lines_deleted": "int",
+    "cochange_count": "int",
+    "jaccard": "float",
+    "community_id": "int",
+}
+
+
+def neo4j_header(columns: list[str], id_columns: dict[str, str]) -> list[str]:
+    """Type each column for neo4j-admin; id_columns maps a column to its :ID/:START_ID/:END_ID."""
+    header = []
+    for column in columns:
+        if column in id_columns:
+            header.append(id_columns[column])
+        elif column in NEO4J_PROPERTY_TYPES:
+            header.append(f"{column}:{NEO4J_PROPERTY_TYPES[column]}")
+        else:
+            header.append(column)
+    return header
 
-    commits_path = out_dir / "commits.jsonl"
-    commit_handle = None
-    if args.emit_commits:
-        commit_handle = commits_path.open("w", encoding="utf-8")
 
-    total_commits_seen = 0
-    total_commits_included = 0
-    commits_excluded_identities = 0
-    commits_excluded_merges = 0
-    total_edges = 0
+def write_neo4j_admin(ownership_map: dict[str, object], out_dir: Path) -> None:
+    """Write node and relationship files for `neo4j-admin database import full`.
 
-    author_exclude_regexes = []
-    if not args.no_default_author_excludes:
-        author_exclude_regexes.extend(DEFAULT_AUTHOR_EXCLUDE_REGEXES)
-    author_exclude_regexes.extend(args.author_exclude_regex)
-    author_exclude_patterns = [
-        re.compile(pattern, re.IGNORECASE) for pattern in author_exclude_regexes
-    ]
+    Person and File ids live in separate ID spaces. Array values (sensitivity tags, labels)
+    use neo4j-admin's default `;` delimiter, and empty fields are imported as missing.
+    """
+    tables = ownership_map["tables"]
+    neo4j_dir = ensure_out_dir(str(out_dir / "neo4j-admin"))
 
-    cochange_excludes = []
-    if not args.no_default_cochange_excludes:
-        cochange_excludes.extend(DEFAULT_COCHANGE_EXCLUDES)
-    cochange_excludes.extend(args.cochange_exclude)
+    header, rows = tables["people"]
+    write_csv(
+        neo4j_dir / "people.csv",
+        neo4j_header(header, {"person_id": "id:ID(Person)"}) + [":LABEL"],
+        (row + ["Person"] for row in rows),
+    )
 
-    log_lines = run_git_log(args.repo, args.since, args.until, args.include_merges)
-    for commit, touched_files in iter_commits(log_lines):
-        total_commits_seen += 1
+    communities = dict(tables["community_files"][1]) if "community_files" in tables else {}
+    header, rows = tables["files"]
+    score_index = header.index("sensitivity_score")
+    write_csv(
+        neo4j_dir / "files.csv",
+        neo4j_header(header + ["community_id"], {"file_id": "id:ID(File)"}) + [":LABEL"],
+        (
+            row
+            + [communities.get(row[0], "")]
+            + ["File;Sensitive" if float(row[score_index]) > 0 else "File"]
+            for row in rows
+        ),
+    )
 
-        if commit.get("is_merge") and not args.include_merges:
-            commits_excluded_merges += 1
-            continue
+    header, rows = tables["edges"]
+    write_csv(
+        neo4j_dir / "touches.csv",
+        neo4j_header(header, {"person_id": ":START_ID(Person)", "file_id": ":END_ID(File)"})
+        + [":TYPE"],
+        (row + ["TOUCHES"] for row in rows),
+    )
 
-        identity_name = commit.get(f"{args.identity}_name", "")
-        identity_email = commit.get(f"{args.identity}_email", "")
-        if author_excluded(
-            identity_name,
-            identity_email,
-            author_exclude_patterns,
-        ):
-            commits_excluded_identities += 1
-            continue
+    if "cochange_edges" in tables:
+        header, rows = tables["cochange_edges"]
+        write_csv(
+            neo4j_dir / "cochanges.csv",
+            neo4j_header(header, {"file_a": ":START_ID(File)", "file_b": ":END_ID(File)"})
+            + [":TYPE"],
+            (row + ["COCHANGES"] for row in rows),
+        )
 
-        if not touched_files:
-            continue
 
-        total_commits_included += 1
-        if commit_handle:
-            commit_handle.write(json.dumps({**commit, "files": touched_files}) + "\n")
+def new_aggregate() -> dict[str, object]:
+    """Per-person, per-file and per-edge totals for one span of history."""
+    return {
+        "people": {},
+        "files": {},
+        "edges": {},
+        "file_people_touches": defaultdict(lambda: defaultdict(int)),
+        "file_people_recency": defaultdict(lambda: defaultdict(float)),
+        "file_people_sensitive": defaultdict(lambda: defaultdict(float)),
+        "file_people_churn": defaultdict(lambda: defaultdict(int)),
+        "tag_totals": defaultdict(float),
+        "tag_person_totals": defaultdict(lambda: defaultdict(float)),
+        "person_timezone_counts": defaultdict(lambda: defaultdict(int)),
+        "commits": 0,
+        "edges_total": 0,
+        "doa_authors": None,
+    }
 
-        identity_name = commit.get(f"{args.identity}_name", "")
-        identity_email = commit.get(f"{args.identity}_email", "") or identity_name
-        commit_date = parse_date(commit.get(f"{args.date_field}_date", ""))
-        recency = recency_weighted(now, commit_date, args.half_life_days)
-        tz_minutes = offset_minutes(commit_date)
-        if tz_minutes is not None:
-            person_timezone_counts[identity_email][tz_minutes] += 1
-        unique_files = sorted(set(touched_files))
-        if not args.no_cochange and len(unique_files) > 1:
-            if len(unique_files) > args.cochange_max_files:
-                cochange_commits_skipped += 1
-            else:
-                filtered_files = [
-                    path for path in unique_files if not is_excluded(path, cochange_excludes)
-                ]
-                excluded = len(unique_files) - len(filtered_files)
-                if excluded:
-                    cochange_files_excluded += excluded
-                if len(filtered_files) < 2:
-                    cochange_commits_filtered += 1
-                if filtered_files:
-                    for path in filtered_files:
-                        cochange_file_commits[path] += 1
-                if len(filtered_files) >= 2:
-                    cochange_commits_used += 1
-                    for idx, path in enumerate(filtered_files):
-                        for other in filtered_files[idx + 1 :]:
-                            cochange_counts[(path, other)] += 1
 
-        person = people.setdefault(
-            identity_email,
+def record_commit(
+    aggregate: dict[str, object],
+    identity_name: str,
+    identity_email: str,
+    commit_date: dt.datetime,
+    touched_files: list[str],
+    file_tags: list[dict[str, float]],
+    line_changes: list[tuple[int, int]] | None,
+    recency: float,
+    churn: bool,
+    churn_weight: bool,
+) -> dict[str, float]:
+    """Add one commit's touches and return its weight per sensitivity tag.
+
+    file_tags holds the sensitivity tags of each touched file.
+    """
+    people = aggregate["people"]
+    files = aggregate["files"]
+    edges = aggregate["edges"]
+    aggregate["commits"] += 1
+    tz_minutes = offset_minutes(commit_date)
+    if tz_minutes is not None:
+        aggregate["person_timezone_counts"][identity_email][tz_minutes] += 1
+
+    person = people.setdefault(
+        identity_email,
+        {
+            "name": identity_name,
+            "email": identity_email,
+            "first_seen": commit_date,
+            "last_seen": commit_date,
+            "commit_count": 0,
+            "touches": 0,
+            "sensitive_touches": 0.0,
+            "lines_added": 0,
+            "lines_deleted": 0,
+        },
+    )
+    person["commit_count"] = int(person["commit_count"]) + 1
+    person["first_seen"] = min(person["first_seen"], commit_date)
+    person["last_seen"] = max(person["last_seen"], commit_date)
+    commit_tag_weights: dict[str, float] = defaultdict(float)
+
+    for idx, path in enumerate(touched_files):
+        added, deleted = line_changes[idx] if line_changes else (0, 0)
+        file_entry = files.setdefault(
+            path,
             {
-                "name": identity_name,
-                "email": identity_email,
+                "path": path,
                 "first_seen": commit_date,
                 "last_seen": commit_date,
                 "commit_count": 0,
                 "touches": 0,
-                "sensitive_touches": 0.0,
+                "authors": set(),
+                "sensitive_tags": {},
+                "lines_added": 0,
+                "lines_deleted": 0,
             },
         )
-        person["commit_count"] = int(person["commit_count"]) + 1
-        person["first_seen"] = min(person["first_seen"], commit_date)
-        person["last_seen"] = max(person["last_seen"], commit_date)
-
-        for path in touched_files:
-            file_entry = files.setdefault(
-                path,
-                {
-                    "path": path,
-                    "first_seen": commit_date,
-                    "last_seen": commit_date,
-                    "commit_count": 0,
-                    "touches": 0,
-                    "authors": set(),
-                    "sensitive_tags": {},
-                },
-            )
-            file_entry["commit_count"] = int(file_entry["commit_count"]) + 1
-            file_entry["first_seen"] = min(file_entry["first_seen"], commit_date)
-            file_entry["last_seen"] = max(file_entry["last_seen"], commit_date)
-            file_entry["touches"] = int(file_entry["touches"]) + 1
-            file_entry["authors"].add(identity_email)
-
-            edge = edges.setdefault(
-                (identity_email, path),
-                {
-                    "touches": 0,
-                    "first_seen": commit_date,
-                    "last_seen": commit_date,
-                    "recency_weight": 0.0,
-                    "sensitive_weight": 0.0,
-                },
-            )
-            edge["touches"] = int(edge["touches"]) + 1
-            edge["first_seen"] = min(edge["first_seen"], commit_date)
-            edge["last_seen"] = max(edge["last_seen"], commit_date)
-            edge["recency_weight"] = float(edge["recency_weight"]) + recency
-
-            tags = match_sensitive(path, rules)
-            if tags:
-                file_entry["sensitive_tags"] = tags
-                sensitive_weight = sum(tags.values())
-                edge["sensitive_weight"] = float(edge["sensitive_weight"]) + sensitive_weight
-                person["sensitive_touches"] = float(person["sensitive_touches"]) + sensitive_weight
-                file_people_sensitive[path][identity_email] += sensitive_weight
-                for tag, weight in tags.items():
-                    tag_totals[tag] += weight
-                    tag_person_totals[tag][identity_email] += weight
-
-            person["touches"] = int(person["touches"]) + 1
-            file_people_touches[path][identity_email] += 1
-            file_people_recency[path][identity_email] += recency
-            total_edges += 1
-
-    if commit_handle:
-        commit_handle.close()
-
+        file_entry["commit_count"] = int(file_entry["commit_count"]) + 1
+        file_entry["first_seen"] = min(file_entry["first_seen"], commit_date)
+        file_entry["last_seen"] = max(file_entry["last_seen"], commit_date)
+        file_entry["touches"] = int(file_entry["touches"]) + 1
+        file_entry["authors"].add(identity_email)
+
+        edge = edges.setdefault(
+            (identity_email, path),
+            {
+                "touches": 0,
+                "first_seen": commit_date,
+                "last_seen": commit_date,
+                "recency_weight": 0.0,
+                "sensitive_weight": 0.0,
+                "lines_added": 0,
+                "lines_deleted": 0,
+            },
+        )
+        edge["touches"] = int(edge["touches"]) + 1
+        edge["first_seen"] = min(edge["first_seen"], commit_date)
+        edge["last_seen"] = max(edge["last_seen"], commit_date)
+        edge["recency_weight"] = float(edge["recency_weight"]) + recency
+        if churn:
+            for entry in (person, file_entry, edge):
+                entry["lines_added"] = int(entry["lines_added"]) + added
+                entry["lines_deleted"] = int(entry["lines_deleted"]) + deleted
+            aggregate["file_people_churn"][path][identity_email] += added + deleted
+
+        tags = file_tags[idx]
+        if tags:
+            file_entry["sensitive_tags"] = tags
+            # Scale by lines changed; binary and mode-only changes still count once.
+            scale = max(added + deleted, 1) if churn_weight else 1
+            sensitive_weight = sum(tags.values()) * scale
+            edge["sensitive_weight"] = float(edge["sensitive_weight"]) + sensitive_weight
+            person["sensitive_touches"] = float(person["sensitive_touches"]) + sensitive_weight
+            aggregate["file_people_sensitive"][path][identity_email] += sensitive_weight
+            for tag, weight in tags.items():
+                aggregate["tag_totals"][tag] += weight * scale
+                aggregate["tag_person_totals"][tag][identity_email] += weight * scale
+                commit_tag_weights[tag] += weight * scale
+
+        person["touches"] = int(person["touches"]) + 1
+        aggregate["file_people_touches"][path][identity_email] += 1
+        aggregate["file_people_recency"][path][identity_email] += recency
+        aggregate["edges_total"] += 1
+    return commit_tag_weights
+
+
+def people_table(
+    aggregate: dict[str, object], churn: bool
+) -> tuple[list[str], list[list[str]]]:
     people_rows = []
-    for email, person in sorted(people.items()):
-        tz_counts = person_timezone_counts.get(email, {})
+    for email, person in sorted(aggregate["people"].items()):
+        tz_counts = aggregate["person_timezone_counts"].get(email, {})
         primary_tz_offset = ""
         primary_tz_minutes = ""
         timezone_offsets = ""
@@ -616,11 +1842,29 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
                 primary_tz_offset,
                 primary_tz_minutes,
                 timezone_offsets,
+                *([str(person["lines_added"]), str(person["lines_deleted"])] if churn else []),
             ]
         )
+    header = [
+        "person_id",
+        "name",
+        "email",
+        "first_seen",
+        "last_seen",
+        "commit_count",
+        "touches",
+        "sensitive_touches",
+        "primary_tz_offset",
+        "primary_tz_minutes",
+        "timezone_offsets",
+    ]
+    return header + (CHURN_COLUMNS if churn else []), people_rows
 
+
+def files_table(aggregate: dict[str, object], churn: bool) -> tuple[list[str], list[list[str]]]:
+    doa_authors = file_authors(aggregate)
     file_rows = []
-    for path, file_entry in sorted(files.items()):
+    for path, file_entry in sorted(aggregate["files"].items()):
         authors = file_entry["authors"]
         bus_factor = len(authors)
         tags = file_entry["sensitive_tags"]
@@ -637,12 +1881,37 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
                 str(bus_factor),
                 f"{sensitivity_score:.2f}",
                 tag_list,
+                str(len(doa_authors[path])),
+                ";".join(doa_authors[path]),
+                *(
+                    [str(file_entry["lines_added"]), str(file_entry["lines_deleted"])]
+                    if churn
+                    else []
+                ),
             ]
         )
+    header = [
+        "file_id",
+        "path",
+        "first_seen",
+        "last_seen",
+        "commit_count",
+        "touches",
+        "bus_factor",
+        "sensitivity_score",
+        "sensitivity_tags",
+        "truck_factor",
+        "doa_authors",
+    ]
+    return header + (CHURN_COLUMNS if churn else []), file_rows
+
 
+def edges_table(
+    aggregate: dict[str, object], min_touches: int, churn: bool
+) -> tuple[list[str], list[list[str]]]:
     edge_rows = []
-    for (email, path), edge in edges.items():
-        if int(edge["touches"]) < args.min_touches:
+    for (email, path), edge in sorted(aggregate["edges"].items()):
+        if int(edge["touches"]) < min_touches:
             continue
         edge_rows.append(
             [
@@ -653,84 +1922,29 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
                 edge["first_seen"].isoformat(),
                 edge["last_seen"].isoformat(),
                 f"{edge['sensitive_weight']:.2f}",
+                *([str(edge["lines_added"]), str(edge["lines_deleted"])] if churn else []),
             ]
         )
+    header = [
+        "person_id",
+        "file_id",
+        "touches",
+        "recency_weight",
+        "first_seen",
+        "last_seen",
+        "sensitive_weight",
+    ]
+    return header + (CHURN_COLUMNS if churn else []), edge_rows
 
-    cochange_rows: list[list[str]] = []
-    if not args.no_cochange:
-        for (file_a, file_b), count in cochange_counts.items():
-            if count < args.cochange_min_count:
-                continue
-            commits_a = cochange_file_commits.get(file_a, 0)
-            commits_b = cochange_file_commits.get(file_b, 0)
-            denom = commits_a + commits_b - count
-            if denom <= 0:
-                continue
-            jaccard = count / denom
-            if jaccard < args.cochange_min_jaccard:
-                continue
-            cochange_rows.append([file_a, file_b, str(count), f"{jaccard:.6f}"])
-
-    write_csv(
-        out_dir / "people.csv",
-        [
-            "person_id",
-            "name",
-            "email",
-            "first_seen",
-            "last_seen",
-            "commit_count",
-            "touches",
-            "sensitive_touches",
-            "primary_tz_offset",
-            "primary_tz_minutes",
-            "timezone_offsets",
-        ],
-        people_rows,
-    )
-    write_csv(
-        out_dir / "files.csv",
-        [
-            "file_id",
-            "path",
-            "first_seen",
-            "last_seen",
-            "commit_count",
-            "touches",
-            "bus_factor",
-            "sensitivity_score",
-            "sensitivity_tags",
-        ],
-        file_rows,
-    )
-    write_csv(
-        out_dir / "edges.csv",
-        [
-            "person_id",
-            "file_id",
-            "touches",
-            "recency_weight",
-            "first_seen",
-            "last_seen",
-            "sensitive_weight",
-        ],
-        edge_rows,
-    )
-    if not args.no_cochange:
-        write_csv(
-            out_dir / "cochange_edges.csv",
-            [
-                "file_a",
-                "file_b",
-                "cochange_count",
-                "jaccard",
-            ],
-            cochange_rows,
-        )
 
+def security_findings(
+    aggregate: dict[str, object], now: dt.datetime, args: argparse.Namespace
+) -> tuple[list[dict[str, object]], list[dict[str, object]]]:
+    """Return (orphaned_sensitive_code, bus_factor_hotspots) as of now."""
     orphaned_sensitive_code = []
     bus_factor_hotspots = []
-    for path, file_entry in files.items():
+    file_people_touches = aggregate["file_people_touches"]
+    for path, file_entry in aggregate["files"].items():
         tags = file_entry["sensitive_tags"]
         if not tags:
             continue
@@ -756,27 +1970,1042 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
                         "last_security_touch": last_seen.isoformat(),
                     }
                 )
+    return orphaned_sensitive_code, bus_factor_hotspots
 
-    hidden_owners = []
-    for tag, total in tag_totals.items():
-        if total <= 0:
-            continue
-        person_totals = tag_person_totals[tag]
-        if not person_totals:
-            continue
-        top_email, top_value = max(person_totals.items(), key=lambda item: item[1])
-        share = top_value / total
-        if share >= args.owner_threshold:
-            person_name = people.get(top_email, {}).get("name", top_email)
-            hidden_owners.append(
+
+def repo_truck_factor(aggregate: dict[str, object]) -> dict[str, object]:
+    doa_authors = file_authors(aggregate)
+    value, authors = truck_factor(doa_authors.values())
+    return {
+        "truck_factor": value,
+        "authors": authors,
+        "files": len(doa_authors),
+        "orphaned_files": sum(1 for authors in doa_authors.values() if not authors),
+        "orphan_share": TRUCK_FACTOR_ORPHAN_SHARE,
+    }
+
+
+# Fields scaled up from a --sample walk; counts are rounded, weights are not.
+SAMPLE_SCALED_COUNTS = ("commit_count", "touches", "lines_added", "lines_deleted")
+SAMPLE_SCALED_WEIGHTS = ("sensitive_touches", "recency_weight", "sensitive_weight")
+SAMPLE_CONFIDENCE = 0.95
+SAMPLE_Z = 1.959964
+
+
+def scale_aggregate(aggregate: dict[str, object], factor: float) -> None:
+    """Scale a sampled aggregate's counts and weights up to full-history estimates.
+
+    Distinct counts (authors, bus factor) and the commits/edges_total run stats are left as
+    observed.
+    """
+    for entries in (aggregate["people"], aggregate["files"], aggregate["edges"]):
+        for entry in entries.values():
+            for field in SAMPLE_SCALED_COUNTS:
+                if field in entry:
+                    entry[field] = round(entry[field] * factor)
+            for field in SAMPLE_SCALED_WEIGHTS:
+                if field in entry:
+                    entry[field] *= factor
+    for name in ("file_people_touches", "file_people_churn", "person_timezone_counts"):
+        for counts in aggregate[name].values():
+            for key in counts:
+                counts[key] = round(counts[key] * factor)
+    for name in ("file_people_recency", "file_people_sensitive", "tag_person_totals"):
+        for weights in aggregate[name].values():
+            for key in weights:
+                weights[key] *= factor
+    for tag in aggregate["tag_totals"]:
+        aggregate["tag_totals"][tag] *= factor
+
+
+def share_interval(
+    share: float,
+    own_squares: float,
+    total_squares: float,
+    total: float,
+    sampled: int,
+    fraction: float,
+) -> list[float]:
+    """Normal-approximation interval for a ratio estimated from a commit sample.
+
+    share = Y / X over the sampled commits, where a commit contributes x to X and, when it is
+    the owner's, also to Y; own_squares and total_squares are the sums of x^2. Uses the
+    simple-random-sampling variance with finite population correction, which ignores the
+    gain from stratification and so errs wide.
+    """
+    if sampled < 2 or total <= 0:
+        return [0.0, 1.0]
+    spread = ((1 - share) ** 2 * own_squares + share**2 * (total_squares - own_squares)) / (
+        sampled - 1
+    )
+    half = SAMPLE_Z * math.sqrt(max(0.0, 1 - fraction) * sampled * spread) / total
+    return [round(max(0.0, share - half), 4), round(min(1.0, share + half), 4)]
+
+
+def chao1_interval(observed: int, singletons: int, doubletons: int) -> tuple[float, list[float]]:
+    """Bias-corrected Chao1 richness estimate with Chao's log-normal 95% interval.
+
+    observed is the number of distinct authors seen; singletons and doubletons count the
+    authors seen exactly once and twice. The interval never goes below observed.
+    """
+    unseen = singletons * (singletons - 1) / (2 * (doubletons + 1))
+    estimate = observed + unseen
+    if doubletons:
+        variance = (
+            unseen
+            + singletons * (2 * singletons - 1) ** 2 / (4 * (doubletons + 1) ** 2)
+            + singletons**2 * doubletons * (singletons - 1) ** 2 / (4 * (doubletons + 1) ** 4)
+        )
+    else:
+        variance = (
+            singletons * (singletons - 1) / 2
+            + singletons * (2 * singletons - 1) ** 2 / 4
+            - singletons**4 / (4 * estimate)
+        )
+    if unseen <= 0 or variance <= 0:
+        return estimate, [float(observed), float(observed)]
+    spread = math.exp(SAMPLE_Z * math.sqrt(math.log(1 + variance / unseen**2)))
+    return estimate, [round(observed + unseen / spread, 2), round(observed + unseen * spread, 2)]
+
+
+def sample_intervals(
+    summary: dict[str, object],
+    aggregate: dict[str, object],
+    sample_touches: dict[str, dict[str, int]],
+    tag_squares: dict[str, float],
+    tag_person_squares: dict[str, dict[str, float]],
+    sampled: int,
+    total: int,
+    bus_factor_threshold: int,
+) -> int:
+    """Attach confidence intervals to hotspots and hidden owners; count uncertain hotspots.
+
+    sample_touches holds each sensitive file's unscaled touches per person. aggregate has
+    already been scaled by total / sampled, so tag totals are scaled back down.
+    """
+    fraction = sampled / total
+    scale = total / sampled
+    for hotspot in (*summary["bus_factor_hotspots"], *summary["orphaned_sensitive_code"]):
+        touches_by_person = sample_touches.get(hotspot["path"], {})
+        touches = sum(touches_by_person.values())
+        owner_touches = touches_by_person.get(hotspot["top_owner"], 0)
+        share = owner_touches / touches if touches else 0.0
+        # Each commit touches a file at most once, so x^2 = x and the sums of squares are
+        # the touch counts themselves.
+        hotspot["top_owner_share"] = round(share, 4)
+        hotspot["top_owner_share_ci"] = share_interval(
+            share, owner_touches, touches, touches, sampled, fraction
+        )
+        # The sample only sees a subset of a file's authors, so bus_factor is a lower bound.
+        observed = len(touches_by_person)
+        counts = list(touches_by_person.values())
+        estimate, interval = chao1_interval(observed, counts.count(1), counts.count(2))
+        # Chao1 has nothing to extrapolate from on thinly sampled files, so also flag files
+        # where an extra author as active as the average seen one would be missed >= 5% of
+        # the time.
+        missed = (1 - 1 / (observed + 1)) ** touches
+        hotspot["sampled_touches"] = touches
+        hotspot["bus_factor_estimate"] = round(estimate, 2)
+        hotspot["bus_factor_ci"] = interval
+        hotspot["bus_factor_uncertain"] = (
+            interval[1] > bus_factor_threshold or missed >= 1 - SAMPLE_CONFIDENCE
+        )
+    for owner in summary["hidden_owners"]:
+        tag = owner["category"]
+        owner["share_ci"] = share_interval(
+            owner["share"],
+            tag_person_squares[tag][owner["person"]],
+            tag_squares[tag],
+            aggregate["tag_totals"][tag] / scale,
+            sampled,
+            fraction,
+        )
+    return sum(1 for hotspot in summary["bus_factor_hotspots"] if hotspot["bus_factor_uncertain"])
+
+
+HLL_MIN_PRECISION = 4
+HLL_MAX_PRECISION = 10
+# Ranks come from the hash bits above the widest register index, so folding keeps them valid.
+HLL_INDEX_BITS = 16
+HLL_RANK_BITS = 48
+COUNT_MIN_DEPTH = 4
+COUNT_MIN_SHARE = 0.25
+COUNT_MIN_SKETCHES = (
+    "file_person_touches",
+    "dir_person_touches",
+    "tag_person_touches",
+    "tag_person_weight",
+)
+
+
+def sketch_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def hll_add(registers: bytearray, hashed: int) -> None:
+    rank = HLL_RANK_BITS + 1 - (hashed >> HLL_INDEX_BITS).bit_length()
+    index = hashed & (len(registers) - 1)
+    if registers[index] < rank:
+        registers[index] = rank
+
+
+def hll_fold(registers: bytearray) -> bytearray:
+    """Halve the precision; registers j and j + m/2 share the low index bits."""
+    half = len(registers) // 2
+    return bytearray(map(max, registers[:half], registers[half:]))
+
+
+def hll_estimate(registers: bytearray) -> float:
+    m = len(registers)
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    estimate = alpha * m * m / sum(2.0**-rank for rank in registers)
+    zeros = registers.count(0)
+    if zeros and estimate <= 2.5 * m:
+        # Linear counting keeps small author counts (bus factor 1-3) essentially exact.
+        return m * math.log(m / zeros)
+    return estimate
+
+
+def count_min_slots(key: str, width: int) -> list[int]:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], "little")
+    second = int.from_bytes(digest[8:], "little") | 1
+    return [row * width + (first + row * second) % width for row in range(COUNT_MIN_DEPTH)]
+
+
+def count_min_add(sketch: dict[str, object], slots: list[int], value: float) -> float:
+    """Add value under the key's slots and return the key's new estimate."""
+    counts = sketch["counts"]
+    for slot in slots:
+        counts[slot] += value
+    sketch["total"] += value
+    return min(counts[slot] for slot in slots)
+
+
+def count_min_estimate(sketch: dict[str, object], slots: list[int]) -> float:
+    counts = sketch["counts"]
+    return min(counts[slot] for slot in slots)
+
+
+def offer_top(top: dict[str, float], key: str, estimate: float, size: int) -> None:
+    """Keep the size keys with the highest running estimates (Count-Min heavy hitters)."""
+    if key in top or len(top) < size:
+        top[key] = estimate
+        return
+    lowest = min(top, key=top.get)
+    if estimate > top[lowest]:
+        del top[lowest]
+        top[key] = estimate
+
+
+def new_sketches(args: argparse.Namespace) -> dict[str, object]:
+    """Stand-in for new_aggregate used by --approximate.
+
+    Only the HyperLogLog registers and Count-Min counters are held to --sketch-memory. People,
+    files and directories still get one small entry each, so memory grows with their count but
+    no longer with the number of person-file edges.
+    """
+    budget = int(args.sketch_memory * (1 << 20))
+    width = max(
+        1, int(budget * COUNT_MIN_SHARE) // (len(COUNT_MIN_SKETCHES) * COUNT_MIN_DEPTH * 8)
+    )
+    depths = {int(entry) for entry in args.dir_depths.split(",") if entry.strip()}
+    return {
+        "people": {},
+        "files": {},
+        "dirs": {},
+        "person_hashes": {},
+        "person_timezone_counts": defaultdict(lambda: defaultdict(int)),
+        "tag_totals": defaultdict(float),
+        "count_min": {
+            name: {"counts": array("d", bytes(8 * width * COUNT_MIN_DEPTH)), "total": 0.0}
+            for name in COUNT_MIN_SKETCHES
+        },
+        "width": width,
+        "register_budget": budget - len(COUNT_MIN_SKETCHES) * COUNT_MIN_DEPTH * width * 8,
+        "precision": HLL_MAX_PRECISION,
+        "folds": 0,
+        "dir_depths": sorted(depths),
+        "dir_top_owners": args.dir_top_owners,
+        "commits": 0,
+        "edges_total": 0,
+    }
+
+
+def sketch_registers(sketches: dict[str, object]) -> bytearray:
+    """Return empty registers for a new file or dir, folding every sketch if over budget."""
+    keys = len(sketches["files"]) + len(sketches["dirs"]) + 1
+    while (
+        keys << sketches["precision"] > sketches["register_budget"]
+        and sketches["precision"] > HLL_MIN_PRECISION
+    ):
+        for entry in (*sketches["files"].values(), *sketches["dirs"].values()):
+            entry["registers"] = hll_fold(entry["registers"])
+        sketches["precision"] -= 1
+        sketches["folds"] += 1
+    return bytearray(1 << sketches["precision"])
+
+
+def record_sketch_commit(
+    sketches: dict[str, object],
+    identity_name: str,
+    identity_email: str,
+    commit_date: dt.datetime,
+    touched_files: list[str],
+    file_tags: list[dict[str, float]],
+    line_changes: list[tuple[int, int]] | None,
+    churn: bool,
+    churn_weight: bool,
+) -> None:
+    """record_commit for --approximate: no per-edge state, author sets and splits are sketched."""
+    people = sketches["people"]
+    files = sketches["files"]
+    dirs = sketches["dirs"]
+    count_min = sketches["count_min"]
+    width = sketches["width"]
+    top_size = sketches["dir_top_owners"]
+    sketches["commits"] += 1
+    tz_minutes = offset_minutes(commit_date)
+    if tz_minutes is not None:
+        sketches["person_timezone_counts"][identity_email][tz_minutes] += 1
+
+    person = people.setdefault(
+        identity_email,
+        {
+            "name": identity_name,
+            "email": identity_email,
+            "first_seen": commit_date,
+            "last_seen": commit_date,
+            "commit_count": 0,
+            "touches": 0,
+            "sensitive_touches": 0.0,
+            "lines_added": 0,
+            "lines_deleted": 0,
+        },
+    )
+    person["commit_count"] = int(person["commit_count"]) + 1
+    person["first_seen"] = min(person["first_seen"], commit_date)
+    person["last_seen"] = max(person["last_seen"], commit_date)
+    hashed = sketches["person_hashes"].get(identity_email)
+    if hashed is None:
+        hashed = sketches["person_hashes"][identity_email] = sketch_hash(identity_email)
+
+    for idx, path in enumerate(touched_files):
+        added, deleted = line_changes[idx] if line_changes else (0, 0)
+        file_entry = files.get(path)
+        if file_entry is None:
+            file_entry = files[path] = {
+                "path": path,
+                "first_seen": commit_date,
+                "last_seen": commit_date,
+                "commit_count": 0,
+                "touches": 0,
+                "sensitive_tags": {},
+                "sensitive_weight": 0.0,
+                "lines_added": 0,
+                "lines_deleted": 0,
+                "registers": sketch_registers(sketches),
+                "top": {},
+                "dirs": [],
+            }
+            parts = path.split("/")[:-1]
+            for depth in sketches["dir_depths"]:
+                if depth > len(parts):
+                    break
+                name = "/".join(parts[:depth]) or "."
+                dir_entry = dirs.get(name)
+                if dir_entry is None:
+                    dir_entry = dirs[name] = {
+                        "dir": name,
+                        "depth": depth,
+                        "files": 0,
+                        "touches": 0,
+                        "sensitive_weight": 0.0,
+                        "registers": sketch_registers(sketches),
+                        "top": {},
+                    }
+                dir_entry["files"] += 1
+                file_entry["dirs"].append(dir_entry)
+        file_entry["commit_count"] = int(file_entry["commit_count"]) + 1
+        file_entry["first_seen"] = min(file_entry["first_seen"], commit_date)
+        file_entry["last_seen"] = max(file_entry["last_seen"], commit_date)
+        file_entry["touches"] = int(file_entry["touches"]) + 1
+        hll_add(file_entry["registers"], hashed)
+        estimate = count_min_add(
+            count_min["file_person_touches"], count_min_slots(f"{path}\0{identity_email}", width), 1
+        )
+        offer_top(file_entry["top"], identity_email, estimate, 1)
+        if churn:
+            for entry in (person, file_entry):
+                entry["lines_added"] = int(entry["lines_added"]) + added
+                entry["lines_deleted"] = int(entry["lines_deleted"]) + deleted
+
+        tags = file_tags[idx]
+        sensitive_weight = 0.0
+        if tags:
+            file_entry["sensitive_tags"] = tags
+            scale = max(added + deleted, 1) if churn_weight else 1
+            sensitive_weight = sum(tags.values()) * scale
+            file_entry["sensitive_weight"] += sensitive_weight
+            person["sensitive_touches"] = float(person["sensitive_touches"]) + sensitive_weight
+            for tag, weight in tags.items():
+                slots = count_min_slots(f"{tag}\0{identity_email}", width)
+                sketches["tag_totals"][tag] += weight * scale
+                count_min_add(count_min["tag_person_touches"], slots, 1)
+                count_min_add(count_min["tag_person_weight"], slots, weight * scale)
+
+        for dir_entry in file_entry["dirs"]:
+            dir_entry["touches"] += 1
+            dir_entry["sensitive_weight"] += sensitive_weight
+            hll_add(dir_entry["registers"], hashed)
+            estimate = count_min_add(
+                count_min["dir_person_touches"],
+                count_min_slots(f"{dir_entry['dir']}\0{identity_email}", width),
+                1,
+            )
+            offer_top(dir_entry["top"], identity_email, estimate, top_size)
+
+        person["touches"] = int(person["touches"]) + 1
+        sketches["edges_total"] += 1
+
+
+def sketch_tables(
+    sketches: dict[str, object], churn: bool
+) -> dict[str, tuple[list[str], list[list[str]]]]:
+    """people, files and dirs tables from sketches; bus_factor and authors are estimates."""
+    people_header, people_rows = people_table(sketches, churn)
+    file_rows = []
+    for path, file_entry in sorted(sketches["files"].items()):
+        tags = file_entry["sensitive_tags"]
+        file_rows.append(
+            [
+                path,
+                path,
+                file_entry["first_seen"].isoformat(),
+                file_entry["last_seen"].isoformat(),
+                str(file_entry["commit_count"]),
+                str(file_entry["touches"]),
+                str(max(1, round(hll_estimate(file_entry["registers"])))),
+                f"{sum(tags.values()) if tags else 0.0:.2f}",
+                ";".join(sorted(tags)),
+                *(
+                    [str(file_entry["lines_added"]), str(file_entry["lines_deleted"])]
+                    if churn
+                    else []
+                ),
+            ]
+        )
+    dir_rows = []
+    for dir_entry in sorted(
+        sketches["dirs"].values(),
+        key=lambda entry: tuple(entry["dir"].split("/")) if entry["depth"] else (),
+    ):
+        touches = dir_entry["touches"]
+        ranked = sorted(dir_entry["top"].items(), key=lambda item: (-item[1], item[0]))
+        dir_rows.append(
+            [
+                dir_entry["dir"],
+                str(dir_entry["depth"]),
+                str(dir_entry["files"]),
+                str(touches),
+                str(max(1, round(hll_estimate(dir_entry["registers"])))),
+                f"{dir_entry['sensitive_weight']:.2f}",
+                ";".join(f"{person}:{int(count)}" for person, count in ranked),
+                f"{min(ranked[0][1] / touches, 1.0) if ranked else 0.0:.4f}",
+            ]
+        )
+    files_header = [
+        "file_id",
+        "path",
+        "first_seen",
+        "last_seen",
+        "commit_count",
+        "touches",
+        "bus_factor",
+        "sensitivity_score",
+        "sensitivity_tags",
+    ]
+    dirs_header = [
+        "dir",
+        "depth",
+        "files",
+        "touches",
+        "authors",
+        "sensitive_weight",
+        "top_owners",
+        "top_owner_share",
+    ]
+    return {
+        "people": (people_header, people_rows),
+        "files": (files_header + (CHURN_COLUMNS if churn else []), file_rows),
+        "dirs": (dirs_header, dir_rows),
+    }
+
+
+def sketch_tag_rollups(sketches: dict[str, object]) -> dict[str, dict[str, object]]:
+    """compute_tag_rollups from sketches; per-person touches and weights are estimates."""
+    count_min = sketches["count_min"]
+    rollups: dict[str, dict[str, object]] = {}
+    for tag, total in sketches["tag_totals"].items():
+        tag_people = []
+        for person_id, person in sorted(sketches["people"].items()):
+            slots = count_min_slots(f"{tag}\0{person_id}", sketches["width"])
+            touches = count_min_estimate(count_min["tag_person_touches"], slots)
+            if touches <= 0:
+                continue
+            tag_people.append(
                 {
-                    "person": top_email,
-                    "name": person_name,
-                    "controls": f"{share * 100:.0f}% of {tag} code",
-                    "category": tag,
-                    "share": round(share, 4),
+                    "person_id": person_id,
+                    "name": person["name"],
+                    "email": person_id,
+                    "touches": int(touches),
+                    "sensitive_weight": count_min_estimate(count_min["tag_person_weight"], slots),
                 }
             )
+        tag_people.sort(key=lambda item: item["touches"], reverse=True)
+        tag_files = [
+            {
+                "file_id": path,
+                "path": path,
+                "touches": file_entry["touches"],
+                "bus_factor": max(1, round(hll_estimate(file_entry["registers"]))),
+            }
+            for path, file_entry in sorted(sketches["files"].items())
+            if tag in file_entry["sensitive_tags"]
+        ]
+        tag_files.sort(key=lambda item: item["touches"], reverse=True)
+        rollups[tag] = {
+            "total_weight": total,
+            "file_count": len(tag_files),
+            "people": tag_people,
+            "files": tag_files,
+        }
+    return rollups
+
+
+def sketch_findings(
+    sketches: dict[str, object], now: dt.datetime, args: argparse.Namespace
+) -> tuple[list[dict[str, object]], list[dict[str, object]]]:
+    """security_findings from sketches; bus factor is estimated, top_owner is the heavy hitter."""
+    orphaned_sensitive_code = []
+    bus_factor_hotspots = []
+    for path, file_entry in sketches["files"].items():
+        tags = file_entry["sensitive_tags"]
+        if not tags:
+            continue
+        bus_factor = max(1, round(hll_estimate(file_entry["registers"])))
+        last_seen = file_entry["last_seen"]
+        hotspot = {
+            "path": path,
+            "bus_factor": bus_factor,
+            "last_touch": last_seen.isoformat(),
+            "sensitivity_tags": sorted(tags.keys()),
+            "top_owner": next(iter(file_entry["top"]), None),
+        }
+        if bus_factor <= args.bus_factor_threshold:
+            bus_factor_hotspots.append(hotspot)
+            if (now - last_seen).days >= args.stale_days:
+                orphaned_sensitive_code.append(
+                    {**hotspot, "last_security_touch": last_seen.isoformat()}
+                )
+    return orphaned_sensitive_code, bus_factor_hotspots
+
+
+def sketch_error_bounds(sketches: dict[str, object]) -> dict[str, object]:
+    """Sketch sizes and error bounds recorded in summary.json under "approximate"."""
+    registers = 1 << sketches["precision"]
+    keys = len(sketches["files"]) + len(sketches["dirs"])
+    width = sketches["width"]
+    epsilon = math.e / width
+    count_min_bytes = len(COUNT_MIN_SKETCHES) * COUNT_MIN_DEPTH * width * 8
+    return {
+        "sketch_bytes": keys * registers + count_min_bytes,
+        "over_budget": keys * registers > sketches["register_budget"],
+        # --sketch-memory bounds sketch_bytes only; these entries grow with the repo.
+        "tracked": {
+            "people": len(sketches["people"]),
+            "files": len(sketches["files"]),
+            "dirs": len(sketches["dirs"]),
+        },
+        "hyperloglog": {
+            "precision": sketches["precision"],
+            "registers": registers,
+            "folds": sketches["folds"],
+            "relative_standard_error": round(1.04 / math.sqrt(registers), 4),
+            "estimates": ["files.bus_factor", "dirs.authors", "tags.files.bus_factor"],
+        },
+        "count_min": {
+            "width": width,
+            "depth": COUNT_MIN_DEPTH,
+            "epsilon": epsilon,
+            "delta": round(math.exp(-COUNT_MIN_DEPTH), 4),
+            "max_overcount": {
+                name: round(epsilon * sketch["total"], 4)
+                for name, sketch in sketches["count_min"].items()
+            },
+            "estimates": [
+                "summary.bus_factor_hotspots.top_owner",
+                "dirs.top_owners",
+                "tags.people.touches",
+                "tags.people.sensitive_weight",
+            ],
+        },
+    }
+
+
+def parse_windows(value: str) -> list[tuple[str, dt.datetime, dt.datetime]]:
+    windows = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        start_text, sep, end_text = entry.partition("..")
+        if not sep:
+            raise ValueError(f"Window must look like START..END: {entry}")
+        start, end = parse_date(start_text), parse_date(end_text)
+        if end <= start:
+            raise ValueError(f"Window ends before it starts: {entry}")
+        windows.append((entry.replace(":", ""), start, end))
+    return windows
+
+
+def period_window(
+    commit_date: dt.datetime, period: str
+) -> tuple[str, dt.datetime, dt.datetime]:
+    """Return the (label, start, end) calendar window in UTC containing commit_date."""
+    when = commit_date.astimezone(dt.timezone.utc)
+    if period == "year":
+        start = dt.datetime(when.year, 1, 1, tzinfo=dt.timezone.utc)
+        return str(when.year), start, start.replace(year=when.year + 1)
+    if period == "quarter":
+        first_month = (when.month - 1) // 3 * 3 + 1
+        label = f"{when.year}-Q{(when.month - 1) // 3 + 1}"
+        months = 3
+    else:
+        first_month = when.month
+        label = f"{when.year}-{when.month:02d}"
+        months = 1
+    start = dt.datetime(when.year, first_month, 1, tzinfo=dt.timezone.utc)
+    next_month = first_month - 1 + months
+    end = dt.datetime(when.year + next_month // 12, next_month % 12 + 1, 1, tzinfo=dt.timezone.utc)
+    return label, start, end
+
+
+def window_map(
+    aggregate: dict[str, object],
+    label: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    now: dt.datetime,
+    args: argparse.Namespace,
+    churn: bool,
+) -> dict[str, object]:
+    """Tables, tag rollups and summary for one window, judged as of its end."""
+    as_of = min(end, now)
+    tables = {
+        "people": people_table(aggregate, churn),
+        "files": files_table(aggregate, churn),
+        "edges": edges_table(aggregate, args.min_touches, churn),
+    }
+    tag_rollups = compute_tag_rollups(
+        aggregate["people"],
+        aggregate["files"],
+        aggregate["edges"],
+        aggregate["tag_totals"],
+        aggregate["tag_person_totals"],
+        args.min_touches,
+    )
+    orphaned_sensitive_code, bus_factor_hotspots = security_findings(aggregate, as_of, args)
+    summary = {
+        "generated_at": now.isoformat(),
+        "repo": os.path.abspath(args.repo),
+        "window": {"label": label, "since": start.isoformat(), "until": end.isoformat()},
+        "orphaned_sensitive_code": orphaned_sensitive_code,
+        "hidden_owners": compute_hidden_owners(tag_rollups, args.owner_threshold),
+        "bus_factor_hotspots": bus_factor_hotspots,
+        "truck_factor": repo_truck_factor(aggregate),
+        "stats": {
+            "commits": aggregate["commits"],
+            "edges": aggregate["edges_total"],
+            "people": len(aggregate["people"]),
+            "files": len(aggregate["files"]),
+        },
+    }
+    return {"tables": tables, "tags": tag_rollups, "summary": summary}
+
+
+def compute_ownership_map(
+    args: argparse.Namespace, keep_commits: bool = False
+) -> dict[str, object]:
+    """Walk git history and return the ownership map in memory.
+
+    Only the opt-in commit artifacts (--emit-commits, --emit-commit-store) are streamed to
+    args.out during the walk; write_ownership_map persists everything else. With
+    keep_commits the included commits are also returned, shaped like commits.jsonl rows.
+    """
+    now = dt.datetime.now(dt.timezone.utc)
+    if args.approximate:
+        exact_only = [
+            flag
+            for flag, enabled in (
+                ("--windows", args.windows),
+                ("--window-period", args.window_period),
+                ("--blame", args.blame),
+                ("--graphml", args.graphml),
+                ("--neo4j-admin", args.neo4j_admin),
+                ("--cochange-bitmaps", args.cochange_bitmaps),
+            )
+            if enabled
+        ]
+        if exact_only:
+            raise RuntimeError(f"--approximate cannot be combined with {', '.join(exact_only)}")
+        # Co-change pairs and communities need exact per-commit and per-edge state.
+        args = argparse.Namespace(**{**vars(args), "no_cochange": True, "communities": False})
+    if args.sample is not None:
+        if not 0 < args.sample <= 1:
+            raise RuntimeError("--sample must be a fraction in (0, 1]")
+        full_history_only = [
+            flag
+            for flag, enabled in (
+                ("--approximate", args.approximate),
+                ("--cochange-bitmaps", args.cochange_bitmaps),
+                ("--emit-commits", args.emit_commits),
+                ("--emit-commit-store", args.emit_commit_store),
+            )
+            if enabled
+        ]
+        if full_history_only:
+            raise RuntimeError(f"--sample cannot be combined with {', '.join(full_history_only)}")
+    rules = load_sensitive_rules(args.sensitive_config)
+    out_dir = Path(args.out)
+    tree: dict[str, str] | None = None
+    content_tags: dict[str, dict[str, float]] = {}
+    content_scanned = content_cache_hits = 0
+    if args.scan_content:
+        tree = list_tree_blobs(args.repo)
+        content_tags, content_scanned, content_cache_hits = classify_contents(
+            args.repo,
+            tree,
+            load_content_rules(args.content_config),
+            out_dir / ".cache" / "content.pickle",
+            args.content_workers,
+            args.content_max_bytes,
+        )
+    if args.emit_commits or args.emit_commit_store:
+        ensure_out_dir(args.out)
+
+    aggregate = new_aggregate()
+    sketches = new_sketches(args) if args.approximate else None
+    churn = args.churn or args.sensitive_weight == "churn"
+    churn_weight = args.sensitive_weight == "churn"
+    # Sensitivity is classified once per path and shared by the full map and every window.
+    path_tags: dict[str, dict[str, float]] = {}
+    explicit_windows = parse_windows(args.windows) if args.windows else []
+    # Explicit windows are always written, with zero counts when no commit falls inside them;
+    # --window-period windows only exist for periods that saw a commit.
+    window_aggregates: dict[str, dict[str, object]] = {
+        label: new_aggregate() for label, _, _ in explicit_windows
+    }
+    window_bounds: dict[str, tuple[dt.datetime, dt.datetime]] = {
+        label: (start, end) for label, start, end in explicit_windows
+    }
+    cochange_counts: dict[tuple[str, str], int] = defaultdict(int)
+    cochange_file_commits: dict[str, int] = defaultdict(int)
+    # Ordinals of the commits counted in cochange_file_commits, per file, for --cochange-bitmaps.
+    cochange_commit_ids: dict[str, array] = defaultdict(lambda: array("I"))
+    cochange_commit_ordinal = 0
+    cochange_commits_used = 0
+    cochange_commits_skipped = 0
+    cochange_commits_filtered = 0
+    cochange_files_excluded = 0
+
+    commits_path = out_dir / "commits.jsonl"
+    commit_handle = None
+    if args.emit_commits:
+        commit_handle = commits_path.open("wb")
+    # Byte offset and timestamp of every commits.jsonl row, plus the row ordinals touching each
+    # file, so the time and community indexes can point readers straight at the relevant rows.
+    index_commits = bool(commit_handle) and args.communities
+    commit_offsets = array("Q")
+    commit_times = array("q")
+    file_commit_rows: dict[str, array] = defaultdict(lambda: array("I"))
+    commits_bytes = 0
+    commit_store = new_commit_store() if args.emit_commit_store else None
+    kept_commits: list[dict[str, object]] | None = [] if keep_commits else None
+
+    total_commits_seen = 0
+    total_commits_included = 0
+    commits_excluded_identities = 0
+    commits_excluded_merges = 0
+
+    author_exclude_regexes = []
+    if not args.no_default_author_excludes:
+        author_exclude_regexes.extend(DEFAULT_AUTHOR_EXCLUDE_REGEXES)
+    author_exclude_regexes.extend(args.author_exclude_regex)
+    author_exclude_patterns = [
+        re.compile(pattern, re.IGNORECASE) for pattern in author_exclude_regexes
+    ]
+
+    cochange_excludes = []
+    if not args.no_default_cochange_excludes:
+        cochange_excludes.extend(DEFAULT_COCHANGE_EXCLUDES)
+    cochange_excludes.extend(args.cochange_exclude)
+
+    revisions = None
+    if args.sample is not None:
+        revisions, sample_total, sample_strata = sample_commits(
+            args.repo,
+            args.since,
+            args.until,
+            args.include_merges,
+            args.date_field,
+            args.sample,
+            args.sample_seed,
+        )
+        if not revisions:
+            raise RuntimeError("--sample selected no commits; use a larger fraction")
+        # Per-commit sums of squared tag weight, for the hidden owner share intervals.
+        tag_squares: dict[str, float] = defaultdict(float)
+        tag_person_squares: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    progress = None
+    if args.progress:
+        progress = new_progress(
+            args.progress,
+            (
+                len(revisions)
+                if revisions is not None
+                else count_commits(args.repo, args.since, args.until, args.include_merges)
+            ),
+            args.progress_interval,
+        )
+    log_lines = run_git_log(
+        args.repo, args.since, args.until, args.include_merges, churn, revisions
+    )
+    for commit, touched_files, line_changes in iter_commits(log_lines):
+        if progress is not None:
+            report_progress(
+                progress,
+                total_commits_seen,
+                (sketches or aggregate)["edges_total"],
+                len(cochange_counts),
+            )
+        total_commits_seen += 1
+
+        if commit.get("is_merge") and not args.include_merges:
+            commits_excluded_merges += 1
+            continue
+
+        identity_name = commit.get(f"{args.identity}_name", "")
+        identity_email = commit.get(f"{args.identity}_email", "")
+        if author_excluded(
+            identity_name,
+            identity_email,
+            author_exclude_patterns,
+        ):
+            commits_excluded_identities += 1
+            continue
+
+        if not touched_files:
+            continue
+
+        total_commits_included += 1
+        identity_name = commit.get(f"{args.identity}_name", "")
+        identity_email = commit.get(f"{args.identity}_email", "") or identity_name
+        commit_date = parse_date(commit.get(f"{args.date_field}_date", ""))
+
+        if commit_handle:
+            if index_commits:
+                for path in set(touched_files):
+                    file_commit_rows[path].append(len(commit_offsets))
+            commit_offsets.append(commits_bytes)
+            commit_times.append(int(commit_date.timestamp()))
+            line = (json.dumps({**commit, "files": touched_files}) + "\n").encode("utf-8")
+            commit_handle.write(line)
+            commits_bytes += len(line)
+        if commit_store is not None:
+            append_commit_store(commit_store, commit, touched_files)
+        if kept_commits is not None:
+            kept_commits.append({**commit, "files": touched_files})
+
+        unique_files = sorted(set(touched_files))
+        if not args.no_cochange and len(unique_files) > 1:
+            if len(unique_files) > args.cochange_max_files:
+                cochange_commits_skipped += 1
+            else:
+                filtered_files = [
+                    path for path in unique_files if not is_excluded(path, cochange_excludes)
+                ]
+                excluded = len(unique_files) - len(filtered_files)
+                if excluded:
+                    cochange_files_excluded += excluded
+                if len(filtered_files) < 2:
+                    cochange_commits_filtered += 1
+                if filtered_files:
+                    for path in filtered_files:
+                        cochange_file_commits[path] += 1
+                        if args.cochange_bitmaps:
+                            cochange_commit_ids[path].append(cochange_commit_ordinal)
+                    cochange_commit_ordinal += 1
+                if len(filtered_files) >= 2:
+                    cochange_commits_used += 1
+                    for idx, path in enumerate(filtered_files):
+                        for other in filtered_files[idx + 1 :]:
+                            cochange_counts[(path, other)] += 1
+
+        file_tags = []
+        for path in touched_files:
+            tags = path_tags.get(path)
+            if tags is None:
+                tags = path_tags[path] = match_sensitive(path, rules)
+                for tag, weight in content_tags.get(path, {}).items():
+                    tags[tag] = max(tags[tag], weight)
+            file_tags.append(tags)
+        if sketches is not None:
+            record_sketch_commit(
+                sketches,
+                identity_name,
+                identity_email,
+                commit_date,
+                touched_files,
+                file_tags,
+                line_changes,
+                churn,
+                churn_weight,
+            )
+            continue
+        recency = recency_weighted(now, commit_date, args.half_life_days)
+        tag_weights = record_commit(
+            aggregate,
+            identity_name,
+            identity_email,
+            commit_date,
+            touched_files,
+            file_tags,
+            line_changes,
+            recency,
+            churn,
+            churn_weight,
+        )
+        if revisions is not None:
+            for tag, weight in tag_weights.items():
+                tag_squares[tag] += weight * weight
+                tag_person_squares[tag][identity_email] += weight * weight
+
+        windows = [window for window in explicit_windows if window[1] <= commit_date < window[2]]
+        if args.window_period:
+            windows.append(period_window(commit_date, args.window_period))
+        for label, start, end in windows:
+            if label not in window_aggregates:
+                window_aggregates[label] = new_aggregate()
+                window_bounds[label] = (start, end)
+            record_commit(
+                window_aggregates[label],
+                identity_name,
+                identity_email,
+                commit_date,
+                touched_files,
+                file_tags,
+                line_changes,
+                recency_weighted(min(end, now), commit_date, args.half_life_days),
+                churn,
+                churn_weight,
+            )
+
+    if progress is not None:
+        report_progress(
+            progress,
+            total_commits_seen,
+            (sketches or aggregate)["edges_total"],
+            len(cochange_counts),
+            True,
+        )
+    if revisions is not None:
+        sample_scale = sample_total / len(revisions)
+        sample_touches = {
+            path: dict(touches_by_person)
+            for path, touches_by_person in aggregate["file_people_touches"].items()
+            if aggregate["files"][path]["sensitive_tags"]
+        }
+        for entry in (aggregate, *window_aggregates.values()):
+            scale_aggregate(entry, sample_scale)
+        for counts in (cochange_counts, cochange_file_commits):
+            for key in counts:
+                counts[key] = round(counts[key] * sample_scale)
+    if commit_handle:
+        commit_handle.close()
+        commit_offsets = sort_commits_file(
+            commits_path, commit_times, commit_offsets, commits_bytes, args.date_field
+        )
+    if commit_store is not None:
+        write_commit_store(out_dir / "commit_store", commit_store, args.date_field)
+
+    blame_rows: list[list[str]] = []
+    blame_lines = 0
+    blame_cache_hits = 0
+    if args.blame:
+        if tree is None:
+            tree = list_tree_blobs(args.repo)
+        paths = [
+            path
+            for path in tree
+            if args.blame == "all" or match_sensitive(path, rules) or path in content_tags
+        ]
+        blamed, blame_cache_hits = blame_files(
+            args.repo, tree, paths, out_dir / ".cache" / "blame.pickle", args.blame_workers
+        )
+        for path in sorted(blamed):
+            owner_lines: dict[str, int] = defaultdict(int)
+            for author_name, author_email, committer_name, committer_email, lines in blamed[path]:
+                if args.identity == "committer":
+                    name, email = committer_name, committer_email
+                else:
+                    name, email = author_name, author_email
+                if author_excluded(name, email, author_exclude_patterns):
+                    continue
+                owner_lines[email or name] += lines
+            total_lines = sum(owner_lines.values())
+            blame_lines += total_lines
+            for email, lines in sorted(owner_lines.items(), key=lambda item: (-item[1], item[0])):
+                blame_rows.append([email, path, str(lines), f"{lines / total_lines:.4f}"])
+
+    people = (sketches or aggregate)["people"]
+    files = (sketches or aggregate)["files"]
+    edges = aggregate["edges"]
+    file_people_touches = aggregate["file_people_touches"]
+    file_people_recency = aggregate["file_people_recency"]
+    file_people_sensitive = aggregate["file_people_sensitive"]
+    file_people_churn = aggregate["file_people_churn"]
+
+    cochange_rows: list[list[str]] = []
+    if not args.no_cochange:
+        scored_pairs = score_cochange_pairs(
+            cochange_counts,
+            cochange_file_commits,
+            args.cochange_min_count,
+            args.cochange_min_jaccard,
+        )
+        if args.cochange_top_k > 0:
+            scored_pairs = top_k_cochange_pairs(
+                scored_pairs, args.cochange_top_k, args.cochange_top_k_policy
+            )
+        for file_a, file_b, count, jaccard in scored_pairs:
+            cochange_rows.append([file_a, file_b, str(count), f"{jaccard:.6f}"])
+
+    if sketches is not None:
+        orphaned_sensitive_code, bus_factor_hotspots = sketch_findings(sketches, now, args)
+        tag_rollups = sketch_tag_rollups(sketches)
+    else:
+        orphaned_sensitive_code, bus_factor_hotspots = security_findings(aggregate, now, args)
+        tag_rollups = compute_tag_rollups(
+            people,
+            files,
+            edges,
+            aggregate["tag_totals"],
+            aggregate["tag_person_totals"],
+            args.min_touches,
+        )
+    hidden_owners = compute_hidden_owners(tag_rollups, args.owner_threshold)
 
     summary = {
         "generated_at": now.isoformat(),
@@ -796,21 +3025,37 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
             "cochange_max_files": args.cochange_max_files,
             "cochange_min_count": args.cochange_min_count,
             "cochange_min_jaccard": args.cochange_min_jaccard,
+            "cochange_top_k": args.cochange_top_k,
+            "cochange_top_k_policy": args.cochange_top_k_policy,
             "cochange_default_excludes": not args.no_default_cochange_excludes,
             "cochange_excludes": cochange_excludes,
+            "cochange_bitmaps": args.cochange_bitmaps,
             "author_default_excludes": not args.no_default_author_excludes,
             "author_exclude_regexes": author_exclude_regexes,
             "community_top_owners": args.community_top_owners,
+            "blame": args.blame,
+            "scan_content": args.scan_content,
+            "content_config": args.content_config,
+            "churn": churn,
+            "dir_depths": args.dir_depths,
+            "windows": args.windows,
+            "window_period": args.window_period,
+            "sensitive_weight": args.sensitive_weight,
+            "approximate": args.approximate,
+            "sketch_memory": args.sketch_memory,
+            "sample": args.sample,
+            "sample_seed": args.sample_seed,
         },
         "orphaned_sensitive_code": orphaned_sensitive_code,
         "hidden_owners": hidden_owners,
         "bus_factor_hotspots": bus_factor_hotspots,
+        "truck_factor": None if sketches is not None else repo_truck_factor(aggregate),
         "stats": {
             "commits": total_commits_included,
             "commits_seen": total_commits_seen,
             "commits_excluded_identities": commits_excluded_identities,
             "commits_excluded_merges": commits_excluded_merges,
-            "edges": total_edges,
+            "edges": (sketches or aggregate)["edges_total"],
             "people": len(people),
             "files": len(files),
             "cochange_pairs_total": len(cochange_counts) if not args.no_cochange else 0,
@@ -819,11 +3064,111 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
             "cochange_commits_skipped": cochange_commits_skipped if not args.no_cochange else 0,
             "cochange_commits_filtered": cochange_commits_filtered if not args.no_cochange else 0,
             "cochange_files_excluded": cochange_files_excluded if not args.no_cochange else 0,
+            "blame_files": len({row[1] for row in blame_rows}),
+            "blame_lines": blame_lines,
+            "blame_cache_hits": blame_cache_hits,
+            "content_blobs_scanned": content_scanned,
+            "content_cache_hits": content_cache_hits,
+            "content_tagged_files": len(content_tags),
         },
     }
 
-    with (out_dir / "summary.json").open("w", encoding="utf-8") as handle:
-        json.dump(summary, handle, indent=2)
+    if sketches is not None:
+        # No edges to export, and degree of authorship needs exact per-edge commit counts.
+        tables = sketch_tables(sketches, churn)
+        del summary["truck_factor"]
+        summary["approximate"] = sketch_error_bounds(sketches)
+    else:
+        dir_depths = {int(entry) for entry in args.dir_depths.split(",") if entry.strip()}
+        dir_rows = compute_dir_rollups(
+            file_people_touches,
+            file_people_sensitive,
+            file_authors(aggregate),
+            dir_depths,
+            args.dir_top_owners,
+        )
+        tables = {
+            "people": people_table(aggregate, churn),
+            "files": files_table(aggregate, churn),
+            "edges": edges_table(aggregate, args.min_touches, churn),
+            "dirs": (
+                [
+                    "dir",
+                    "depth",
+                    "files",
+                    "touches",
+                    "authors",
+                    "sensitive_weight",
+                    "top_owners",
+                    "top_owner_share",
+                    "truck_factor",
+                ],
+                dir_rows,
+            ),
+        }
+    ownership_map: dict[str, object] = {
+        "args": args,
+        "tables": tables,
+        "tags": tag_rollups,
+        "summary": summary,
+        "communities": None,
+        "community_metadata": [],
+        "graphs": {"ownership": None, "cochange": None},
+        "cochange_bitmaps": None,
+        "commit_index": None,
+        "commits": kept_commits,
+        "windows": {
+            label: window_map(
+                window_aggregates[label], label, *window_bounds[label], now, args, churn
+            )
+            for label in sorted(window_aggregates, key=lambda label: window_bounds[label])
+        },
+    }
+    if revisions is not None:
+        uncertain_hotspots = sample_intervals(
+            summary,
+            aggregate,
+            sample_touches,
+            tag_squares,
+            tag_person_squares,
+            len(revisions),
+            sample_total,
+            args.bus_factor_threshold,
+        )
+        summary["sample"] = {
+            "fraction": args.sample,
+            "seed": args.sample_seed,
+            "strata": sample_strata,
+            "commits_sampled": len(revisions),
+            "commits_total": sample_total,
+            "scale": round(sample_scale, 6),
+            "confidence": SAMPLE_CONFIDENCE,
+            "uncertain_hotspots": uncertain_hotspots,
+        }
+    if args.cochange_bitmaps and not args.no_cochange:
+        bitmap_paths = sorted(cochange_commit_ids)
+        ownership_map["cochange_bitmaps"] = {
+            "commits": cochange_commit_ordinal,
+            "paths": bitmap_paths,
+            "cardinality": [len(cochange_commit_ids[path]) for path in bitmap_paths],
+            "blobs": [encode_bitmap(cochange_commit_ids[path]) for path in bitmap_paths],
+        }
+    if not args.no_cochange:
+        ownership_map["tables"]["cochange_edges"] = (
+            ["file_a", "file_b", "cochange_count", "jaccard"],
+            cochange_rows,
+        )
+    if args.blame:
+        ownership_map["tables"]["blame"] = (
+            ["person_id", "file_id", "lines", "line_share"],
+            blame_rows,
+        )
+    if index_commits:
+        ownership_map["commit_index"] = {
+            "file_commit_rows": file_commit_rows,
+            "offsets": commit_offsets,
+            "bytes": commits_bytes,
+        }
 
     if args.communities or args.graphml:
         try:
@@ -887,9 +3232,13 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
                             file_people_recency,
                             file_people_sensitive,
                             args.community_top_owners,
+                            file_people_churn if churn else None,
                         )
                         for path in files_list:
                             community_index[path] = idx
+                        community_truck_factor, truck_factor_authors = truck_factor(
+                            [file_authors(aggregate)[path] for path in files_list]
+                        )
                         entry = {
                             "id": idx,
                             "size": len(files_list),
@@ -897,14 +3246,26 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
                             "maintainers": owners["top_maintainers"],
                             "bus_factor": owners["bus_factor"],
                             "owner_count": owners["owner_count"],
+                            "truck_factor": community_truck_factor,
+                            "truck_factor_authors": truck_factor_authors,
                             "totals": owners["totals"],
                         }
                         serialized.append(entry)
                         metadata = dict(entry)
                         metadata.pop("files", None)
                         community_metadata.append(metadata)
-                    with (out_dir / "communities.json").open("w", encoding="utf-8") as handle:
-                        json.dump(serialized, handle, indent=2)
+                    ownership_map["communities"] = serialized
+                    ownership_map["community_metadata"] = community_metadata
+                    ownership_map["community_sets"] = communities_result
+                    ownership_map["tables"]["community_files"] = (
+                        ["file_id", "community_id"],
+                        [
+                            [path, str(community_id)]
+                            for path, community_id in sorted(
+                                community_index.items(), key=lambda item: (item[1], item[0])
+                            )
+                        ],
+                    )
 
             if args.communities:
                 for node, community_id in community_index.items():
@@ -912,34 +3273,118 @@ def build_ownership_map(args: argparse.Namespace) -> Path:
                         graph_cochange.nodes[node]["community_id"] = community_id
                     if graph_bipartite is not None and node in graph_bipartite:
                         graph_bipartite.nodes[node]["community_id"] = community_id
+            ownership_map["graphs"] = {"ownership": graph_bipartite, "cochange": graph_cochange}
+
+    return ownership_map
+
+
+def write_ownership_map(ownership_map: dict[str, object], out_dir: str | Path) -> Path:
+    """Persist an in-memory ownership map as the CSV/JSON artifacts the query scripts read."""
+    args = ownership_map["args"]
+    out_dir = ensure_out_dir(str(out_dir))
+    sharded = {}
+    if args.approximate:
+        # Drop artifacts left by an earlier exact build so they cannot be mixed with estimates.
+        stale = list(EXACT_ONLY_ARTIFACTS)
+        if not args.emit_commits or out_dir != Path(args.out):
+            stale.extend(["commits.jsonl", "commits.index.json"])
+        if not args.emit_commit_store or out_dir != Path(args.out):
+            stale.append("commit_store")
+        for name in stale:
+            path = out_dir / name
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+    for name, (header, rows) in ownership_map["tables"].items():
+        if args.edge_shards > 0 and name in SHARDED_TABLES:
+            sharded[name] = write_sharded_csv(out_dir, name, header, rows, args.edge_shards)
+            (out_dir / f"{name}.csv").unlink(missing_ok=True)
+        else:
+            write_csv(out_dir / f"{name}.csv", header, rows)
+    # Shards left by an earlier --edge-shards build into the same --out would shadow this run.
+    for name in SHARDED_TABLES:
+        if name not in sharded and (out_dir / name).is_dir():
+            shutil.rmtree(out_dir / name)
+    if sharded:
+        with (out_dir / SHARD_MANIFEST).open("w", encoding="utf-8") as handle:
+            json.dump({"version": 1, "hash": "crc32", "tables": sharded}, handle, indent=2)
+    else:
+        (out_dir / SHARD_MANIFEST).unlink(missing_ok=True)
+    with (out_dir / "tags.json").open("w", encoding="utf-8") as handle:
+        json.dump(ownership_map["tags"], handle, indent=2)
+    with (out_dir / "summary.json").open("w", encoding="utf-8") as handle:
+        json.dump(ownership_map["summary"], handle, indent=2)
+
+    if ownership_map["communities"] is not None:
+        with (out_dir / "communities.json").open("w", encoding="utf-8") as handle:
+            json.dump(ownership_map["communities"], handle, indent=2)
+        commit_index = ownership_map["commit_index"]
+        if commit_index is not None and out_dir == Path(args.out):
+            write_community_commits(
+                out_dir / "community_commits.json",
+                ownership_map["community_sets"],
+                commit_index["file_commit_rows"],
+                commit_index["offsets"],
+                commit_index["bytes"],
+            )
 
-                graph_for_json = graph_cochange or graph_bipartite
-                if graph_for_json is not None:
-                    try:
-                        from networkx.readwrite import json_graph
-                    except ImportError:
-                        pass
-                    else:
-                        data = json_graph.node_link_data(graph_for_json, edges="edges")
-                        data.setdefault("graph", {})
-                        data["graph"]["community_maintainers"] = community_metadata
-                        json_name = (
-                            "cochange.graph.json"
-                            if graph_for_json is graph_cochange
-                            else "ownership.graph.json"
-                        )
-                        with (out_dir / json_name).open("w", encoding="utf-8") as handle:
-                            json.dump(data, handle, indent=2)
+    if ownership_map["cochange_bitmaps"] is not None:
+        write_cochange_bitmaps(out_dir / "cochange_bitmaps", ownership_map["cochange_bitmaps"])
+
+    if args.neo4j_admin:
+        write_neo4j_admin(ownership_map, out_dir)
+
+    if ownership_map["windows"]:
+        index = []
+        for label, window in ownership_map["windows"].items():
+            window_dir = ensure_out_dir(str(out_dir / "windows" / label))
+            for name, (header, rows) in window["tables"].items():
+                write_csv(window_dir / f"{name}.csv", header, rows)
+            with (window_dir / "tags.json").open("w", encoding="utf-8") as handle:
+                json.dump(window["tags"], handle, indent=2)
+            with (window_dir / "summary.json").open("w", encoding="utf-8") as handle:
+                json.dump(window["summary"], handle, indent=2)
+            index.append({**window["summary"]["window"], **window["summary"]["stats"]})
+        with (out_dir / "windows" / "index.json").open("w", encoding="utf-8") as handle:
+            json.dump(index, handle, indent=2)
+
+    graph_bipartite = ownership_map["graphs"]["ownership"]
+    graph_cochange = ownership_map["graphs"]["cochange"]
+    if args.communities:
+        graph_for_json = graph_cochange or graph_bipartite
+        if graph_for_json is not None:
+            try:
+                from networkx.readwrite import json_graph
+            except ImportError:
+                pass
+            else:
+                data = json_graph.node_link_data(graph_for_json, edges="edges")
+                data.setdefault("graph", {})
+                data["graph"]["community_maintainers"] = ownership_map["community_metadata"]
+                json_name = (
+                    "cochange.graph.json"
+                    if graph_for_json is graph_cochange
+                    else "ownership.graph.json"
+                )
+                with (out_dir / json_name).open("w", encoding="utf-8") as handle:
+                    json.dump(data, handle, indent=2)
 
-            if args.graphml:
-                if graph_bipartite is not None:
-                    nx.write_graphml(graph_bipartite, out_dir / "ownership.graphml")
-                if graph_cochange is not None:
-                    nx.write_graphml(graph_cochange, out_dir / "cochange.graphml")
+    if args.graphml:
+        import networkx as nx
+
+        if graph_bipartite is not None:
+            nx.write_graphml(graph_bipartite, out_dir / "ownership.graphml")
+        if graph_cochange is not None:
+            nx.write_graphml(graph_cochange, out_dir / "cochange.graphml")
 
     return out_dir
 
 
+def build_ownership_map(args: argparse.Namespace) -> Path:
+    return write_ownership_map(compute_ownership_map(args), args.out)
+
+
 def main() -> int:
     args = parse_args()
     try:
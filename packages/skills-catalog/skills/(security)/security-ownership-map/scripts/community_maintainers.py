@@ -4,19 +4,31 @@
 from __future__ import annotations
 
 import argparse
+import bisect
 import csv
 import datetime as dt
+import hashlib
 import json
 import math
+import os
 import re
 import subprocess
 import sys
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, deque
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Sequence, Union
 
+from build_ownership_map import unquote_path
+from query_ownership import CACHE_DIR, CACHE_VERSION, cached, load_cached, map_array
 
-def parse_args() -> argparse.Namespace:
+GIT_PATHSPEC_BATCH = 500
+
+# A data directory of ownership-map artifacts, or an in-memory map from
+# build_ownership_map.compute_ownership_map().
+Source = Union[Path, dict]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Compute maintainers for a file's community over time."
     )
@@ -41,6 +53,21 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Community id to analyze",
     )
+    parser.add_argument(
+        "--all-communities",
+        action="store_true",
+        help="Rank maintainers for every community in one pass over the commits",
+    )
+    parser.add_argument(
+        "--community-ids",
+        default=None,
+        help="Comma-separated community ids to rank in one pass (e.g., '1,4,7')",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Write results to this CSV path, or Parquet if it ends in .parquet (default: stdout)",
+    )
     parser.add_argument(
         "--since",
         default=None,
@@ -121,7 +148,7 @@ def parse_args() -> argparse.Namespace:
         default=1,
         help="Minimum touches per month to include a maintainer",
     )
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def parse_date(value: str) -> dt.datetime:
@@ -188,10 +215,19 @@ def read_csv(path: Path) -> Iterable[dict[str, str]]:
         yield from reader
 
 
-def load_people(data_dir: Path) -> dict[str, dict[str, str]]:
-    people_path = data_dir / "people.csv"
+def read_table(source: Source, name: str) -> Iterable[dict[str, str]]:
+    """Yield the rows of <name>.csv, or of the same table held by an in-memory map."""
+    if isinstance(source, Path):
+        yield from read_csv(source / f"{name}.csv")
+        return
+    header, rows = source["tables"][name]
+    for row in rows:
+        yield dict(zip(header, row))
+
+
+def parse_people(rows: Iterable[dict[str, str]]) -> dict[str, dict[str, str]]:
     people = {}
-    for row in read_csv(people_path):
+    for row in rows:
         people[row.get("person_id", "")] = {
             "name": row.get("name", ""),
             "email": row.get("email", ""),
@@ -200,13 +236,55 @@ def load_people(data_dir: Path) -> dict[str, dict[str, str]]:
     return people
 
 
-def load_graph_json(data_dir: Path) -> dict[str, object] | None:
-    cochange_path = data_dir / "cochange.graph.json"
-    ownership_path = data_dir / "ownership.graph.json"
-    if cochange_path.exists():
-        return json.loads(cochange_path.read_text(encoding="utf-8"))
-    if ownership_path.exists():
-        return json.loads(ownership_path.read_text(encoding="utf-8"))
+def parse_graph_nodes(graph_path: Path) -> list[dict[str, object]]:
+    graph = json.loads(graph_path.read_text(encoding="utf-8"))
+    return [
+        {"id": node.get("id"), "community_id": node.get("community_id")}
+        for node in graph.get("nodes", [])
+    ]
+
+
+def parse_community_files(rows: Iterable[dict[str, str]]) -> dict[str, object]:
+    file_communities: dict[str, int] = {}
+    community_files: dict[int, list[str]] = defaultdict(list)
+    for row in rows:
+        path = row.get("file_id", "")
+        community_id = int(row.get("community_id", -1))
+        file_communities[path] = community_id
+        community_files[community_id].append(path)
+    return {"file_communities": file_communities, "community_files": dict(community_files)}
+
+
+def load_community_index(source: Source) -> dict[str, object] | None:
+    if not isinstance(source, Path):
+        if "community_files" not in source["tables"]:
+            raise ValueError("Ownership map has no communities; build it with communities enabled")
+        return parse_community_files(read_table(source, "community_files"))
+    index_path = source / "community_files.csv"
+    if not index_path.exists():
+        return None
+    return load_cached(
+        index_path, "community-files", lambda path: parse_community_files(read_csv(path))
+    )
+
+
+def parse_json(path: Path) -> object:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def load_people(source: Source) -> dict[str, dict[str, str]]:
+    if not isinstance(source, Path):
+        return parse_people(read_table(source, "people"))
+    return load_cached(
+        source / "people.csv", "people-by-id", lambda path: parse_people(read_csv(path))
+    )
+
+
+def load_graph_nodes(data_dir: Path) -> list[dict[str, object]] | None:
+    for name in ("cochange.graph.json", "ownership.graph.json"):
+        graph_path = data_dir / name
+        if graph_path.exists():
+            return load_cached(graph_path, f"{name}-nodes", parse_graph_nodes)
     return None
 
 
@@ -223,12 +301,33 @@ def find_file_node(nodes: list[dict[str, object]], query: str) -> dict[str, obje
     raise ValueError(f"Multiple matches for file {query}: {candidates}")
 
 
+def find_indexed_file(file_communities: dict[str, int], query: str) -> int:
+    if query in file_communities:
+        return file_communities[query]
+    contains = [path for path in file_communities if query in path]
+    if len(contains) == 1:
+        return file_communities[contains[0]]
+    if not contains:
+        raise ValueError(f"File not found in community index: {query}")
+    raise ValueError(f"Multiple matches for file {query}: {', '.join(contains[:10])}")
+
+
 def load_community_files(
-    data_dir: Path, file_query: str | None, community_id: int | None
+    source: Source, file_query: str | None, community_id: int | None
 ) -> tuple[int, list[str]]:
-    graph = load_graph_json(data_dir)
-    if graph:
-        nodes = graph.get("nodes", [])
+    index = load_community_index(source)
+    if index is not None:
+        if file_query:
+            community_id = find_indexed_file(index["file_communities"], file_query)
+        if community_id is None:
+            raise ValueError("Provide --file or --community-id")
+        files = index["community_files"].get(community_id)
+        if not files:
+            raise ValueError(f"No files found for community {community_id}")
+        return community_id, files
+
+    nodes = load_graph_nodes(source)
+    if nodes:
         if file_query:
             node = find_file_node(nodes, file_query)
             community_id = int(node.get("community_id", -1))
@@ -240,10 +339,10 @@ def load_community_files(
             raise ValueError(f"No files found for community {community_id}")
         return community_id, files
 
-    communities_path = data_dir / "communities.json"
+    communities_path = source / "communities.json"
     if not communities_path.exists():
         raise FileNotFoundError("Missing graph json and communities.json")
-    communities = json.loads(communities_path.read_text(encoding="utf-8"))
+    communities = load_cached(communities_path, "communities", parse_json)
     if file_query:
         for entry in communities:
             files = entry.get("files", [])
@@ -258,51 +357,166 @@ def load_community_files(
     raise ValueError(f"Community id not found: {community_id}")
 
 
+def load_community_commit_offsets(
+    data_dir: Path, commits_path: Path, community_id: int
+) -> list[int] | None:
+    index_path = data_dir / "community_commits.json"
+    if not index_path.exists():
+        return None
+    index = load_cached(index_path, "community-commits", parse_json)
+    if index.get("commits_bytes") != commits_path.stat().st_size:
+        return None
+    return index.get("communities", {}).get(str(community_id))
+
+
+def load_time_index_offset(
+    data_dir: Path, commits_path: Path, date_field: str, since: dt.datetime | None
+) -> int | None:
+    """Byte offset to start reading date-sorted commits.jsonl from, or None if not sorted."""
+    index_path = data_dir / "commits.index.json"
+    if not index_path.exists():
+        return None
+    index = load_cached(index_path, "commits-index", parse_json)
+    if index.get("commits_bytes") != commits_path.stat().st_size:
+        return None
+    if index.get("date_field") != date_field:
+        return None
+    entries = index.get("entries", [])
+    if since is None or not entries:
+        return 0
+    position = bisect.bisect_left([entry[0] for entry in entries], since.timestamp())
+    return entries[max(position - 1, 0)][1]
+
+
+def iter_commit_lines(
+    commits_path: Path, offsets: list[int] | None, start_offset: int = 0
+) -> Iterable[bytes]:
+    with commits_path.open("rb") as handle:
+        if offsets is None:
+            handle.seek(start_offset)
+            yield from handle
+            return
+        for offset in offsets[bisect.bisect_left(offsets, start_offset) :]:
+            handle.seek(offset)
+            yield handle.readline()
+
+
 def iter_commits_from_json(
     commits_path: Path,
     since: dt.datetime | None,
     until: dt.datetime | None,
     date_field: str,
+    offsets: list[int] | None = None,
+    start_offset: int | None = None,
 ) -> Iterable[dict[str, object]]:
-    with commits_path.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            entry = json.loads(line)
-            author_date = entry.get("author_date") or entry.get("date")
-            committer_date = entry.get("committer_date")
-            if author_date:
-                author_dt = parse_date(author_date)
-            else:
-                author_dt = None
-            if committer_date:
-                committer_dt = parse_date(committer_date)
-            else:
-                committer_dt = None
-            if date_field == "committer":
-                commit_date = committer_dt or author_dt
+    """Yield commits in the window; start_offset marks a file sorted by date_field."""
+    entries = (
+        json.loads(line) for line in iter_commit_lines(commits_path, offsets, start_offset or 0)
+    )
+    return iter_commit_entries(entries, since, until, date_field, start_offset is not None)
+
+
+def iter_commit_entries(
+    entries: Iterable[dict[str, object]],
+    since: dt.datetime | None,
+    until: dt.datetime | None,
+    date_field: str,
+    date_sorted: bool = False,
+) -> Iterable[dict[str, object]]:
+    for entry in entries:
+        author_date = entry.get("author_date") or entry.get("date")
+        committer_date = entry.get("committer_date")
+        if author_date:
+            author_dt = parse_date(author_date)
+        else:
+            author_dt = None
+        if committer_date:
+            committer_dt = parse_date(committer_date)
+        else:
+            committer_dt = None
+        if date_field == "committer":
+            commit_date = committer_dt or author_dt
+        else:
+            commit_date = author_dt or committer_dt
+        if commit_date is None:
+            continue
+        if since and commit_date < since:
+            continue
+        if until and commit_date > until:
+            if date_sorted:
+                break
+            continue
+        yield {
+            "hash": entry.get("hash", ""),
+            "parents": entry.get("parents", []),
+            "is_merge": entry.get("is_merge", False),
+            "author_name": entry.get("author_name", ""),
+            "author_email": entry.get("author_email", ""),
+            "author_date": author_date,
+            "committer_name": entry.get("committer_name", ""),
+            "committer_email": entry.get("committer_email", ""),
+            "committer_date": committer_date,
+            "files": entry.get("files", []),
+        }
+
+
+def git_head(repo: str) -> str:
+    result = subprocess.run(
+        ["git", "-C", repo, "rev-parse", "HEAD"], capture_output=True, text=True, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "git rev-parse failed")
+    return result.stdout.strip()
+
+
+def load_git_commits(
+    data_dir: Path,
+    repo: str,
+    since: str | None,
+    until: str | None,
+    include_merges: bool,
+    paths: list[str] | None,
+) -> list[dict[str, object]]:
+    """Walk git limited to paths, cached per HEAD, window and path set."""
+    path_digest = hashlib.sha256("\0".join(sorted(paths or [])).encode("utf-8")).hexdigest()
+    query = json.dumps([since, until, include_merges, paths is None, path_digest])
+    name = hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+    key = (CACHE_VERSION, git_head(repo), query)
+    return cached(
+        data_dir / CACHE_DIR / f"git-commits-{name}.pickle",
+        key,
+        lambda: merge_git_batches(repo, since, until, include_merges, paths),
+    )
+
+
+def merge_git_batches(
+    repo: str,
+    since: str | None,
+    until: str | None,
+    include_merges: bool,
+    paths: list[str] | None,
+) -> list[dict[str, object]]:
+    if paths is None:
+        return list(iter_commits_from_git(repo, since, until, include_merges))
+    commits: dict[str, dict[str, object]] = {}
+    ordered = sorted(paths)
+    for start in range(0, len(ordered), GIT_PATHSPEC_BATCH):
+        batch = ordered[start : start + GIT_PATHSPEC_BATCH]
+        for commit in iter_commits_from_git(repo, since, until, include_merges, batch):
+            existing = commits.get(str(commit["hash"]))
+            if existing is None:
+                commits[str(commit["hash"])] = commit
             else:
-                commit_date = author_dt or committer_dt
-            if commit_date is None:
-                continue
-            if since and commit_date < since:
-                continue
-            if until and commit_date > until:
-                continue
-            yield {
-                "hash": entry.get("hash", ""),
-                "parents": entry.get("parents", []),
-                "is_merge": entry.get("is_merge", False),
-                "author_name": entry.get("author_name", ""),
-                "author_email": entry.get("author_email", ""),
-                "author_date": author_date,
-                "committer_name": entry.get("committer_name", ""),
-                "committer_email": entry.get("committer_email", ""),
-                "committer_date": committer_date,
-                "files": entry.get("files", []),
-            }
+                existing["files"] = [*existing["files"], *commit["files"]]
+    return list(commits.values())
 
 
 def iter_commits_from_git(
-    repo: str, since: str | None, until: str | None, include_merges: bool
+    repo: str,
+    since: str | None,
+    until: str | None,
+    include_merges: bool,
+    paths: list[str] | None = None,
 ) -> Iterable[dict[str, object]]:
     cmd = [
         "git",
@@ -320,12 +534,21 @@ def iter_commits_from_git(
         cmd.extend(["--since", since])
     if until:
         cmd.extend(["--until", until])
+    env = None
+    if paths is not None:
+        # Keep every commit touching the paths (no history simplification) and treat the
+        # pathspecs as literal file names rather than globs.
+        cmd.append("--full-history")
+        cmd.append("--")
+        cmd.extend(paths)
+        env = {**os.environ, "GIT_LITERAL_PATHSPECS": "1"}
 
     proc = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
+        env=env,
     )
     assert proc.stdout is not None
 
@@ -358,7 +581,7 @@ def parse_git_block(block: list[str]) -> Iterable[dict[str, object]]:
     committer_name = block[5]
     committer_email = block[6]
     committer_date = block[7]
-    files = [line for line in block[8:] if line]
+    files = [unquote_path(line) for line in block[8:] if line]
     return [
         {
             "hash": commit_hash,
@@ -375,138 +598,335 @@ def parse_git_block(block: list[str]) -> Iterable[dict[str, object]]:
     ]
 
 
-def main() -> int:
-    args = parse_args()
-    data_dir = Path(args.data_dir)
-    if not data_dir.exists():
-        print(f"Data directory not found: {data_dir}", file=sys.stderr)
-        return 1
+def list_periods(
+    min_date: dt.datetime, max_date: dt.datetime, bucket: str
+) -> list[tuple[str, dt.datetime, dt.datetime]]:
+    if bucket == "quarter":
+        period_cursor = quarter_start(min_date)
+        period_end_anchor = quarter_start(max_date)
+        step_months = 3
+        key_func = quarter_key
+        end_func = quarter_end
+    else:
+        period_cursor = dt.datetime(min_date.year, min_date.month, 1, tzinfo=dt.timezone.utc)
+        period_end_anchor = dt.datetime(max_date.year, max_date.month, 1, tzinfo=dt.timezone.utc)
+        step_months = 1
+        key_func = month_key
+        end_func = month_end
 
-    since = parse_date(args.since) if args.since else None
-    until = parse_date(args.until) if args.until else None
+    periods = []
+    while period_cursor <= period_end_anchor:
+        bucket_end = end_func(period_cursor)
+        periods.append((key_func(bucket_end), period_cursor, bucket_end))
+        period_cursor = add_months(period_cursor, step_months)
+    return periods
 
-    try:
-        community_id, community_files = load_community_files(data_dir, args.file, args.community_id)
-    except (ValueError, FileNotFoundError) as exc:
-        print(str(exc), file=sys.stderr)
-        return 2
 
-    people = load_people(data_dir)
+def compute_period_counts(
+    commit_rows: list[tuple[dt.datetime, str, int, str, str]],
+    bucket: str,
+    window_days: int,
+    weight: str,
+    half_life_days: float,
+) -> tuple[dict[str, Counter[str]], dict[str, float]]:
+    """Bucket date-sorted commit rows into per-period touch counts in a single pass."""
+    if not commit_rows:
+        return {}, {}
+    periods = list_periods(commit_rows[0][0], commit_rows[-1][0], bucket)
+    if window_days > 0:
+        return sliding_window_counts(commit_rows, periods, window_days, weight, half_life_days)
 
-    ignore_re = re.compile(args.ignore_author_regex) if args.ignore_author_regex else None
+    period_ends = {key: bucket_end for key, _start, bucket_end in periods}
+    period_counts: dict[str, Counter[str]] = defaultdict(Counter)
+    period_totals: dict[str, float] = defaultdict(float)
+    for commit_date, person_id, touches, _name, _email in commit_rows:
+        if bucket == "quarter":
+            bucket_key = quarter_key(commit_date.astimezone(dt.timezone.utc))
+        else:
+            bucket_key = month_key(commit_date)
+        bucket_end = period_ends.get(bucket_key)
+        if bucket_end is None:
+            continue
+        contribution = float(touches)
+        if weight == "recency":
+            age_days = (bucket_end - commit_date).total_seconds() / 86400.0
+            contribution *= recency_weight(age_days, half_life_days)
+        period_counts[bucket_key][person_id] += contribution
+        period_totals[bucket_key] += contribution
+    return period_counts, period_totals
+
+
+def sliding_window_counts(
+    commit_rows: list[tuple[dt.datetime, str, int, str, str]],
+    periods: list[tuple[str, dt.datetime, dt.datetime]],
+    window_days: int,
+    weight: str,
+    half_life_days: float,
+) -> tuple[dict[str, Counter[str]], dict[str, float]]:
+    """Rolling windows ending at each period, maintained with two pointers.
 
-    commits_path = data_dir / "commits.jsonl"
-    if commits_path.exists():
-        commit_iter = iter_commits_from_json(commits_path, since, until, args.date_field)
+    Recency weights factor as exp(-(end - t) / h) = exp((t - a) / h) * exp(-(end - a) / h) for
+    any anchor a, so the running per-person sums only need rescaling by one factor per period.
+    The anchor is moved forward whenever the exponent grows large enough to risk overflow.
+    """
+    times = [row[0].timestamp() for row in commit_rows]
+    window_seconds = window_days * 86400.0
+    decay_seconds = half_life_days * 86400.0 if weight == "recency" and half_life_days > 0 else 0.0
+    anchor = times[0]
+
+    def scaled(index: int) -> float:
+        touches = float(commit_rows[index][2])
+        if decay_seconds:
+            return touches * math.exp((times[index] - anchor) / decay_seconds)
+        return touches
+
+    running: dict[str, float] = {}
+    person_rows: dict[str, deque[int]] = {}
+    period_counts: dict[str, Counter[str]] = {}
+    period_totals: dict[str, float] = {}
+    low = high = 0
+    for bucket_key, _start, bucket_end in periods:
+        end_ts = bucket_end.timestamp()
+        while high < len(times) and times[high] <= end_ts:
+            if decay_seconds and (times[high] - anchor) / decay_seconds > 500.0:
+                rescale = math.exp((anchor - times[high]) / decay_seconds)
+                for person_id in running:
+                    running[person_id] *= rescale
+                anchor = times[high]
+            person_id = commit_rows[high][1]
+            running[person_id] = running.get(person_id, 0.0) + scaled(high)
+            person_rows.setdefault(person_id, deque()).append(high)
+            high += 1
+        while low < high and times[low] < end_ts - window_seconds:
+            person_id = commit_rows[low][1]
+            rows = person_rows[person_id]
+            rows.popleft()
+            if rows:
+                running[person_id] -= scaled(low)
+            else:
+                del running[person_id]
+                del person_rows[person_id]
+            low += 1
+        if not running:
+            continue
+
+        factor = math.exp((anchor - end_ts) / decay_seconds) if decay_seconds else 1.0
+        counts: Counter[str] = Counter()
+        for person_id in sorted(running, key=lambda person: person_rows[person][0]):
+            counts[person_id] = running[person_id] * factor
+        period_counts[bucket_key] = counts
+        period_totals[bucket_key] = sum(counts.values())
+    return period_counts, period_totals
+
+
+def load_file_communities(
+    source: Source, community_ids: set[int] | None
+) -> dict[str, int]:
+    index = load_community_index(source)
+    nodes = load_graph_nodes(source) if index is None else None
+    if index is not None:
+        file_communities = dict(index["file_communities"])
+    elif nodes:
+        file_communities = {
+            str(node["id"]): int(node["community_id"])
+            for node in nodes
+            if node.get("id") and node.get("community_id") is not None
+        }
     else:
-        if not args.repo:
-            print("--repo is required when commits.jsonl is missing", file=sys.stderr)
-            return 2
-        commit_iter = iter_commits_from_git(args.repo, args.since, args.until, args.include_merges)
+        communities_path = source / "communities.json"
+        if not communities_path.exists():
+            raise FileNotFoundError("Missing graph json and communities.json")
+        print(
+            "Using communities.json file lists (may be truncated by --max-community-files)",
+            file=sys.stderr,
+        )
+        file_communities = {}
+        for entry in load_cached(communities_path, "communities", parse_json):
+            for path in entry.get("files", []):
+                file_communities[path] = int(entry.get("id", -1))
+    if community_ids is not None:
+        file_communities = {
+            path: community_id
+            for path, community_id in file_communities.items()
+            if community_id in community_ids
+        }
+    if not file_communities:
+        raise ValueError("No files found for the selected communities")
+    return file_communities
 
-    commit_rows: list[tuple[dt.datetime, str, int, str, str]] = []
+
+def append_commit_rows(
+    community_rows: dict[int, list[tuple[dt.datetime, str, int, str, str]]],
+    in_community: Counter[int],
+    commit_date: dt.datetime,
+    identity_name: str,
+    identity_email: str,
+    people: dict[str, dict[str, str]],
+    touch_mode: str,
+) -> None:
+    person_id = identity_email or identity_name
+    for community_id, file_count in in_community.items():
+        touches = 1 if touch_mode == "commit" else file_count
+        community_rows[community_id].append(
+            (commit_date, person_id, touches, identity_name, identity_email)
+        )
+    if person_id not in people:
+        people[person_id] = {
+            "name": identity_name,
+            "email": identity_email,
+            "primary_tz_offset": "",
+        }
+
+
+def collect_commit_rows(
+    commit_iter: Iterable[dict[str, object]],
+    file_communities: dict[str, int],
+    people: dict[str, dict[str, str]],
+    args: argparse.Namespace,
+) -> dict[int, list[tuple[dt.datetime, str, int, str, str]]]:
+    """Split commits into per-community rows of (date, person_id, touches, name, email)."""
+    ignore_re = re.compile(args.ignore_author_regex) if args.ignore_author_regex else None
+    community_rows: dict[int, list[tuple[dt.datetime, str, int, str, str]]] = defaultdict(list)
     for commit in commit_iter:
         if commit.get("is_merge") and not args.include_merges:
             continue
-        files = commit.get("files", [])
-        in_community = sum(1 for path in files if path in community_files)
-        if in_community == 0:
+        in_community: Counter[int] = Counter(
+            file_communities[path] for path in commit.get("files", []) if path in file_communities
+        )
+        if not in_community:
             continue
         identity_name = commit.get(f"{args.identity}_name", "")
         identity_email = commit.get(f"{args.identity}_email", "")
         date_value = commit.get(f"{args.date_field}_date")
         if not date_value:
-            print(
-                "Missing committer fields in commits.jsonl. Re-run build or pass --repo.",
-                file=sys.stderr,
+            raise ValueError(
+                "Missing committer fields in commits.jsonl. Re-run build or pass --repo."
             )
-            return 2
         commit_date = parse_date(date_value)
-        person_id = identity_email or identity_name
         if ignore_re and ignore_re.search(identity_name or ""):
             continue
         if ignore_re and ignore_re.search(identity_email or ""):
             continue
-        touches = 1 if args.touch_mode == "commit" else in_community
-        commit_rows.append((commit_date, person_id, touches, identity_name, identity_email))
-        if person_id not in people:
-            people[person_id] = {
-                "name": identity_name,
-                "email": identity_email,
-                "primary_tz_offset": "",
-            }
+        append_commit_rows(
+            community_rows,
+            in_community,
+            commit_date,
+            identity_name,
+            identity_email,
+            people,
+            args.touch_mode,
+        )
+    return community_rows
 
-    if not commit_rows:
-        print("No commits touching community files for the selected window.", file=sys.stderr)
-        return 0
-
-    commit_rows.sort(key=lambda row: row[0])
-    period_counts: dict[str, Counter[str]] = defaultdict(Counter)
-    period_totals: dict[str, float] = defaultdict(float)
-
-    min_date = commit_rows[0][0]
-    max_date = commit_rows[-1][0]
-    if args.bucket == "quarter":
-        period_cursor = quarter_start(min_date)
-        period_end_anchor = quarter_start(max_date)
-        step_months = 3
-        key_func = quarter_key
-        end_func = quarter_end
-    else:
-        period_cursor = dt.datetime(min_date.year, min_date.month, 1, tzinfo=dt.timezone.utc)
-        period_end_anchor = dt.datetime(max_date.year, max_date.month, 1, tzinfo=dt.timezone.utc)
-        step_months = 1
-        key_func = month_key
-        end_func = month_end
 
-    while period_cursor <= period_end_anchor:
-        bucket_end = end_func(period_cursor)
-        bucket_key = key_func(bucket_end)
-        if args.window_days > 0:
-            window_start = bucket_end - dt.timedelta(days=args.window_days)
-
-            def in_bucket(commit_date: dt.datetime) -> bool:
-                return window_start <= commit_date <= bucket_end
-        else:
-            if args.bucket == "quarter":
-                bucket_start = quarter_start(period_cursor)
+def open_commit_store(data_dir: Path) -> dict[str, object] | None:
+    store_dir = data_dir / "commit_store"
+    manifest_path = store_dir / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    store: dict[str, object] = {
+        "commits": int(manifest.get("commits", 0)),
+        "sorted_by": manifest.get("sorted_by"),
+    }
+    for name, spec in manifest.get("arrays", {}).items():
+        store[name] = map_array(
+            store_dir / spec["file"], spec["typecode"], spec["itemsize"], manifest["byteorder"]
+        )
+    store["identities"] = load_cached(
+        store_dir / "identities.json", "commit-store-identities", parse_json
+    )
+    store["paths"] = load_cached(store_dir / "paths.json", "commit-store-paths", parse_json)
+    return store
 
-                def in_bucket(commit_date: dt.datetime) -> bool:
-                    return bucket_start <= commit_date <= bucket_end
-            else:
 
-                def in_bucket(commit_date: dt.datetime) -> bool:
-                    return (
-                        commit_date.year == bucket_end.year
-                        and commit_date.month == bucket_end.month
-                    )
+def collect_store_rows(
+    store: dict[str, object],
+    file_communities: dict[str, int],
+    people: dict[str, dict[str, str]],
+    args: argparse.Namespace,
+    since: dt.datetime | None,
+    until: dt.datetime | None,
+) -> dict[int, list[tuple[dt.datetime, str, int, str, str]]]:
+    """Same as collect_commit_rows, reading the typed arrays of commit_store/."""
+    ignore_re = re.compile(args.ignore_author_regex) if args.ignore_author_regex else None
+    file_id_communities = {
+        file_id: file_communities[path]
+        for file_id, path in enumerate(store["paths"])
+        if path in file_communities
+    }
+    identities = store["identities"]
+    ignored_ids: dict[int, bool] = {}
+    times = store[f"{args.date_field}_time"]
+    offsets = store[f"{args.date_field}_tz"]
+    identity_ids = store[f"{args.identity}_id"]
+    is_merge = store["is_merge"]
+    file_ptr = store["file_ptr"]
+    file_ids = store["file_ids"]
+    since_ts = since.timestamp() if since else None
+    until_ts = until.timestamp() if until else None
+    timezones: dict[int, dt.timezone] = {}
+    first, last = 0, store["commits"]
+    if store.get("sorted_by") == args.date_field:
+        if since_ts is not None:
+            first = bisect.bisect_left(times, since_ts)
+        if until_ts is not None:
+            last = bisect.bisect_right(times, until_ts)
 
-        for commit_date, person_id, touches, _name, _email in commit_rows:
-            if not in_bucket(commit_date):
+    community_rows: dict[int, list[tuple[dt.datetime, str, int, str, str]]] = defaultdict(list)
+    for index in range(first, last):
+        timestamp = times[index]
+        if since_ts is not None and timestamp < since_ts:
+            continue
+        if until_ts is not None and timestamp > until_ts:
+            continue
+        if is_merge[index] and not args.include_merges:
+            continue
+        in_community: Counter[int] | None = None
+        for file_id in file_ids[file_ptr[index] : file_ptr[index + 1]]:
+            community_id = file_id_communities.get(file_id)
+            if community_id is not None:
+                if in_community is None:
+                    in_community = Counter()
+                in_community[community_id] += 1
+        if in_community is None:
+            continue
+        identity_id = identity_ids[index]
+        identity_name, identity_email = identities[identity_id]
+        if ignore_re:
+            ignored = ignored_ids.get(identity_id)
+            if ignored is None:
+                ignored = bool(
+                    ignore_re.search(identity_name or "") or ignore_re.search(identity_email or "")
+                )
+                ignored_ids[identity_id] = ignored
+            if ignored:
                 continue
-            weight = 1.0
-            if args.weight == "recency":
-                age_days = (bucket_end - commit_date).total_seconds() / 86400.0
-                weight = recency_weight(age_days, args.half_life_days)
-            contribution = touches * weight
-            period_counts[bucket_key][person_id] += contribution
-            period_totals[bucket_key] += contribution
+        offset = offsets[index]
+        tz = timezones.get(offset)
+        if tz is None:
+            tz = timezones.setdefault(offset, dt.timezone(dt.timedelta(minutes=offset)))
+        append_commit_rows(
+            community_rows,
+            in_community,
+            dt.datetime.fromtimestamp(timestamp, tz),
+            identity_name,
+            identity_email,
+            people,
+            args.touch_mode,
+        )
+    return community_rows
 
-        period_cursor = add_months(period_cursor, step_months)
 
-    writer = csv.writer(sys.stdout)
-    writer.writerow(
-        [
-            "period",
-            "rank",
-            "name",
-            "email",
-            "primary_tz_offset",
-            "community_touches",
-            "touch_share",
-        ]
+def rank_maintainers(
+    commit_rows: list[tuple[dt.datetime, str, int, str, str]],
+    people: dict[str, dict[str, str]],
+    args: argparse.Namespace,
+) -> Iterable[list[object]]:
+    commit_rows.sort(key=lambda row: row[0])
+    period_counts, period_totals = compute_period_counts(
+        commit_rows, args.bucket, args.window_days, args.weight, args.half_life_days
     )
-
     for period in sorted(period_counts.keys()):
         total = period_totals[period]
         ranked = sorted(period_counts[period].items(), key=lambda item: item[1], reverse=True)
@@ -525,18 +945,168 @@ def main() -> int:
                 touches_value = f"{touches:.4f}"
             else:
                 touches_value = f"{touches:.0f}"
-            writer.writerow(
-                [
-                    period,
-                    rank,
-                    person.get("name", ""),
-                    person.get("email", person_id),
-                    person.get("primary_tz_offset", ""),
-                    touches_value,
-                    f"{share:.4f}",
+            yield [
+                period,
+                rank,
+                person.get("name", ""),
+                person.get("email", person_id),
+                person.get("primary_tz_offset", ""),
+                touches_value,
+                f"{share:.4f}",
+            ]
+
+
+def write_rows(output: str | None, header: list[str], rows: Iterable[list[object]]) -> None:
+    if output and output.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError(
+                "pyarrow is required for Parquet output. Install with: pip install pyarrow"
+            )
+        numeric = {"community_touches", "touch_share"}
+        columns: list[list[object]] = [[] for _ in header]
+        for row in rows:
+            for name, column, value in zip(header, columns, row):
+                column.append(float(value) if name in numeric else value)
+        pq.write_table(pa.table(dict(zip(header, columns))), output)
+        return
+
+    handle = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+    try:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+    finally:
+        if output:
+            handle.close()
+
+
+def run_maintainers(
+    args: argparse.Namespace, source: Source
+) -> tuple[list[str], Iterable[list[object]]] | None:
+    """Return (header, rows) for the selected communities, or None when no commits match."""
+    since = parse_date(args.since) if args.since else None
+    until = parse_date(args.until) if args.until else None
+
+    multi = args.all_communities or args.community_ids is not None
+    if multi:
+        community_ids = None
+        if args.community_ids is not None:
+            community_ids = {int(entry) for entry in args.community_ids.split(",") if entry}
+        file_communities = load_file_communities(source, community_ids)
+    else:
+        community_id, community_files = load_community_files(
+            source, args.file, args.community_id
+        )
+        file_communities = {path: community_id for path in community_files}
+
+    people = load_people(source)
+
+    store = None
+    if not isinstance(source, Path):
+        if source.get("commits") is None:
+            raise ValueError("Ownership map has no commits; build it with keep_commits=True")
+        commit_iter = iter_commit_entries(source["commits"], since, until, args.date_field)
+    else:
+        store = open_commit_store(source)
+        commits_path = source / "commits.jsonl"
+        if store is not None:
+            commit_iter = None
+        elif commits_path.exists():
+            offsets = None
+            if not args.all_communities:
+                selected = sorted(set(file_communities.values()))
+                per_community = [
+                    load_community_commit_offsets(source, commits_path, entry)
+                    for entry in selected
                 ]
+                if all(entry is not None for entry in per_community):
+                    offsets = sorted({offset for entry in per_community for offset in entry})
+            start_offset = load_time_index_offset(source, commits_path, args.date_field, since)
+            commit_iter = iter_commits_from_json(
+                commits_path, since, until, args.date_field, offsets, start_offset
             )
+        else:
+            if not args.repo:
+                raise ValueError("--repo is required when commits.jsonl is missing")
+            paths = None if args.all_communities else list(file_communities)
+            commit_iter = load_git_commits(
+                source, args.repo, args.since, args.until, args.include_merges, paths
+            )
+
+    if store is not None:
+        community_rows = collect_store_rows(store, file_communities, people, args, since, until)
+    else:
+        community_rows = collect_commit_rows(commit_iter, file_communities, people, args)
+
+    if not community_rows:
+        return None
+
+    header = [
+        "period",
+        "rank",
+        "name",
+        "email",
+        "primary_tz_offset",
+        "community_touches",
+        "touch_share",
+    ]
+    if multi:
+        header = ["community_id", *header]
+        rows = (
+            [community_id, *row]
+            for community_id in sorted(community_rows)
+            for row in rank_maintainers(community_rows[community_id], people, args)
+        )
+    else:
+        rows = rank_maintainers(community_rows[community_id], people, args)
+    return header, rows
+
+
+def maintainers(
+    source: Source | str, **options: object
+) -> tuple[list[str], list[list[object]]]:
+    """Rank community maintainers in-process and return (header, rows).
+
+    source is a data directory or a map from build_ownership_map.compute_ownership_map()
+    built with keep_commits=True. Options mirror the CLI flags, e.g.
+    maintainers(ownership_map, file="src/auth/login.py", bucket="quarter").
+    """
+    argv = []
+    for key, value in options.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif value is not None and value is not False:
+            argv.extend([flag, str(value)])
+    args = parse_args(argv)
+    result = run_maintainers(args, Path(source) if isinstance(source, str) else source)
+    if result is None:
+        return [], []
+    header, rows = result
+    return header, list(rows)
+
 
+def main() -> int:
+    args = parse_args()
+    data_dir = Path(args.data_dir)
+    if not data_dir.exists():
+        print(f"Data directory not found: {data_dir}", file=sys.stderr)
+        return 1
+
+    try:
+        result = run_maintainers(args, data_dir)
+        if result is None:
+            print(
+                "No commits touching community files for the selected window.", file=sys.stderr
+            )
+            return 0
+        write_rows(args.output, *result)
+    except (ValueError, KeyError, FileNotFoundError, RuntimeError) as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
     return 0
 
 
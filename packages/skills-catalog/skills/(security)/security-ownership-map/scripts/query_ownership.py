@@ -5,14 +5,41 @@ from __future__ import annotations
 
 import argparse
 import csv
+import heapq
+import itertools
 import json
+import mmap
+import os
+import pickle
+import re
+import struct
 import sys
+import zlib
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Sequence, TypeVar, Union
 
+from build_ownership_map import compute_hidden_owners
 
-def parse_args() -> argparse.Namespace:
+CACHE_DIR = ".cache"
+SHARD_MANIFEST = "shards.json"
+# Container header written by build_ownership_map.encode_bitmap: key, kind, count - 1.
+BITMAP_CONTAINER = struct.Struct("<HBH")
+# Turns the "0"/"1" digits of a bitset's binary string into 0/1 bytes.
+BIT_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+CACHE_VERSION = 1
+
+T = TypeVar("T")
+# A data directory of ownership-map artifacts, or an in-memory map from
+# build_ownership_map.compute_ownership_map().
+Source = Union[Path, dict]
+# Extra people/files/edges columns written by builds with --churn.
+CHURN_FIELDS = ("lines_added", "lines_deleted")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Query ownership-map outputs with bounded JSON results."
     )
@@ -37,6 +64,7 @@ def parse_args() -> argparse.Namespace:
     files.add_argument("--path-contains", default=None)
     files.add_argument("--tag", default=None)
     files.add_argument("--bus-factor-max", type=int, default=None)
+    files.add_argument("--truck-factor-max", type=int, default=None)
     files.add_argument("--sensitivity-min", type=float, default=0.0)
 
     person = subparsers.add_parser("person", help="Show person details and top files")
@@ -55,11 +83,39 @@ def parse_args() -> argparse.Namespace:
     cochange.add_argument("--sort", default="jaccard")
     cochange.add_argument("--min-jaccard", type=float, default=0.0)
     cochange.add_argument("--min-count", type=int, default=1)
+    cochange.add_argument(
+        "--exact",
+        action="store_true",
+        help=(
+            "Intersect this file's commit bitmap with every other file's instead of reading "
+            "cochange_edges.csv; scales with the number of files, use --with for one pair"
+        ),
+    )
+    cochange.add_argument(
+        "--with",
+        "--with-file",
+        dest="with_file",
+        default=None,
+        help="Exact co-change with one other file",
+    )
+
+    dir_cmd = subparsers.add_parser("dir", help="Show directory rollups from dirs.csv")
+    dir_cmd.add_argument("--dir", default=None, help="Exact directory; also lists its subdirs")
+    dir_cmd.add_argument("--depth", type=int, default=None)
+    dir_cmd.add_argument("--limit", type=int, default=20)
+    dir_cmd.add_argument("--sort", default="sensitive_weight")
+    dir_cmd.add_argument("--sensitive-min", type=float, default=0.0)
 
     tag = subparsers.add_parser("tag", help="Show top people/files for a sensitive tag")
     tag.add_argument("--tag", required=True)
     tag.add_argument("--limit", type=int, default=20)
 
+    hidden = subparsers.add_parser(
+        "hidden-owners", help="Recompute hidden owners from tag rollups"
+    )
+    hidden.add_argument("--owner-threshold", type=float, default=0.5)
+    hidden.add_argument("--tag", default=None)
+
     summary = subparsers.add_parser("summary", help="Show summary.json sections")
     summary.add_argument("--section", default=None)
 
@@ -72,7 +128,30 @@ def parse_args() -> argparse.Namespace:
     community.add_argument("--include-files", action="store_true")
     community.add_argument("--file-limit", type=int, default=50)
 
-    return parser.parse_args()
+    codeowners = subparsers.add_parser(
+        "codeowners", help="Report files whose CODEOWNERS are not among their top maintainers"
+    )
+    codeowners.add_argument(
+        "--codeowners",
+        default=None,
+        help="CODEOWNERS file (default: .github/, root or docs/ of the repo in summary.json)",
+    )
+    codeowners.add_argument(
+        "--owner-map",
+        default=None,
+        help="CSV of owner,person_id rows mapping @handles/@org/teams to people",
+    )
+    codeowners.add_argument("--top", type=int, default=3, help="Top maintainers per file")
+    codeowners.add_argument("--limit", type=int, default=20)
+    codeowners.add_argument("--tag", default=None)
+    codeowners.add_argument("--sensitive-only", action="store_true")
+
+    diff = subparsers.add_parser("diff", help="Compare with an older ownership-map output")
+    diff.add_argument("--base", required=True, help="Older data directory to compare against")
+    diff.add_argument("--limit", type=int, default=20)
+    diff.add_argument("--tag", default=None, help="Only report new owners for this tag")
+
+    return parser.parse_args(argv)
 
 
 def to_int(value: str) -> int:
@@ -95,22 +174,175 @@ def read_csv(path: Path) -> Iterable[dict[str, str]]:
         yield from reader
 
 
-def load_people(data_dir: Path) -> list[dict[str, object]]:
-    people_path = data_dir / "people.csv"
+def cache_key(path: Path) -> tuple[int, int, int]:
+    stat = path.stat()
+    return CACHE_VERSION, stat.st_size, stat.st_mtime_ns
+
+
+def load_cached(path: Path, name: str, parse: Callable[[Path], T]) -> T:
+    """Return parse(path), reusing a pickle keyed by the artifact's size and mtime.
+
+    community_maintainers.py imports this, cached and CACHE_VERSION, so both readers share one
+    cache format and version.
+    """
+    return cached(path.parent / CACHE_DIR / f"{name}.pickle", cache_key(path), lambda: parse(path))
+
+
+def cached(cache_path: Path, key: tuple[object, ...], produce: Callable[[], T]) -> T:
+    try:
+        with cache_path.open("rb") as handle:
+            cached_key, data = pickle.load(handle)
+        if tuple(cached_key) == key:
+            return data
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+        pass
+
+    data = produce()
+    try:
+        cache_path.parent.mkdir(exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("wb") as handle:
+            pickle.dump((key, data), handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return data
+
+
+def source_label(source: Source) -> str:
+    return str(source) if isinstance(source, Path) else "<in-memory>"
+
+
+def shard_table(source: Source, name: str) -> dict[str, object] | None:
+    """Manifest entry for a table written with --edge-shards, or None if it is a single CSV."""
+    if not isinstance(source, Path) or (source / f"{name}.csv").exists():
+        return None
+    manifest_path = source / SHARD_MANIFEST
+    if not manifest_path.exists():
+        return None
+    return parse_json(manifest_path).get("tables", {}).get(name)
+
+
+def has_artifact(source: Source, name: str) -> bool:
+    if isinstance(source, Path):
+        if (source / name).exists():
+            return True
+        stem, suffix = name.rsplit(".", 1)
+        return suffix == "csv" and shard_table(source, stem) is not None
+    stem, suffix = name.rsplit(".", 1)
+    if suffix == "csv":
+        return stem in source["tables"]
+    return source.get(stem) is not None
+
+
+def require_artifact(source: Source, name: str) -> None:
+    """Explain artifacts an --approximate build does not write instead of failing on the path."""
+    if has_artifact(source, name) or not has_artifact(source, "summary.json"):
+        return
+    if load_document(source, "summary").get("parameters", {}).get("approximate"):
+        raise ValueError(
+            f"{name} is not available in --approximate builds; rebuild without --approximate"
+        )
+
+
+def read_table(source: Source, name: str) -> Iterable[dict[str, str]]:
+    """Yield the rows of <name>.csv, or of the same table held by an in-memory map."""
+    require_artifact(source, f"{name}.csv")
+    table = shard_table(source, name)
+    if table is not None:
+        shards = [read_csv(source / part["path"]) for part in table["parts"]]
+        sorted_by = table.get("sorted_by") or []
+        if sorted_by:
+            # Each shard keeps the global sort order, so a k-way merge restores it.
+            yield from heapq.merge(
+                *shards, key=lambda row: tuple(row.get(column, "") for column in sorted_by)
+            )
+        else:
+            yield from itertools.chain.from_iterable(shards)
+        return
+    if isinstance(source, Path):
+        yield from read_csv(source / f"{name}.csv")
+        return
+    header, rows = source["tables"][name]
+    for row in rows:
+        yield dict(zip(header, row))
+
+
+def scan_rows(
+    rows: Iterable[dict[str, str]], columns: Sequence[str], values: frozenset[str]
+) -> list[dict[str, str]]:
+    """Rows where any of columns holds one of values."""
+    return [row for row in rows if any(row.get(column) in values for column in columns)]
+
+
+def scan_shard(path: Path, columns: Sequence[str], values: frozenset[str]) -> list[dict[str, str]]:
+    return scan_rows(read_csv(path), columns, values)
+
+
+def scan_table(
+    source: Source,
+    name: str,
+    columns: Sequence[str],
+    values: Iterable[str],
+    key: str | None = None,
+) -> list[dict[str, str]]:
+    """Return the rows where any of columns holds one of values, in table order.
+
+    Shards are parsed and filtered in worker processes, since csv parsing holds the GIL.
+    With key, only the shard that holds rows whose shard-key column equals key is read.
+    """
+    values = frozenset(values)
+    table = shard_table(source, name)
+    if table is None:
+        return scan_rows(read_table(source, name), columns, values)
+    paths = [source / part["path"] for part in table["parts"]]
+    if key is not None:
+        paths = [paths[zlib.crc32(key.encode("utf-8")) % int(table["shards"])]]
+    if len(paths) == 1:
+        shards = [scan_shard(paths[0], columns, values)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as pool:
+            count = len(paths)
+            shards = list(pool.map(scan_shard, paths, [columns] * count, [values] * count))
+    sorted_by = table.get("sorted_by") or []
+    if not sorted_by:
+        return [row for shard in shards for row in shard]
+    return list(
+        heapq.merge(*shards, key=lambda row: tuple(row.get(column, "") for column in sorted_by))
+    )
+
+
+def load_table(
+    source: Source, name: str, parse: Callable[[Iterable[dict[str, str]]], T]
+) -> T:
+    if isinstance(source, Path):
+        return load_cached(source / f"{name}.csv", name, lambda path: parse(read_csv(path)))
+    return parse(read_table(source, name))
+
+
+def load_document(source: Source, name: str) -> object:
+    if isinstance(source, Path):
+        return load_cached(source / f"{name}.json", name, parse_json)
+    return source[name]
+
+
+def parse_people(rows: Iterable[dict[str, str]]) -> list[dict[str, object]]:
     people = []
-    for row in read_csv(people_path):
+    for row in rows:
         person = dict(row)
         person["touches"] = to_int(row.get("touches", "0"))
         person["commit_count"] = to_int(row.get("commit_count", "0"))
         person["sensitive_touches"] = to_float(row.get("sensitive_touches", "0"))
+        for field in CHURN_FIELDS:
+            if field in row:
+                person[field] = to_int(row[field])
         people.append(person)
     return people
 
 
-def load_files(data_dir: Path) -> list[dict[str, object]]:
-    files_path = data_dir / "files.csv"
+def parse_files(rows: Iterable[dict[str, str]]) -> list[dict[str, object]]:
     files = []
-    for row in read_csv(files_path):
+    for row in rows:
         file_entry = dict(row)
         file_entry["touches"] = to_int(row.get("touches", "0"))
         file_entry["commit_count"] = to_int(row.get("commit_count", "0"))
@@ -118,29 +350,82 @@ def load_files(data_dir: Path) -> list[dict[str, object]]:
         file_entry["sensitivity_score"] = to_float(row.get("sensitivity_score", "0"))
         tags = row.get("sensitivity_tags", "")
         file_entry["sensitivity_tags"] = [tag for tag in tags.split(";") if tag]
+        for field in CHURN_FIELDS:
+            if field in row:
+                file_entry[field] = to_int(row[field])
+        if "truck_factor" in row:
+            file_entry["truck_factor"] = to_int(row["truck_factor"])
+            file_entry["doa_authors"] = [a for a in row.get("doa_authors", "").split(";") if a]
         files.append(file_entry)
     return files
 
 
-def load_summary(data_dir: Path) -> dict[str, object]:
-    summary_path = data_dir / "summary.json"
-    with summary_path.open("r", encoding="utf-8") as handle:
+def parse_community_files(rows: Iterable[dict[str, str]]) -> list[tuple[str, int]]:
+    return [(row.get("file_id", ""), to_int(row.get("community_id", "-1"))) for row in rows]
+
+
+def parse_dirs(rows: Iterable[dict[str, str]]) -> list[dict[str, object]]:
+    dirs = []
+    for row in rows:
+        owners = []
+        for entry in row.get("top_owners", "").split(";"):
+            person_id, _, touches = entry.rpartition(":")
+            if person_id:
+                owners.append({"person_id": person_id, "touches": to_int(touches)})
+        dirs.append(
+            {
+                "dir": row.get("dir", ""),
+                "depth": to_int(row.get("depth", "0")),
+                "files": to_int(row.get("files", "0")),
+                "touches": to_int(row.get("touches", "0")),
+                "authors": to_int(row.get("authors", "0")),
+                "sensitive_weight": to_float(row.get("sensitive_weight", "0")),
+                "top_owners": owners,
+                "top_owner_share": to_float(row.get("top_owner_share", "0")),
+            }
+        )
+        if "truck_factor" in row:
+            dirs[-1]["truck_factor"] = to_int(row["truck_factor"])
+    return dirs
+
+
+def parse_json(path: Path) -> object:
+    with path.open("r", encoding="utf-8") as handle:
         return json.load(handle)
 
 
-def load_communities(data_dir: Path) -> list[dict[str, object]]:
-    communities_path = data_dir / "communities.json"
-    if not communities_path.exists():
+def load_people(source: Source) -> list[dict[str, object]]:
+    return load_table(source, "people", parse_people)
+
+
+def load_files(source: Source) -> list[dict[str, object]]:
+    return load_table(source, "files", parse_files)
+
+
+def load_summary(source: Source) -> dict[str, object]:
+    return load_document(source, "summary")
+
+
+def load_communities(source: Source) -> list[dict[str, object]]:
+    require_artifact(source, "communities.json")
+    if not has_artifact(source, "communities.json"):
         raise FileNotFoundError("communities.json not found; rerun build with --communities")
-    with communities_path.open("r", encoding="utf-8") as handle:
-        return json.load(handle)
+    return load_document(source, "communities")
+
 
+def load_tag_rollups(source: Source) -> dict[str, dict[str, object]] | None:
+    if not has_artifact(source, "tags.json"):
+        return None
+    return load_document(source, "tags")
 
-def load_cochange_edges(data_dir: Path) -> Iterable[dict[str, object]]:
-    edges_path = data_dir / "cochange_edges.csv"
-    if not edges_path.exists():
+
+def load_cochange_edges(source: Source, file_id: str) -> Iterable[dict[str, object]]:
+    """Co-change edges with file_id at either end."""
+    require_artifact(source, "cochange_edges.csv")
+    if not has_artifact(source, "cochange_edges.csv"):
         raise FileNotFoundError("cochange_edges.csv not found; rerun build without --no-cochange")
-    for row in read_csv(edges_path):
+    rows = scan_table(source, "cochange_edges", ("file_a", "file_b"), [file_id])
+    for row in rows:
         yield {
             "file_a": row.get("file_a"),
             "file_b": row.get("file_b"),
@@ -149,6 +434,108 @@ def load_cochange_edges(data_dir: Path) -> Iterable[dict[str, object]]:
         }
 
 
+def map_array(path: Path, typecode: str, itemsize: int, byteorder: str) -> Sequence[int]:
+    """Memory-map a raw array artifact; also used for commit_store/ by community_maintainers."""
+    values = array(typecode)
+    if values.itemsize != itemsize:
+        raise ValueError(f"{path} was written with an incompatible item size; rebuild it")
+    if byteorder != sys.byteorder:
+        with path.open("rb") as handle:
+            values.frombytes(handle.read())
+        values.byteswap()
+        return values
+    if path.stat().st_size == 0:
+        return values
+    with path.open("rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast(typecode)
+
+
+def open_cochange_bitmaps(source: Source) -> dict[str, object] | None:
+    """Per-file co-change commit bitmaps as commits, paths, cardinality and a blob reader."""
+    if not isinstance(source, Path):
+        bitmaps = source.get("cochange_bitmaps")
+        if bitmaps is None:
+            return None
+        return {**bitmaps, "blob": bitmaps["blobs"].__getitem__}
+    bitmap_dir = source / "cochange_bitmaps"
+    manifest_path = bitmap_dir / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    manifest = parse_json(manifest_path)
+    arrays = {
+        name: map_array(
+            bitmap_dir / spec["file"], spec["typecode"], spec["itemsize"], manifest["byteorder"]
+        )
+        for name, spec in manifest["arrays"].items()
+    }
+    offsets = arrays["offsets"]
+    containers = bitmap_dir / manifest["containers"]
+    data: Sequence[int] = b""
+    if containers.stat().st_size:
+        with containers.open("rb") as handle:
+            data = memoryview(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+    return {
+        "commits": int(manifest.get("commits", 0)),
+        "paths": load_cached(bitmap_dir / "paths.json", "cochange-bitmap-paths", parse_json),
+        "cardinality": arrays["cardinality"],
+        "blob": lambda index: data[offsets[index] : offsets[index + 1]],
+    }
+
+
+def iter_containers(blob: Sequence[int]) -> Iterator[tuple[int, int, int, Sequence[int]]]:
+    position = 0
+    while position < len(blob):
+        key, kind, count = BITMAP_CONTAINER.unpack_from(blob, position)
+        position += BITMAP_CONTAINER.size
+        length = 8192 if kind else 2 * (count + 1)
+        yield key, kind, count + 1, blob[position : position + length]
+        position += length
+
+
+def decode_bitmap(blob: Sequence[int]) -> dict[int, tuple[int, object, bytes]]:
+    """Map each container key to (kind, values, members) for intersecting other raw blobs.
+
+    A bitmap container becomes one int bitset plus a 64 KiB table with a 0/1 byte per low
+    value, so array containers of other files are counted with C-level lookups. An array
+    container becomes a set of its low 16-bit values. Nothing is expanded into a set of up to
+    65536 ints.
+    """
+    decoded: dict[int, tuple[int, object, bytes]] = {}
+    for key, kind, count, payload in iter_containers(blob):
+        if kind:
+            bits = int.from_bytes(payload, "little")
+            members = f"{bits:065536b}"[::-1].encode("ascii").translate(BIT_BYTES)
+            decoded[key] = (kind, bits, members)
+        else:
+            decoded[key] = (kind, frozenset(struct.unpack(f"<{count}H", payload)), b"")
+    return decoded
+
+
+def intersection_count(
+    decoded: dict[int, tuple[int, object, bytes]], blob: Sequence[int]
+) -> int:
+    """Count ids shared with a raw blob, skipping containers whose key is absent from decoded.
+
+    Only matching containers of blob are read, straight from their payload bytes.
+    """
+    total = 0
+    for key, kind, count, payload in iter_containers(blob):
+        container = decoded.get(key)
+        if container is None:
+            continue
+        decoded_kind, values, members = container
+        if kind and decoded_kind:
+            total += (values & int.from_bytes(payload, "little")).bit_count()
+        elif kind:
+            total += sum(payload[low >> 3] >> (low & 7) & 1 for low in values)
+        elif decoded_kind:
+            total += sum(map(members.__getitem__, struct.unpack(f"<{count}H", payload)))
+        else:
+            total += len(values.intersection(struct.unpack(f"<{count}H", payload)))
+    return total
+
+
 def select_single(records: list[dict[str, object]], key: str, query: str) -> dict[str, object]:
     exact = [record for record in records if str(record.get(key, "")) == query]
     if exact:
@@ -162,12 +549,9 @@ def select_single(records: list[dict[str, object]], key: str, query: str) -> dic
     raise ValueError(f"Multiple matches for {query}: {', '.join(candidates)}")
 
 
-def top_edges_for_person(data_dir: Path, person_id: str) -> list[dict[str, object]]:
-    edges_path = data_dir / "edges.csv"
+def top_edges_for_person(source: Source, person_id: str) -> list[dict[str, object]]:
     results = []
-    for row in read_csv(edges_path):
-        if row.get("person_id") != person_id:
-            continue
+    for row in scan_table(source, "edges", ("person_id",), [person_id]):
         results.append(
             {
                 "file_id": row.get("file_id"),
@@ -180,12 +564,11 @@ def top_edges_for_person(data_dir: Path, person_id: str) -> list[dict[str, objec
     return results
 
 
-def top_edges_for_file(data_dir: Path, file_id: str) -> list[dict[str, object]]:
-    edges_path = data_dir / "edges.csv"
+def top_edges_for_file(source: Source, file_id: str) -> list[dict[str, object]]:
     results = []
-    for row in read_csv(edges_path):
-        if row.get("file_id") != file_id:
-            continue
+    # Edges are sharded by file_id, so only one shard can hold this file.
+    rows = scan_table(source, "edges", ("file_id",), [file_id], key=file_id)
+    for row in rows:
         results.append(
             {
                 "person_id": row.get("person_id"),
@@ -202,8 +585,8 @@ def sort_records(records: list[dict[str, object]], key: str) -> list[dict[str, o
     return sorted(records, key=lambda item: item.get(key, 0), reverse=True)
 
 
-def handle_people(args: argparse.Namespace, data_dir: Path) -> None:
-    people = load_people(data_dir)
+def handle_people(args: argparse.Namespace, source: Source) -> object:
+    people = load_people(source)
     if args.email_contains:
         people = [p for p in people if args.email_contains in p.get("email", "")]
     people = [p for p in people if p["touches"] >= args.min_touches]
@@ -218,20 +601,23 @@ def handle_people(args: argparse.Namespace, data_dir: Path) -> None:
             "commit_count": p.get("commit_count"),
             "sensitive_touches": p.get("sensitive_touches"),
             "primary_tz_offset": p.get("primary_tz_offset"),
+            **{field: p[field] for field in CHURN_FIELDS if field in p},
         }
         for p in people
     ]
-    print(json.dumps(payload, indent=2))
+    return payload
 
 
-def handle_files(args: argparse.Namespace, data_dir: Path) -> None:
-    files = load_files(data_dir)
+def handle_files(args: argparse.Namespace, source: Source) -> object:
+    files = load_files(source)
     if args.path_contains:
         files = [f for f in files if args.path_contains in f.get("path", "")]
     if args.tag:
         files = [f for f in files if args.tag in f.get("sensitivity_tags", [])]
     if args.bus_factor_max is not None:
         files = [f for f in files if f["bus_factor"] <= args.bus_factor_max]
+    if args.truck_factor_max is not None:
+        files = [f for f in files if f.get("truck_factor", 0) <= args.truck_factor_max]
     files = [f for f in files if f["sensitivity_score"] >= args.sensitivity_min]
     files = sort_records(files, args.sort)[: args.limit]
     payload = [
@@ -240,21 +626,23 @@ def handle_files(args: argparse.Namespace, data_dir: Path) -> None:
             "path": f.get("path"),
             "touches": f.get("touches"),
             "bus_factor": f.get("bus_factor"),
+            **({"truck_factor": f["truck_factor"]} if "truck_factor" in f else {}),
             "sensitivity_score": f.get("sensitivity_score"),
             "sensitivity_tags": f.get("sensitivity_tags"),
             "last_seen": f.get("last_seen"),
+            **{field: f[field] for field in CHURN_FIELDS if field in f},
         }
         for f in files
     ]
-    print(json.dumps(payload, indent=2))
+    return payload
 
 
-def handle_person(args: argparse.Namespace, data_dir: Path) -> None:
-    people = load_people(data_dir)
+def handle_person(args: argparse.Namespace, source: Source) -> object:
+    people = load_people(source)
     person = select_single(people, "person_id", args.person)
-    files = load_files(data_dir)
+    files = load_files(source)
     file_map = {f["file_id"]: f for f in files}
-    edges = top_edges_for_person(data_dir, person["person_id"])
+    edges = top_edges_for_person(source, person["person_id"])
     edges = sort_records(edges, args.sort)[: args.limit]
     payload = {
         "person": {
@@ -280,17 +668,17 @@ def handle_person(args: argparse.Namespace, data_dir: Path) -> None:
             for edge in edges
         ],
     }
-    print(json.dumps(payload, indent=2))
+    return payload
 
 
-def handle_file(args: argparse.Namespace, data_dir: Path) -> None:
-    files = load_files(data_dir)
+def handle_file(args: argparse.Namespace, source: Source) -> object:
+    files = load_files(source)
     file_entry = select_single(files, "file_id", args.file)
-    people = load_people(data_dir)
+    people = load_people(source)
     people_map = {p["person_id"]: p for p in people}
-    edges = top_edges_for_file(data_dir, file_entry["file_id"])
+    edges = top_edges_for_file(source, file_entry["file_id"])
     edges = sort_records(edges, args.sort)[: args.limit]
-    payload = {
+    payload: dict[str, object] = {
         "file": {
             "file_id": file_entry.get("file_id"),
             "path": file_entry.get("path"),
@@ -315,15 +703,82 @@ def handle_file(args: argparse.Namespace, data_dir: Path) -> None:
             for edge in edges
         ],
     }
-    print(json.dumps(payload, indent=2))
+    if "truck_factor" in file_entry:
+        payload["file"]["truck_factor"] = file_entry["truck_factor"]
+        payload["file"]["doa_authors"] = file_entry["doa_authors"]
+    if has_artifact(source, "blame.csv"):
+        payload["blame_owners"] = [
+            {
+                "person_id": row.get("person_id"),
+                "name": people_map.get(row.get("person_id"), {}).get("name"),
+                "lines": to_int(row.get("lines", "0")),
+                "line_share": to_float(row.get("line_share", "0")),
+            }
+            for row in read_table(source, "blame")
+            if row.get("file_id") == file_entry["file_id"]
+        ][: args.limit]
+    return payload
+
+
+def exact_cochange(
+    args: argparse.Namespace, source: Source, files: list[dict[str, object]], file_id: str
+) -> object:
+    bitmaps = open_cochange_bitmaps(source)
+    if bitmaps is None:
+        raise FileNotFoundError("cochange_bitmaps not found; rerun build with --cochange-bitmaps")
+    index = {path: position for position, path in enumerate(bitmaps["paths"])}
+    cardinality = bitmaps["cardinality"]
+    position = index.get(file_id)
+    decoded = decode_bitmap(bitmaps["blob"](position)) if position is not None else {}
+    file_commits = cardinality[position] if position is not None else 0
+
+    def pair(other: str) -> dict[str, object]:
+        other_position = index.get(other)
+        count = other_commits = 0
+        if other_position is not None:
+            other_commits = cardinality[other_position]
+            if decoded:
+                count = intersection_count(decoded, bitmaps["blob"](other_position))
+        denom = file_commits + other_commits - count
+        return {
+            "file_id": other,
+            "path": other,
+            "cochange_count": count,
+            "jaccard": round(count / denom, 6) if denom > 0 else 0.0,
+            "commits": other_commits,
+        }
+
+    file_payload = {"file_id": file_id, "path": file_id, "commits": file_commits}
+    if args.with_file is not None:
+        other = select_single(files, "file_id", args.with_file)
+        return {"file": file_payload, "with": pair(str(other["file_id"]))}
+    # Listing neighbors still visits every file, but a file whose commit count alone rules it
+    # out (count <= min(a, b), jaccard <= min(a, b) / max(a, b)) is skipped before its blob is
+    # read, and only containers sharing a key with this file are intersected.
+    neighbors = []
+    for other, other_position in index.items():
+        if other == file_id:
+            continue
+        other_commits = cardinality[other_position]
+        bound = min(file_commits, other_commits)
+        peak = max(file_commits, other_commits)
+        if bound < args.min_count or (peak and round(bound / peak, 6) < args.min_jaccard):
+            continue
+        entry = pair(other)
+        if entry["cochange_count"] < args.min_count or entry["jaccard"] < args.min_jaccard:
+            continue
+        neighbors.append(entry)
+    return {"file": file_payload, "neighbors": sort_records(neighbors, args.sort)[: args.limit]}
 
 
-def handle_cochange(args: argparse.Namespace, data_dir: Path) -> None:
-    files = load_files(data_dir)
+def handle_cochange(args: argparse.Namespace, source: Source) -> object:
+    files = load_files(source)
     file_entry = select_single(files, "file_id", args.file)
+    if args.exact or args.with_file is not None:
+        return exact_cochange(args, source, files, str(file_entry["file_id"]))
 
     neighbors = []
-    for row in load_cochange_edges(data_dir):
+    for row in load_cochange_edges(source, file_entry["file_id"]):
         file_a = row.get("file_a")
         file_b = row.get("file_b")
         if file_a == file_entry["file_id"]:
@@ -355,22 +810,80 @@ def handle_cochange(args: argparse.Namespace, data_dir: Path) -> None:
         },
         "neighbors": neighbors,
     }
-    print(json.dumps(payload, indent=2))
+    return payload
+
+
+def handle_dir(args: argparse.Namespace, source: Source) -> object:
+    if not has_artifact(source, "dirs.csv"):
+        raise FileNotFoundError("dirs.csv not found; rerun build with --dir-depths")
+    dirs = load_table(source, "dirs", parse_dirs)
+    # --sensitive-min narrows listings only; an exact --dir lookup always finds its directory.
+    listed = [d for d in dirs if d["sensitive_weight"] >= args.sensitive_min]
+    if args.dir is None:
+        if args.depth is not None:
+            listed = [d for d in listed if d["depth"] == args.depth]
+        return sort_records(listed, args.sort)[: args.limit]
+
+    query = args.dir.strip("/") or "."
+    matches = [d for d in dirs if d["dir"] == query]
+    if not matches:
+        depths = sorted({d["depth"] for d in dirs})
+        raise ValueError(f"Directory not found in dirs.csv (built depths: {depths}): {query}")
+    entry = matches[0]
+    prefix = "" if query == "." else f"{query}/"
+    subdirs = [
+        d for d in listed if d["dir"].startswith(prefix) and d["depth"] == entry["depth"] + 1
+    ]
+    return {"dir": entry, "subdirs": sort_records(subdirs, args.sort)[: args.limit]}
+
+
+def handle_tag(args: argparse.Namespace, source: Source) -> object:
+    rollups = load_tag_rollups(source)
+    if rollups is not None:
+        rollup = rollups.get(args.tag, {})
+        top_people = [
+            {
+                "person_id": entry.get("person_id"),
+                "name": entry.get("name"),
+                "email": entry.get("email"),
+                "touches": entry.get("touches"),
+            }
+            for entry in rollup.get("people", [])
+            if entry.get("touches")
+        ][: args.limit]
+        top_files = rollup.get("files", [])[: args.limit]
+    else:
+        top_people, top_files = scan_tag(args, source)
+
+    payload = {
+        "tag": args.tag,
+        "top_people": top_people,
+        "top_files": [
+            {
+                "file_id": entry.get("file_id"),
+                "path": entry.get("path"),
+                "touches": entry.get("touches"),
+                "bus_factor": entry.get("bus_factor"),
+            }
+            for entry in top_files
+        ],
+    }
+    return payload
 
 
-def handle_tag(args: argparse.Namespace, data_dir: Path) -> None:
-    files = load_files(data_dir)
+def scan_tag(
+    args: argparse.Namespace, source: Source
+) -> tuple[list[dict[str, object]], list[dict[str, object]]]:
+    """Fallback for outputs built before tags.json existed."""
+    files = load_files(source)
     tagged_files = [f for f in files if args.tag in f.get("sensitivity_tags", [])]
     tagged_ids = {f["file_id"] for f in tagged_files}
 
     person_touch = defaultdict(int)
-    edges_path = data_dir / "edges.csv"
-    for row in read_csv(edges_path):
-        if row.get("file_id") not in tagged_ids:
-            continue
+    for row in scan_table(source, "edges", ("file_id",), tagged_ids):
         person_touch[row.get("person_id")] += to_int(row.get("touches", "0"))
 
-    people = load_people(data_dir)
+    people = load_people(source)
     people_map = {p["person_id"]: p for p in people}
     top_people = [
         {
@@ -388,36 +901,245 @@ def handle_tag(args: argparse.Namespace, data_dir: Path) -> None:
     top_files = sorted(tagged_files, key=lambda item: item.get("touches", 0), reverse=True)[
         : args.limit
     ]
+    return top_people, top_files
+
+
+def handle_hidden_owners(args: argparse.Namespace, source: Source) -> object:
+    rollups = load_tag_rollups(source)
+    if rollups is None:
+        raise FileNotFoundError("tags.json not found; rerun build to emit tag rollups")
+    if args.tag:
+        rollups = {args.tag: rollups[args.tag]} if args.tag in rollups else {}
+    return compute_hidden_owners(rollups, args.owner_threshold)
+
+
+def iter_sorted(
+    rows: Iterable[dict[str, str]], key: Callable[[dict[str, str]], object], label: str
+) -> Iterator[tuple[object, dict[str, str]]]:
+    previous = None
+    for row in rows:
+        current = key(row)
+        if previous is not None and current < previous:
+            raise ValueError(f"{label} is not sorted; rebuild it with the current builder to diff")
+        previous = current
+        yield current, row
+
+
+def merge_join(
+    base_rows: Iterator[tuple[object, dict[str, str]]],
+    head_rows: Iterator[tuple[object, dict[str, str]]],
+) -> Iterator[tuple[dict[str, str] | None, dict[str, str] | None]]:
+    """Yield (base_row, head_row) pairs from two key-sorted streams; missing side is None."""
+    base = next(base_rows, None)
+    head = next(head_rows, None)
+    while base is not None or head is not None:
+        if head is None or (base is not None and base[0] < head[0]):
+            yield base[1], None
+            base = next(base_rows, None)
+        elif base is None or head[0] < base[0]:
+            yield None, head[1]
+            head = next(head_rows, None)
+        else:
+            yield base[1], head[1]
+            base = next(base_rows, None)
+            head = next(head_rows, None)
+
+
+def push_bounded(
+    heap: list[tuple[object, int, dict[str, object]]],
+    limit: int,
+    score: object,
+    item: dict[str, object],
+    counter: Iterator[int],
+) -> None:
+    entry = (score, next(counter), item)
+    if len(heap) < limit:
+        heapq.heappush(heap, entry)
+    elif heap and entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def drain_bounded(heap: list[tuple[object, int, dict[str, object]]]) -> list[dict[str, object]]:
+    return [item for _score, _order, item in sorted(heap, reverse=True)]
+
+
+def diff_people(base: Source, source: Source, limit: int) -> dict[str, object]:
+    key = lambda row: row.get("person_id", "")  # noqa: E731
+    added: list[str] = []
+    removed: list[str] = []
+    added_count = removed_count = 0
+    for base_row, head_row in merge_join(
+        iter_sorted(read_table(base, "people"), key, f"{source_label(base)}/people.csv"),
+        iter_sorted(read_table(source, "people"), key, f"{source_label(source)}/people.csv"),
+    ):
+        if base_row is None:
+            added_count += 1
+            if len(added) < limit:
+                added.append(head_row.get("person_id", ""))
+        elif head_row is None:
+            removed_count += 1
+            if len(removed) < limit:
+                removed.append(base_row.get("person_id", ""))
+    return {
+        "added": added_count,
+        "removed": removed_count,
+        "added_sample": added,
+        "removed_sample": removed,
+    }
+
 
+def diff_files(
+    base: Source, source: Source, limit: int
+) -> tuple[dict[str, object], dict[str, list[str]]]:
+    key = lambda row: row.get("file_id", "")  # noqa: E731
+    counter = itertools.count()
+    added: list[str] = []
+    removed: list[str] = []
+    added_count = removed_count = drop_count = 0
+    drops: list[tuple[object, int, dict[str, object]]] = []
+    head_tags: dict[str, list[str]] = {}
+    for base_row, head_row in merge_join(
+        iter_sorted(read_table(base, "files"), key, f"{source_label(base)}/files.csv"),
+        iter_sorted(read_table(source, "files"), key, f"{source_label(source)}/files.csv"),
+    ):
+        if head_row is not None:
+            tags = [tag for tag in head_row.get("sensitivity_tags", "").split(";") if tag]
+            if tags:
+                head_tags[head_row.get("file_id", "")] = tags
+        if base_row is None:
+            added_count += 1
+            if len(added) < limit:
+                added.append(head_row.get("file_id", ""))
+            continue
+        if head_row is None:
+            removed_count += 1
+            if len(removed) < limit:
+                removed.append(base_row.get("file_id", ""))
+            continue
+        base_bus = to_int(base_row.get("bus_factor", "0"))
+        head_bus = to_int(head_row.get("bus_factor", "0"))
+        if head_bus < base_bus:
+            drop_count += 1
+            sensitivity = to_float(head_row.get("sensitivity_score", "0"))
+            push_bounded(
+                drops,
+                limit,
+                (sensitivity > 0, base_bus - head_bus, sensitivity),
+                {
+                    "path": head_row.get("path"),
+                    "bus_factor_before": base_bus,
+                    "bus_factor_after": head_bus,
+                    "sensitivity_tags": head_tags.get(head_row.get("file_id", ""), []),
+                },
+                counter,
+            )
+
+    base_orphaned = {
+        entry.get("path") for entry in load_summary(base).get("orphaned_sensitive_code", [])
+    }
+    newly_orphaned = [
+        entry
+        for entry in load_summary(source).get("orphaned_sensitive_code", [])
+        if entry.get("path") not in base_orphaned
+    ]
     payload = {
-        "tag": args.tag,
-        "top_people": top_people,
-        "top_files": [
+        "added": added_count,
+        "removed": removed_count,
+        "added_sample": added,
+        "removed_sample": removed,
+        "bus_factor_drops": drop_count,
+        "top_bus_factor_drops": drain_bounded(drops),
+        "newly_orphaned": len(newly_orphaned),
+        "newly_orphaned_sample": [
             {
-                "file_id": entry.get("file_id"),
                 "path": entry.get("path"),
-                "touches": entry.get("touches"),
                 "bus_factor": entry.get("bus_factor"),
+                "last_security_touch": entry.get("last_security_touch"),
+                "sensitivity_tags": entry.get("sensitivity_tags"),
             }
-            for entry in top_files
+            for entry in newly_orphaned[:limit]
         ],
     }
-    print(json.dumps(payload, indent=2))
+    return payload, head_tags
+
+
+def diff_edges(
+    base: Source,
+    source: Source,
+    limit: int,
+    head_tags: dict[str, list[str]],
+    tag: str | None,
+) -> dict[str, object]:
+    key = lambda row: (row.get("person_id", ""), row.get("file_id", ""))  # noqa: E731
+    counter = itertools.count()
+    added_count = removed_count = owner_count = 0
+    new_owners: list[tuple[object, int, dict[str, object]]] = []
+    for base_row, head_row in merge_join(
+        iter_sorted(read_table(base, "edges"), key, f"{source_label(base)}/edges.csv"),
+        iter_sorted(read_table(source, "edges"), key, f"{source_label(source)}/edges.csv"),
+    ):
+        if head_row is None:
+            removed_count += 1
+            continue
+        if base_row is not None:
+            continue
+        added_count += 1
+        tags = head_tags.get(head_row.get("file_id", ""))
+        if not tags or (tag and tag not in tags):
+            continue
+        owner_count += 1
+        sensitive_weight = to_float(head_row.get("sensitive_weight", "0"))
+        touches = to_int(head_row.get("touches", "0"))
+        push_bounded(
+            new_owners,
+            limit,
+            (sensitive_weight, touches),
+            {
+                "person_id": head_row.get("person_id"),
+                "file_id": head_row.get("file_id"),
+                "touches": touches,
+                "sensitive_weight": sensitive_weight,
+                "sensitivity_tags": tags,
+                "first_seen": head_row.get("first_seen"),
+            },
+            counter,
+        )
+    return {
+        "added": added_count,
+        "removed": removed_count,
+        "new_sensitive_owners": owner_count,
+        "top_new_sensitive_owners": drain_bounded(new_owners),
+    }
+
+
+def handle_diff(args: argparse.Namespace, source: Source) -> object:
+    base = Path(args.base)
+    if not base.exists():
+        raise FileNotFoundError(f"Base data directory not found: {base}")
+    files_payload, head_tags = diff_files(base, source, args.limit)
+    payload = {
+        "base": str(base),
+        "head": source_label(source),
+        "people": diff_people(base, source, args.limit),
+        "files": files_payload,
+        "edges": diff_edges(base, source, args.limit, head_tags, args.tag),
+    }
+    return payload
 
 
-def handle_summary(args: argparse.Namespace, data_dir: Path) -> None:
-    summary = load_summary(data_dir)
+def handle_summary(args: argparse.Namespace, source: Source) -> object:
+    summary = load_summary(source)
     if args.section:
         if args.section not in summary:
             raise ValueError(f"Section not found: {args.section}")
         payload = summary[args.section]
     else:
         payload = summary
-    print(json.dumps(payload, indent=2))
+    return payload
 
 
-def handle_communities(args: argparse.Namespace, data_dir: Path) -> None:
-    communities = load_communities(data_dir)
+def handle_communities(args: argparse.Namespace, source: Source) -> object:
+    communities = load_communities(source)
     if args.id is not None:
         matches = [entry for entry in communities if entry.get("id") == args.id]
         if not matches:
@@ -427,55 +1149,285 @@ def handle_communities(args: argparse.Namespace, data_dir: Path) -> None:
         payload = sorted(communities, key=lambda item: item.get("size", 0), reverse=True)[
             : args.limit
         ]
-    print(json.dumps(payload, indent=2))
+    return payload
 
 
-def handle_community(args: argparse.Namespace, data_dir: Path) -> None:
-    communities = load_communities(data_dir)
+def handle_community(args: argparse.Namespace, source: Source) -> object:
+    communities = load_communities(source)
     matches = [entry for entry in communities if entry.get("id") == args.id]
     if not matches:
         raise ValueError(f"Community id not found: {args.id}")
     entry = dict(matches[0])
     files = entry.pop("files", [])
+    if args.include_files and has_artifact(source, "community_files.csv"):
+        files = [
+            path
+            for path, community_id in load_table(source, "community_files", parse_community_files)
+            if community_id == args.id
+        ]
     payload = entry
     if args.include_files:
         payload["files"] = files[: args.file_limit]
         payload["files_truncated"] = len(files) > args.file_limit
-    print(json.dumps(payload, indent=2))
+    return payload
+
+
+CODEOWNERS_LOCATIONS = (".github/CODEOWNERS", "CODEOWNERS", "docs/CODEOWNERS")
+NOREPLY_SUFFIX = "@users.noreply.github.com"
+
+
+def parse_codeowners(path: Path) -> list[tuple[int, str, list[str]]]:
+    """Return (line number, pattern, owners) per rule, in file order."""
+    rules = []
+    with path.open("r", encoding="utf-8") as handle:
+        for number, raw in enumerate(handle, start=1):
+            line = re.sub(r"(?<!\\)#.*", "", raw).strip()
+            if not line:
+                continue
+            tokens = re.split(r"(?<!\\)\s+", line)
+            pattern = tokens[0].replace("\\ ", " ").replace("\\#", "#")
+            rules.append((number, pattern, tokens[1:]))
+    return rules
+
+
+def codeowners_regex(pattern: str) -> str:
+    """Translate a CODEOWNERS (gitignore-style) pattern into a full-path regex."""
+    anchored = pattern.startswith("/") or "/" in pattern.strip("/")
+    body = pattern.strip("/")
+    parts = []
+    index = 0
+    while index < len(body):
+        if body.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+        elif body.startswith("**", index):
+            parts.append(".*")
+            index += 2
+        elif body[index] == "*":
+            parts.append("[^/]*")
+            index += 1
+        elif body[index] == "?":
+            parts.append("[^/]")
+            index += 1
+        else:
+            parts.append(re.escape(body[index]))
+            index += 1
+    if pattern.endswith("/"):
+        suffix = "/.+"
+    elif body.endswith("*"):
+        # `docs/*` owns the files directly in docs/, not its subdirectories.
+        suffix = ""
+    else:
+        suffix = "(?:/.*)?"
+    return ("" if anchored else "(?:.*/)?") + "".join(parts) + suffix
+
+
+def compile_codeowners(rules: list[tuple[int, str, list[str]]]) -> Callable[[str], int | None]:
+    """Compile every rule into one alternation, latest rule first, so the first alternative
+    that matches is the last-matching rule; returns a path -> rule index resolver."""
+    if not rules:
+        return lambda path: None
+    combined = re.compile(
+        "|".join(
+            f"(?P<r{index}>{codeowners_regex(pattern)})"
+            for index, (_number, pattern, _owners) in reversed(list(enumerate(rules)))
+        )
+    )
+
+    def resolve(path: str) -> int | None:
+        match = combined.fullmatch(path)
+        return int(match.lastgroup[1:]) if match else None
+
+    return resolve
+
+
+def codeowner_people(
+    owners: Iterable[str], people: list[dict[str, object]], owner_map: dict[str, set[str]]
+) -> tuple[set[str], list[str]]:
+    """Resolve CODEOWNERS entries to person ids; returns (person ids, unresolved owners).
+
+    Emails match directly. @handles match an email local part or a GitHub noreply address.
+    Teams and anything else need --owner-map.
+    """
+    by_email: dict[str, set[str]] = defaultdict(set)
+    by_handle: dict[str, set[str]] = defaultdict(set)
+    for person in people:
+        person_id = str(person.get("person_id", ""))
+        email = str(person.get("email", "")).lower()
+        by_email[email].add(person_id)
+        local = email.split("@", 1)[0]
+        by_handle[local].add(person_id)
+        if email.endswith(NOREPLY_SUFFIX):
+            by_handle[local.split("+", 1)[-1]].add(person_id)
+    resolved: set[str] = set()
+    unresolved = []
+    for owner in owners:
+        if owner.startswith("@"):
+            matches = owner_map.get(owner.lower()) or by_handle.get(owner[1:].lower())
+        else:
+            matches = owner_map.get(owner.lower()) or by_email.get(owner.lower())
+        if matches:
+            resolved |= matches
+        else:
+            unresolved.append(owner)
+    return resolved, unresolved
+
+
+def find_codeowners(args: argparse.Namespace, source: Source) -> Path:
+    if args.codeowners:
+        path = Path(args.codeowners)
+        if not path.exists():
+            raise FileNotFoundError(f"CODEOWNERS not found: {path}")
+        return path
+    repo = Path(str(load_summary(source).get("repo", ".")))
+    for location in CODEOWNERS_LOCATIONS:
+        if (repo / location).exists():
+            return repo / location
+    raise FileNotFoundError(f"No CODEOWNERS in {repo}; pass --codeowners")
+
+
+def handle_codeowners(args: argparse.Namespace, source: Source) -> object:
+    codeowners_path = find_codeowners(args, source)
+    rules = parse_codeowners(codeowners_path)
+    resolve_rule = compile_codeowners(rules)
+    owner_map: dict[str, set[str]] = defaultdict(set)
+    if args.owner_map:
+        with open(args.owner_map, "r", encoding="utf-8") as handle:
+            for row in csv.reader(handle):
+                if len(row) >= 2 and not row[0].startswith("#"):
+                    owner_map[row[0].strip().lower()].add(row[1].strip())
+
+    people = load_people(source)
+    rule_people = {}
+    unresolved_owners: set[str] = set()
+    for index, (_number, _pattern, owners) in enumerate(rules):
+        rule_people[index], unresolved = codeowner_people(owners, people, owner_map)
+        unresolved_owners.update(unresolved)
+
+    files = {
+        f["file_id"]: f
+        for f in load_files(source)
+        if (not args.tag or args.tag in f["sensitivity_tags"])
+        and (not args.sensitive_only or f["sensitivity_tags"])
+    }
+    # One streaming pass over edges keeps a bounded top-maintainer heap per file.
+    top_by_file: dict[str, list[tuple[int, str]]] = defaultdict(list)
+    for row in read_table(source, "edges"):
+        file_id = row.get("file_id", "")
+        if file_id not in files:
+            continue
+        entry = (to_int(row.get("touches", "0")), row.get("person_id", ""))
+        heap = top_by_file[file_id]
+        if len(heap) < args.top:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    counter = itertools.count()
+    drift: list[tuple[object, int, dict[str, object]]] = []
+    unowned: list[tuple[object, int, dict[str, object]]] = []
+    drift_count = unowned_count = unresolved_count = aligned_count = 0
+    for file_id, file_entry in files.items():
+        top = sorted(top_by_file.get(file_id, []), reverse=True)
+        score = (file_entry["sensitivity_score"], file_entry["touches"])
+        entry: dict[str, object] = {
+            "path": file_entry.get("path"),
+            "sensitivity_tags": file_entry["sensitivity_tags"],
+            "top_maintainers": [
+                {"person_id": person_id, "touches": touches} for touches, person_id in top
+            ],
+        }
+        index = resolve_rule(str(file_id))
+        if index is None or not rules[index][2]:
+            unowned_count += 1
+            push_bounded(unowned, args.limit, score, entry, counter)
+            continue
+        declared = rule_people[index]
+        if not declared:
+            unresolved_count += 1
+            continue
+        if declared & {person_id for _touches, person_id in top}:
+            aligned_count += 1
+            continue
+        drift_count += 1
+        number, pattern, owners = rules[index]
+        entry.update({"rule": pattern, "line": number, "declared_owners": owners})
+        push_bounded(drift, args.limit, score, entry, counter)
+
+    return {
+        "codeowners": str(codeowners_path),
+        "rules": len(rules),
+        "files": len(files),
+        "aligned": aligned_count,
+        "drift": drift_count,
+        "unowned": unowned_count,
+        "unresolved": unresolved_count,
+        "unresolved_owners": sorted(unresolved_owners),
+        "top_drift": drain_bounded(drift),
+        "top_unowned": drain_bounded(unowned),
+    }
+
+
+def run_query(args: argparse.Namespace, source: Source) -> object:
+    if args.command == "people":
+        return handle_people(args, source)
+    elif args.command == "files":
+        return handle_files(args, source)
+    elif args.command == "person":
+        return handle_person(args, source)
+    elif args.command == "file":
+        return handle_file(args, source)
+    elif args.command == "cochange":
+        return handle_cochange(args, source)
+    elif args.command == "dir":
+        return handle_dir(args, source)
+    elif args.command == "tag":
+        return handle_tag(args, source)
+    elif args.command == "hidden-owners":
+        return handle_hidden_owners(args, source)
+    elif args.command == "codeowners":
+        return handle_codeowners(args, source)
+    elif args.command == "diff":
+        return handle_diff(args, source)
+    elif args.command == "summary":
+        return handle_summary(args, source)
+    elif args.command == "communities":
+        return handle_communities(args, source)
+    elif args.command == "community":
+        return handle_community(args, source)
+    raise ValueError(f"Unknown command: {args.command}")
+
+
+def query(source: Source | str, command: str, **options: object) -> object:
+    """Run a subcommand in-process and return its JSON-ready payload.
+
+    source is a data directory or a map from build_ownership_map.compute_ownership_map().
+    Options mirror the CLI flags, e.g. query(ownership_map, "person", person="alice", limit=5).
+    """
+    argv = [command]
+    for key, value in options.items():
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif value is not None and value is not False:
+            argv.extend([flag, str(value)])
+    return run_query(parse_args(argv), Path(source) if isinstance(source, str) else source)
 
 
 def main() -> int:
     args = parse_args()
-    data_dir = Path(args.data_dir)
-    if not data_dir.exists():
-        print(f"Data directory not found: {data_dir}", file=sys.stderr)
+    source = Path(args.data_dir)
+    if not source.exists():
+        print(f"Data directory not found: {source}", file=sys.stderr)
         return 1
 
     try:
-        if args.command == "people":
-            handle_people(args, data_dir)
-        elif args.command == "files":
-            handle_files(args, data_dir)
-        elif args.command == "person":
-            handle_person(args, data_dir)
-        elif args.command == "file":
-            handle_file(args, data_dir)
-        elif args.command == "cochange":
-            handle_cochange(args, data_dir)
-        elif args.command == "tag":
-            handle_tag(args, data_dir)
-        elif args.command == "summary":
-            handle_summary(args, data_dir)
-        elif args.command == "communities":
-            handle_communities(args, data_dir)
-        elif args.command == "community":
-            handle_community(args, data_dir)
-        else:
-            raise ValueError(f"Unknown command: {args.command}")
+        payload = run_query(args, source)
     except (FileNotFoundError, ValueError) as exc:
         print(str(exc), file=sys.stderr)
         return 2
 
+    print(json.dumps(payload, indent=2))
     return 0
 
 
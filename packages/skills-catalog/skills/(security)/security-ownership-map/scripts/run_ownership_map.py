@@ -4,14 +4,15 @@
 from __future__ import annotations
 
 import argparse
-import subprocess
+import os
 import sys
-from pathlib import Path
+
+from build_ownership_map import build_args, build_ownership_map
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
-        description="Run build_ownership_map.py with sensible defaults."
+        description="Build the ownership map in-process with sensible defaults."
     )
     parser.add_argument("--repo", default=".", help="Path to the git repo (default: .)")
     parser.add_argument(
@@ -43,6 +44,116 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Write commit list to commits.jsonl",
     )
+    parser.add_argument(
+        "--emit-commit-store",
+        action="store_true",
+        help="Write a compact, memory-mappable commit store to commit_store/",
+    )
+    parser.add_argument(
+        "--progress",
+        choices=("text", "jsonl"),
+        default=None,
+        help="Report build progress on stderr as text or JSON lines",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=2.0,
+        help="Minimum seconds between progress reports",
+    )
+    parser.add_argument(
+        "--sample",
+        type=float,
+        default=None,
+        help="Preview from a seeded, month-stratified fraction of commits (e.g. 0.05), scaled up",
+    )
+    parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=0,
+        help="Seed for --sample; the same seed and history give the same commits",
+    )
+    parser.add_argument(
+        "--approximate",
+        action="store_true",
+        help=(
+            "Estimate author counts (HyperLogLog) and per-person splits (Count-Min) instead of "
+            "keeping per-person-per-file state; skips edges, co-change and communities"
+        ),
+    )
+    parser.add_argument(
+        "--sketch-memory",
+        type=float,
+        default=64.0,
+        help="MiB of sketch registers and counters for --approximate (default: 64)",
+    )
+    parser.add_argument(
+        "--windows",
+        default=None,
+        help="Comma-separated START..END windows (END exclusive) to snapshot in the same walk",
+    )
+    parser.add_argument(
+        "--window-period",
+        choices=("month", "quarter", "year"),
+        default=None,
+        help="Snapshot every calendar month/quarter/year (UTC) in the same walk",
+    )
+    parser.add_argument(
+        "--dir-depths",
+        default="1,2,3",
+        help="Comma-separated directory depths to roll up into dirs.csv (0 = repo root, '' = off)",
+    )
+    parser.add_argument(
+        "--dir-top-owners",
+        type=int,
+        default=3,
+        help="Top owners saved per directory in dirs.csv",
+    )
+    parser.add_argument(
+        "--churn",
+        action="store_true",
+        help="Read --numstat and record lines added/deleted per edge, person, file and community",
+    )
+    parser.add_argument(
+        "--sensitive-weight",
+        choices=("touches", "churn"),
+        default="touches",
+        help="Weight sensitive touches per touch or by lines changed (churn implies --churn)",
+    )
+    parser.add_argument(
+        "--blame",
+        choices=("sensitive", "all"),
+        default=None,
+        help="Attribute current lines at HEAD with git blame for sensitive or all files",
+    )
+    parser.add_argument(
+        "--scan-content",
+        action="store_true",
+        help="Tag files whose contents at HEAD match content rules",
+    )
+    parser.add_argument(
+        "--content-config",
+        default=None,
+        help="CSV file with tag,weight,regex content rules",
+    )
+    parser.add_argument(
+        "--content-workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Processes matching content rules (default: min(8, CPUs))",
+    )
+    parser.add_argument(
+        "--content-max-bytes",
+        type=int,
+        default=1 << 20,
+        help="Skip blobs larger than this when scanning content",
+    )
+    parser.add_argument(
+        "--blame-workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Concurrent git blame processes (default: min(8, CPUs))",
+    )
     parser.add_argument(
         "--author-exclude-regex",
         action="append",
@@ -54,6 +165,34 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Disable default author excludes (dependabot)",
     )
+    parser.add_argument(
+        "--cochange-top-k",
+        type=int,
+        default=0,
+        help="Keep only each file's top K co-change neighbors (0 = keep all)",
+    )
+    parser.add_argument(
+        "--cochange-top-k-policy",
+        choices=("union", "mutual"),
+        default="union",
+        help="Top-k pair selection: in either file's top K (union) or both (mutual)",
+    )
+    parser.add_argument(
+        "--cochange-bitmaps",
+        action="store_true",
+        help="Persist per-file co-change commit bitmaps for exact cochange queries",
+    )
+    parser.add_argument(
+        "--edge-shards",
+        type=int,
+        default=0,
+        help="Partition edge CSVs into N shards by file id (0 = single CSV)",
+    )
+    parser.add_argument(
+        "--neo4j-admin",
+        action="store_true",
+        help="Emit neo4j-admin bulk import files",
+    )
     parser.add_argument(
         "--graphml",
         action="store_true",
@@ -132,68 +271,17 @@ def parse_args() -> argparse.Namespace:
 
 def main() -> int:
     args = parse_args()
+    options = vars(args)
+    options["communities"] = not options.pop("no_communities")
 
     try:
-        import networkx  # noqa: F401
-    except ImportError:
-        print("networkx is required. Install with: pip install networkx", file=sys.stderr)
-        return 2
-
-    script_path = Path(__file__).resolve().parent / "build_ownership_map.py"
-    cmd = [
-        sys.executable,
-        str(script_path),
-        "--repo",
-        args.repo,
-        "--out",
-        args.out,
-        "--identity",
-        args.identity,
-        "--date-field",
-        args.date_field,
-        "--cochange-max-files",
-        str(args.cochange_max_files),
-        "--cochange-min-count",
-        str(args.cochange_min_count),
-        "--cochange-min-jaccard",
-        str(args.cochange_min_jaccard),
-        "--community-top-owners",
-        str(args.community_top_owners),
-        "--bus-factor-threshold",
-        str(args.bus_factor_threshold),
-        "--stale-days",
-        str(args.stale_days),
-        "--owner-threshold",
-        str(args.owner_threshold),
-    ]
-
-    if args.since:
-        cmd.extend(["--since", args.since])
-    if args.until:
-        cmd.extend(["--until", args.until])
-    if args.include_merges:
-        cmd.append("--include-merges")
-    if args.emit_commits:
-        cmd.append("--emit-commits")
-    if args.graphml:
-        cmd.append("--graphml")
-    if args.sensitive_config:
-        cmd.extend(["--sensitive-config", args.sensitive_config])
-    if args.no_cochange:
-        cmd.append("--no-cochange")
-    if args.no_communities:
-        cmd.append("--no-communities")
-    if args.no_default_cochange_excludes:
-        cmd.append("--no-default-cochange-excludes")
-    for pattern in args.cochange_exclude:
-        cmd.extend(["--cochange-exclude", pattern])
-    if args.no_default_author_excludes:
-        cmd.append("--no-default-author-excludes")
-    for pattern in args.author_exclude_regex:
-        cmd.extend(["--author-exclude-regex", pattern])
+        out_dir = build_ownership_map(build_args(**options))
+    except (RuntimeError, ValueError) as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
 
-    result = subprocess.run(cmd, check=False)
-    return result.returncode
+    print(f"Ownership map written to {out_dir}")
+    return 0
 
 
 if __name__ == "__main__":
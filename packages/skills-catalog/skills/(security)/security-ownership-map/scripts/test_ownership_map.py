@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""End-to-end checks for the ownership map scripts.
+
+Run from this directory with `python -m unittest`. Each test builds a throwaway git repo, so
+git must be on PATH; networkx is not needed.
+"""
+
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import build_ownership_map as builder  # noqa: E402
+import query_ownership  # noqa: E402
+
+
+def make_repo(root: Path, commits: list[tuple[str, str, dict[str, str]]]) -> str:
+    """Create a git repo at root from (author email, ISO date, {path: content}) commits."""
+    root.mkdir(parents=True, exist_ok=True)
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    for email, when, files in commits:
+        for path, content in files.items():
+            target = root / path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(content, encoding="utf-8")
+        env = {
+            **os.environ,
+            "GIT_AUTHOR_NAME": email.split("@")[0].title(),
+            "GIT_AUTHOR_EMAIL": email,
+            "GIT_AUTHOR_DATE": when,
+            "GIT_COMMITTER_NAME": email.split("@")[0].title(),
+            "GIT_COMMITTER_EMAIL": email,
+            "GIT_COMMITTER_DATE": when,
+        }
+        subprocess.run(["git", "-C", str(root), "add", "-A"], check=True, env=env)
+        subprocess.run(
+            ["git", "-C", str(root), "commit", "-q", "-m", f"change by {email}"],
+            check=True,
+            env=env,
+        )
+    return str(root)
+
+
+def table_rows(ownership_map: dict[str, object], name: str) -> list[dict[str, str]]:
+    header, rows = ownership_map["tables"][name]
+    return [dict(zip(header, row)) for row in rows]
+
+
+class QuotedPathTest(unittest.TestCase):
+    """git C-quotes non-ASCII log paths; ls-tree -z does not, and both must share keys."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.repo = make_repo(
+            root / "repo",
+            [
+                (
+                    "alice@corp",
+                    "2024-01-01T10:00:00+00:00",
+                    {"src/é/sign.py": "import hashlib\n", "src/auth/naïve.py": "x = 1\n"},
+                ),
+                ("bob@corp", "2024-02-01T10:00:00+00:00", {"src/auth/naïve.py": "x = 2\n"}),
+            ],
+        )
+        self.out = str(root / "out")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_content_tags_reach_non_ascii_paths(self) -> None:
+        args = builder.build_args(
+            repo=self.repo, out=self.out, communities=False, scan_content=True
+        )
+        ownership_map = builder.compute_ownership_map(args)
+        files = {row["path"]: row for row in table_rows(ownership_map, "files")}
+        self.assertIn("src/é/sign.py", files)
+        self.assertEqual(files["src/é/sign.py"]["sensitivity_tags"], "crypto")
+        self.assertEqual(files["src/auth/naïve.py"]["bus_factor"], "2")
+
+    def test_blame_rows_share_file_ids(self) -> None:
+        args = builder.build_args(repo=self.repo, out=self.out, communities=False, blame="all")
+        ownership_map = builder.compute_ownership_map(args)
+        file_ids = {row["file_id"] for row in table_rows(ownership_map, "files")}
+        blamed = {row["file_id"] for row in table_rows(ownership_map, "blame")}
+        self.assertEqual(blamed, {"src/é/sign.py", "src/auth/naïve.py"})
+        self.assertLessEqual(blamed, file_ids)
+        payload = query_ownership.query(ownership_map, "file", file="src/auth/naïve.py")
+        self.assertEqual([owner["person_id"] for owner in payload["blame_owners"]], ["bob@corp"])
+
+
+class ContentScanTest(unittest.TestCase):
+    def test_oversized_blobs_are_skipped_in_stream(self) -> None:
+        big = "import hashlib\n" + "x = 1\n" * 400_000
+        contents = {f"lib/m{idx}/big.py": big + str(idx) for idx in range(3)}
+        contents.update({f"lib/m{idx}/small.py": f"import hashlib  # {idx}\n" for idx in range(3)})
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            repo = make_repo(
+                root / "repo", [("alice@corp", "2024-01-01T10:00:00+00:00", contents)]
+            )
+            args = builder.build_args(
+                repo=repo,
+                out=str(root / "out"),
+                communities=False,
+                scan_content=True,
+                content_max_bytes=100_000,
+            )
+            ownership_map = builder.compute_ownership_map(args)
+        tags = {row["path"]: row["sensitivity_tags"] for row in table_rows(ownership_map, "files")}
+        for idx in range(3):
+            self.assertEqual(tags[f"lib/m{idx}/small.py"], "crypto")
+            self.assertEqual(tags[f"lib/m{idx}/big.py"], "")
+
+
+class BlameCacheTest(unittest.TestCase):
+    def test_identical_blobs_keep_their_own_authors(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            repo = make_repo(
+                root / "repo",
+                [
+                    ("alice@corp", "2024-01-01T10:00:00+00:00", {"a/LICENSE": "same\n"}),
+                    ("bob@corp", "2024-02-01T10:00:00+00:00", {"b/LICENSE": "same\n"}),
+                ],
+            )
+            args = builder.build_args(
+                repo=repo, out=str(root / "out"), communities=False, blame="all"
+            )
+            # The second build answers both paths from the cache written by the first.
+            for _ in range(2):
+                ownership_map = builder.compute_ownership_map(args)
+                owners = {
+                    row["file_id"]: row["person_id"]
+                    for row in table_rows(ownership_map, "blame")
+                }
+                self.assertEqual(owners, {"a/LICENSE": "alice@corp", "b/LICENSE": "bob@corp"})
+            self.assertEqual(ownership_map["summary"]["stats"]["blame_cache_hits"], 2)
+
+
+class ApproximateBuildTest(unittest.TestCase):
+    def test_reused_out_has_no_exact_artifacts(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            repo = make_repo(
+                root / "repo",
+                [
+                    ("alice@corp", "2024-01-01T10:00:00+00:00", {"src/auth/login.py": "a\n"}),
+                    ("bob@corp", "2024-02-01T10:00:00+00:00", {"src/auth/login.py": "b\n"}),
+                ],
+            )
+            out = root / "out"
+            options = {"repo": repo, "out": str(out), "communities": False}
+            builder.build_ownership_map(builder.build_args(**options, blame="all"))
+            self.assertTrue((out / "blame.csv").exists())
+            builder.build_ownership_map(builder.build_args(**options, approximate=True))
+            self.assertFalse((out / "edges.csv").exists())
+            self.assertFalse((out / "blame.csv").exists())
+            with self.assertRaisesRegex(ValueError, "--approximate"):
+                query_ownership.query(str(out), "person", person="alice@corp")
+            files = query_ownership.query(str(out), "files", tag="auth")
+            self.assertEqual(files[0]["bus_factor"], 2)
+
+
+class EdgeShardsTest(unittest.TestCase):
+    def test_unsharded_build_removes_old_shards(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            repo = make_repo(
+                root / "repo",
+                [
+                    (
+                        "alice@corp",
+                        "2024-01-01T10:00:00+00:00",
+                        {"src/auth/login.py": "a\n", "src/auth/token.py": "a\n"},
+                    ),
+                    ("bob@corp", "2024-02-01T10:00:00+00:00", {"src/auth/login.py": "b\n"}),
+                ],
+            )
+            out = root / "out"
+            options = {"repo": repo, "out": str(out), "communities": False}
+            builder.build_ownership_map(builder.build_args(**options, edge_shards=4))
+            self.assertTrue((out / "edges").is_dir())
+            builder.build_ownership_map(builder.build_args(**options))
+            self.assertFalse((out / "edges").exists())
+            self.assertFalse((out / "cochange_edges").exists())
+            self.assertFalse((out / "shards.json").exists())
+            payload = query_ownership.query(str(out), "person", person="bob@corp")
+            top_files = [entry["file_id"] for entry in payload["top_files"]]
+            self.assertEqual(top_files, ["src/auth/login.py"])
+
+
+class CochangeBitmapTest(unittest.TestCase):
+    def test_intersection_count_across_container_kinds(self) -> None:
+        # Key 0 holds a bitmap container in both, key 1 bitmap against array, key 2 array
+        # against bitmap, key 3 arrays in both; key 4 exists on one side only.
+        first = set(range(0, 60000, 3)) | set(range(65536, 65536 + 50000)) | {131072 + 7}
+        first |= set(range(196608, 196608 + 900, 2)) | {262144 + 1}
+        second = set(range(0, 60000, 5)) | set(range(65536, 65536 + 3000, 7))
+        second |= set(range(131072, 131072 + 40000)) | set(range(196608, 196608 + 900, 3))
+        blobs = [builder.encode_bitmap(sorted(ids)) for ids in (first, second)]
+        decoded = query_ownership.decode_bitmap(blobs[0])
+        self.assertEqual(
+            query_ownership.intersection_count(decoded, blobs[1]), len(first & second)
+        )
+
+
+class DirQueryTest(unittest.TestCase):
+    def test_sensitive_min_filters_subdirs_not_the_lookup(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            repo = make_repo(
+                root / "repo",
+                [
+                    (
+                        "alice@corp",
+                        "2024-01-01T10:00:00+00:00",
+                        {"lib/auth/login.py": "a\n", "lib/util/text.py": "a\n"},
+                    ),
+                ],
+            )
+            args = builder.build_args(repo=repo, out=str(root / "out"), communities=False)
+            ownership_map = builder.compute_ownership_map(args)
+            payload = query_ownership.query(
+                ownership_map, "dir", dir="lib/util", sensitive_min=1.0
+            )
+            self.assertEqual(payload["dir"]["sensitive_weight"], 0.0)
+            payload = query_ownership.query(ownership_map, "dir", dir="lib", sensitive_min=1.0)
+            self.assertEqual([entry["dir"] for entry in payload["subdirs"]], ["lib/auth"])
+
+
+class WindowsTest(unittest.TestCase):
+    def test_empty_explicit_window_is_written(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            repo = make_repo(
+                root / "repo",
+                [("alice@corp", "2022-01-10T10:00:00+00:00", {"src/auth/login.py": "a\n"})],
+            )
+            args = builder.build_args(
+                repo=repo,
+                out=str(root / "out"),
+                communities=False,
+                windows="2030-01-01..2031-01-01,2022-01-01..2022-02-01",
+            )
+            windows_dir = builder.build_ownership_map(args) / "windows"
+            index = json.loads((windows_dir / "index.json").read_text(encoding="utf-8"))
+            counts = {entry["label"]: entry["commits"] for entry in index}
+            self.assertEqual(counts, {"2022-01-01..2022-02-01": 1, "2030-01-01..2031-01-01": 0})
+            empty = windows_dir / "2030-01-01..2031-01-01"
+            self.assertEqual(query_ownership.query(str(empty), "files"), [])
+
+
+NEO4J_VALUE_PARSERS = {
+    "int": int,
+    "float": float,
+    "datetime": dt.datetime.fromisoformat,
+    "string[]": lambda value: value.split(";"),
+}
+
+
+class Neo4jAdminTest(unittest.TestCase):
+    """Parse every --neo4j-admin file back as neo4j-admin would read it."""
+
+    odd_path = 'src/auth/we,ird"q.py'
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.TemporaryDirectory()
+        root = Path(cls.tmp.name)
+        repo = make_repo(
+            root / "repo",
+            [
+                (
+                    "alice@corp",
+                    "2024-01-01T10:00:00+00:00",
+                    {cls.odd_path: "a\n", "src/auth/login.py": "a\n", "README.md": "r\n"},
+                ),
+                (
+                    "bob@corp",
+                    "2024-02-01T10:00:00+00:00",
+                    {cls.odd_path: "b\n", "src/auth/login.py": "b\n"},
+                ),
+            ],
+        )
+        args = builder.build_args(
+            repo=repo, out=str(root / "out"), communities=False, neo4j_admin=True
+        )
+        cls.neo4j_dir = builder.build_ownership_map(args) / "neo4j-admin"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp.cleanup()
+
+    def read(self, name: str) -> tuple[list[str], list[dict[str, str]]]:
+        with (self.neo4j_dir / name).open(encoding="utf-8", newline="") as handle:
+            reader = csv.reader(handle)
+            header = next(reader)
+            rows = [dict(zip(header, row, strict=True)) for row in reader]
+        for row in rows:
+            for column, value in row.items():
+                _, _, kind = column.partition(":")
+                if value and kind in NEO4J_VALUE_PARSERS:
+                    NEO4J_VALUE_PARSERS[kind](value)
+        return header, rows
+
+    def test_files_parse_back(self) -> None:
+        header, people = self.read("people.csv")
+        self.assertEqual(
+            header,
+            [
+                "id:ID(Person)",
+                "name",
+                "email",
+                "first_seen:datetime",
+                "last_seen:datetime",
+                "commit_count:int",
+                "touches:int",
+                "sensitive_touches:float",
+                "primary_tz_offset",
+                "primary_tz_minutes:int",
+                "timezone_offsets",
+                ":LABEL",
+            ],
+        )
+        self.assertEqual({row[":LABEL"] for row in people}, {"Person"})
+
+        header, files = self.read("files.csv")
+        self.assertEqual(
+            header,
+            [
+                "id:ID(File)",
+                "path",
+                "first_seen:datetime",
+                "last_seen:datetime",
+                "commit_count:int",
+                "touches:int",
+                "bus_factor:int",
+                "sensitivity_score:float",
+                "sensitivity_tags:string[]",
+                "truck_factor:int",
+                "doa_authors:string[]",
+                "community_id:int",
+                ":LABEL",
+            ],
+        )
+        for row in files:
+            sensitive = float(row["sensitivity_score:float"]) > 0
+            self.assertEqual(row[":LABEL"], "File;Sensitive" if sensitive else "File")
+
+        header, touches = self.read("touches.csv")
+        self.assertEqual(
+            header,
+            [
+                ":START_ID(Person)",
+                ":END_ID(File)",
+                "touches:int",
+                "recency_weight:float",
+                "first_seen:datetime",
+                "last_seen:datetime",
+                "sensitive_weight:float",
+                ":TYPE",
+            ],
+        )
+        header, cochanges = self.read("cochanges.csv")
+        self.assertEqual(
+            header,
+            [":START_ID(File)", ":END_ID(File)", "cochange_count:int", "jaccard:float", ":TYPE"],
+        )
+
+        person_ids = {row["id:ID(Person)"] for row in people}
+        file_ids = {row["id:ID(File)"] for row in files}
+        self.assertEqual(len(person_ids), len(people))
+        self.assertEqual(len(file_ids), len(files))
+        self.assertIn(self.odd_path, file_ids)
+        self.assertTrue(touches)
+        for row in touches:
+            self.assertIn(row[":START_ID(Person)"], person_ids)
+            self.assertIn(row[":END_ID(File)"], file_ids)
+            self.assertEqual(row[":TYPE"], "TOUCHES")
+        self.assertIn(self.odd_path, {row[":END_ID(File)"] for row in touches})
+        self.assertTrue(cochanges)
+        for row in cochanges:
+            self.assertIn(row[":START_ID(File)"], file_ids)
+            self.assertIn(row[":END_ID(File)"], file_ids)
+            self.assertEqual(row[":TYPE"], "COCHANGES")
+
+
+if __name__ == "__main__":
+    unittest.main()